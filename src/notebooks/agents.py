@@ -3,11 +3,13 @@
 # This file defines the setup for a multi-agent system focused on optimizing a trading strategy using MACD indicators.
 
 from textwrap import dedent  # For formatting multiline strings
-from autogen import AssistantAgent, UserProxyAgent, register_function  # Core classes and functions for agent creation
+from autogen import AssistantAgent, register_function  # Core classes and functions for agent creation
 from autogen.agentchat.contrib.multimodal_conversable_agent import MultimodalConversableAgent  # For multimodal agents
 from autogen.cache import Cache  # For caching results
-from tools import plot_macd_tool, display_image_tool, backtest_macd_tool, get_backtesting_result  # Import tools used by the agents
-from config import file_path, start_date, end_date  # Import configuration variables
+from tools import plot_macd_tool, display_image_tool, backtest_macd_tool, sweep_macd_tool, optimize_macd_tool, walk_forward_macd_tool, scan_macd_crossovers_tool, backtest_portfolio_tool, get_backtest_details_tool, get_backtesting_result  # Import tools used by the agents
+from config import company, file_path, start_date, end_date, llm_config, llm_config_4o  # Import configuration variables
+from telemetry import instrument_agent, traced_tool  # For per-tool and per-LLM-call timing spans
+from async_tools import ConcurrentToolExecutor, async_tool  # For running independent tool calls concurrently
 
 # Initialize the Trade Strategy Optimizer agent, which is responsible for optimizing the MACD trading strategy
 trade_strategy_optimizer = MultimodalConversableAgent(
@@ -17,14 +19,14 @@ trade_strategy_optimizer = MultimodalConversableAgent(
         You are a trading strategy optimizer who inspects financial charts and optimizes trading strategies.
         You have been tasked with developing a Moving average convergence/divergence (MACD) trading strategy.
         You have the following main actions to take:
-        1. Ask the Backtesting_Specialist to plot historical stock price data with designated MACD indicators.
+        1. Ask the Backtesting_Specialist to plot historical stock price data with designated MACD indicators. To find candidate symbols, ask it to scan the universe for recent MACD crossovers.
         2. Inspect the stock price chart carefully and determine MACD (short_ema, long_ema, and signal_ema) parameters.
         3. Highlight the exact points/periods where the MACD line crosses the Signal line and interpret their significance critically.
         4. Provide a logical explanation for the suggested parameters based on observed trends.
-        5. Ask the Backtesting_Specialist to backtest the MACD trading strategy with designated parameters to evaluate its performance.
+        5. Ask the Backtesting_Specialist to backtest the MACD trading strategy with designated parameters to evaluate its performance, or to sweep whole ranges of parameters at once and report the top-ranked sets. Before settling on parameters, ask for a walk-forward run to check that they hold up out of sample.
         6. Inspect the backtest result obtained from Backtesting_Specialist and from variable {backtesting_result}, analyze key performance metrics (e.g., drawdown, returns, Sharpe ratio, trade analysis).
-        7. Based on the analysis, optimize the MACD parameters iteratively until satisfactory performance is achieved or until the maximum number of iterations (max_turns) is reached.
-        8. Define acceptable performance benchmarks (e.g., minimum profit factor, maximum drawdown). If the strategy meets these benchmarks at any iteration, summarize the results and terminate the optimization early.
+        7. Define acceptable performance benchmarks (e.g., minimum profit factor, maximum drawdown) and ask the Backtesting_Specialist to run the local parameter search with them as constraints, instead of guessing parameters one round trip at a time.
+        8. Based on the analysis, refine the MACD parameters only where the search leaves questions open, until satisfactory performance is achieved or until the maximum number of iterations (max_turns) is reached. If the strategy meets the benchmarks at any iteration, summarize the results and terminate the optimization early.
         9. Summarize the results and provide the best parameters at the end of the optimization process.
         10. Reply TERMINATE when you think the strategy is good enough.
         """
@@ -38,22 +40,30 @@ backtesting_specialist = AssistantAgent(
     system_message=dedent(
         f"""
         You are a backtesting specialist with a strong command of quantitative analysis tools.
-        You have two main tasks to perform, choose one each time you are asked by the Trade_Strategy_Optimizer:
+        You have seven main tasks to perform, choose one each time you are asked by the Trade_Strategy_Optimizer:
         1. Plot historical stock price data for {company} in the file at {file_path} with MACD indicators (short_ema, long_ema, and signal_ema) according to the Trade_Strategy_Optimizer's need.
         2. Backtest the MACD trading strategy with designated parameters (short_ema, long_ema, and signal_ema) and save the results as an image file.
+        3. Sweep ranges of MACD parameters with the `sweep_macd_tool` tool when the Trade_Strategy_Optimizer wants to compare many parameter sets, and report the ranked table.
+        4. Search the parameters with the `optimize_macd_tool` tool when the Trade_Strategy_Optimizer gives an objective and constraints (e.g. maximum drawdown, minimum profit factor), and report the best set with its metrics and the search trace.
+        5. Run a walk-forward optimization with the `walk_forward_macd_tool` tool when the Trade_Strategy_Optimizer wants to know how optimized parameters perform on data they were not fitted to, and report the out-of-sample results per fold.
+        6. Scan the whole universe for recent MACD crossovers with the `scan_macd_crossovers_tool` tool when the Trade_Strategy_Optimizer wants candidate symbols, and report the ranked list.
+        7. Backtest the MACD strategy on a basket of symbols with shared cash and a maximum number of positions with the `backtest_portfolio_tool` tool when the Trade_Strategy_Optimizer wants a portfolio view (it is long-only, so its results are not directly comparable with `backtest_macd_tool`, which also goes short), and report equity, drawdown and turnover.
 
-        For both tasks, after the tool calling, you should do as follows:
+        Independent tool calls (e.g. a plot and a backtest, or backtests of several candidate parameter sets) run concurrently when you issue them together in one message.
+
+        For the plotting and backtesting tasks, after the tool calling, you should do as follows:
             1. Display the created and saved image file using the `display_image_tool` tool.
             2. Call the `get_backtesting_result` tool to retrieve the backtesting results, and store it in the global variable `backtesting_result`.
-            3. Provide a summary of the backtesting results including key metrics such as total returns, drawdown, Sharpe ratio, and trade analysis.
+            3. Provide a summary of the backtesting results including key metrics such as total returns, drawdown, Sharpe ratio, and trade analysis. The backtest returns compact metrics and a result_id; call `get_backtest_details_tool` with that id only when a detail beyond those metrics is needed.
             4. Assume the saved image file is "test.png" and summary of backtesting results is stored in the global variable. Share both the image and `backtesting_result` and ask to optimize the MACD parameters (short_ema, long_ema, and signal_ema) based on this image <img test.png>, and based on Backtest results in the `backtesting_result` variable. TERMINATE."
         """
     ),
     llm_config=llm_config,  # Configuration for the language model used by this agent
 )
 
-# UserProxyAgent to execute commands sent by the Backtesting Specialist agent
-backtesting_specialist_executor = UserProxyAgent(
+# UserProxyAgent to execute commands sent by the Backtesting Specialist agent; the tool calls of one message run
+# concurrently, with the CPU-bound tools (registered through async_tool) in a shared worker pool
+backtesting_specialist_executor = ConcurrentToolExecutor(
     name="Backtesting_Specialist_Executor",
     human_input_mode="NEVER",  # The agent operates automatically without human input
     is_termination_msg=lambda x: x.get("content", "") and x.get("content", "").find("TERMINATE") >= 0,  # Checks if the message contains a termination command
@@ -66,25 +76,79 @@ backtesting_specialist_executor = UserProxyAgent(
 
 # Register the plotting function with the Backtesting Specialist agent
 register_function(
-    plot_macd_tool,
+    async_tool(plot_macd_tool),
     caller=backtesting_specialist,
     executor=backtesting_specialist_executor,
     name="plot_macd_tool",
-    description="Plots the MACD chart with EMA, MACD histogram, and signals, and saves the plot to a file.",
+    description="Plots the MACD chart with EMA, MACD histogram, and signals for the given MACD parameters (default 12/26/9), and saves the plot to a file.",
 )
 
 # Register the backtesting function with the Backtesting Specialist agent
 register_function(
-    backtest_macd_tool,
+    async_tool(backtest_macd_tool),
     caller=backtesting_specialist,
     executor=backtesting_specialist_executor,
     name="backtest_macd_tool",
     description="Backtests a MACD trading strategy on historical stock data from a CSV file.",
 )
 
+# Register the parameter sweep function with the Backtesting Specialist agent
+register_function(
+    async_tool(sweep_macd_tool),
+    caller=backtesting_specialist,
+    executor=backtesting_specialist_executor,
+    name="sweep_macd_tool",
+    description="Backtests every MACD parameter combination in the given ranges in one call and returns the top-N sets ranked by a metric.",
+)
+
+# Register the local parameter search function with the Backtesting Specialist agent
+register_function(
+    async_tool(optimize_macd_tool),
+    caller=backtesting_specialist,
+    executor=backtesting_specialist_executor,
+    name="optimize_macd_tool",
+    description="Searches MACD parameters with successive halving (short-window backtests first, survivors promoted to the full range) and a coordinate search, under constraints and a time budget; returns the best set and the search trace.",
+)
+
+# Register the walk-forward optimization function with the Backtesting Specialist agent
+register_function(
+    async_tool(walk_forward_macd_tool),
+    caller=backtesting_specialist,
+    executor=backtesting_specialist_executor,
+    name="walk_forward_macd_tool",
+    description="Optimizes MACD parameters on rolling train windows, evaluates each winner on the following test window, and returns per-fold and stitched out-of-sample results.",
+)
+
+# Register the crossover scan function with the Backtesting Specialist agent
+register_function(
+    async_tool(scan_macd_crossovers_tool),
+    caller=backtesting_specialist,
+    executor=backtesting_specialist_executor,
+    name="scan_macd_crossovers_tool",
+    description="Scans every symbol in the universe for MACD/signal crossovers in the most recent sessions and returns them ranked by histogram magnitude.",
+)
+
+# Register the portfolio backtest function with the Backtesting Specialist agent
+register_function(
+    async_tool(backtest_portfolio_tool),
+    caller=backtesting_specialist,
+    executor=backtesting_specialist_executor,
+    name="backtest_portfolio_tool",
+    description="Backtests a long-only MACD strategy (bullish crossovers open positions, bearish ones only close them; no short selling, unlike backtest_macd_tool) on an explicit basket of stock symbols (index and ETF series are not tradable here) sharing one cash account, with position sizing and a max-positions limit, and returns portfolio equity, drawdown and turnover.",
+)
+
+# Register the function to fetch full backtest reports with the Backtesting Specialist agent
+register_function(
+    traced_tool(get_backtest_details_tool),
+    caller=backtesting_specialist,
+    executor=backtesting_specialist_executor,
+    name="get_backtest_details_tool",
+    description="Returns the full analyzer report (or one section of it) stored under the result_id of a compact backtest result.",
+)
+
 # Register the image display function with the Backtesting Specialist agent
 register_function(
-    display_image_tool,
+    traced_tool(display_image_tool),
     caller=backtesting_specialist,
     executor=backtesting_specialist_executor,
     name="display_image_tool",
@@ -93,13 +157,17 @@ register_function(
 
 # Register the function to retrieve backtesting results with the Backtesting Specialist agent
 register_function(
-    get_backtesting_result,
+    traced_tool(get_backtesting_result),
     caller=backtesting_specialist,
     executor=backtesting_specialist_executor,
     name="get_backtesting_result",
     description="Retrieves the backtesting results stored in the global variable."
 )
 
+# Record the latency and token counts of every LLM call made by the agents (active when telemetry is enabled)
+instrument_agent(trade_strategy_optimizer)
+instrument_agent(backtesting_specialist)
+
 # Function to simulate reflection on the optimizer's response,  used for debugging/logging
 def reflection_message_analyst(recipient, messages, sender, config):
     print("Reflecting Trade_Strategy_Optimizer's response ...")
@@ -0,0 +1,148 @@
+# async_tools.py
+
+# This file lets the Backtesting Specialist's tool calls run concurrently. `async_tool` turns a CPU-bound tool into a
+# coroutine that runs the tool in a shared set of worker processes, and `ConcurrentToolExecutor` is a UserProxyAgent
+# that dispatches every tool call of one assistant message at once and gathers the results, so a plot plus several
+# backtests take about as long as the slowest of them instead of their sum. Calls on the same CSV file prefer the
+# same worker, so they share its loader cache, but go to another one when it is busy, and the spans recorded in a
+# worker are merged into this process' trace. Tools registered as plain functions (image display, result lookups)
+# run after the pooled ones, in message order, since they read what those produce.
+
+import asyncio  # For running the tool calls of one message concurrently
+import atexit  # For shutting the pool down with the process
+import functools  # For wrapping tools without changing their signatures
+import inspect  # For telling pooled tools from plain ones
+import os  # For the pool size setting and file paths
+import threading  # For the worker bookkeeping shared by concurrent calls
+import time  # For tool span timings
+import zlib  # For a stable file-to-worker mapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor  # For the worker pool and nested event loops
+from typing import Callable, Dict, List, Optional, Tuple, Union  # For type annotations
+from autogen import Agent, UserProxyAgent  # For the executor agent
+from telemetry import PROFILE_OUTPUT, PROFILE_TOOL, detach_worker, run_in_worker, tool_arguments, tracer  # For recording and profiling the pooled tool calls
+
+# Number of worker processes for pooled tools, overridable with the MACD_TOOL_WORKERS environment variable
+TOOL_WORKERS = int(os.environ.get("MACD_TOOL_WORKERS", 0)) or os.cpu_count() or 1
+
+# Pooled tool calls with this argument prefer the same worker whenever they name the same file
+AFFINITY_ARGUMENT = "csv_file_path"
+
+# One single-process pool per worker, so calls can be routed to a given worker
+_pools: List[ProcessPoolExecutor] = []
+_in_flight: List[int] = []
+_lock = threading.Lock()
+
+def get_tool_pools() -> List[ProcessPoolExecutor]:
+    # The TOOL_WORKERS single-worker pools shared by every pooled tool, started on first use. Workers drop the
+    # tracing state inherited from this process (see telemetry.detach_worker).
+    with _lock:
+        if not _pools:
+            for _ in range(TOOL_WORKERS):
+                pool = ProcessPoolExecutor(max_workers=1, initializer=detach_worker)
+                atexit.register(pool.shutdown, cancel_futures=True)
+                _pools.append(pool)
+                _in_flight.append(0)
+    return _pools
+
+def _pick_worker(key: Optional[str]) -> int:
+    # Worker for a call: the file's preferred worker when it is idle, so consecutive calls on a file (a plot, then
+    # backtests) share its loader cache, otherwise the least busy one, so calls on one file still run concurrently
+    pools = get_tool_pools()
+    with _lock:
+        worker = zlib.crc32(os.path.abspath(key).encode()) % len(pools) if key is not None else None
+        if worker is None or _in_flight[worker] > 0:
+            worker = min(range(len(pools)), key=_in_flight.__getitem__)
+        _in_flight[worker] += 1
+    return worker
+
+def async_tool(function: Callable, name: Optional[str] = None) -> Callable:
+    # Coroutine variant of a module-level tool that runs it in the tool pool. It keeps the tool's signature and
+    # annotations for registration. When tracing is on, the call is a "tool" span in this process carrying the
+    # counters of the work done in the worker, whose spans are merged under it; MACD_PROFILE_TOOL profiles the
+    # first call inside the worker.
+    tool_name = name or function.__name__
+    signature = inspect.signature(function)
+    profile_pending = [PROFILE_TOOL == tool_name]
+
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        profile, profile_pending[0] = profile_pending[0], False
+        try:
+            key = signature.bind_partial(*args, **kwargs).arguments.get(AFFINITY_ARGUMENT)
+        except TypeError:
+            key = None  # Let the call itself report the mistake
+        worker = _pick_worker(key if isinstance(key, str) else None)
+        started = time.perf_counter()
+        try:
+            call = functools.partial(run_in_worker, function, args, kwargs, tracer.enabled, profile, PROFILE_OUTPUT)
+            result, events, origin, counters = await asyncio.get_running_loop().run_in_executor(_pools[worker], call)
+        finally:
+            with _lock:
+                _in_flight[worker] -= 1
+        if tracer.enabled:
+            tracer.record(tool_name, "tool", started, time.perf_counter() - started, counters=counters, pooled=True,
+                          worker=worker, result_chars=len(str(result)), **tool_arguments(signature, args, kwargs))
+            tracer.merge(events, origin, parent=tool_name)
+        return result
+
+    return wrapper
+
+def run_coroutine(coroutine):
+    # Run a coroutine to completion from synchronous code, also when an event loop is already running (Jupyter)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, coroutine).result()
+
+class ConcurrentToolExecutor(UserProxyAgent):
+    def __init__(self, *args, **kwargs):
+        # Same options as UserProxyAgent; tool calls are answered by generate_concurrent_tool_calls_reply, which takes
+        # the place of autogen's sequential tool call replies in both sync and async chats
+        super().__init__(*args, **kwargs)
+        position = next(
+            (i for i, entry in enumerate(self._reply_func_list)
+             if entry["reply_func"] in (UserProxyAgent.a_generate_tool_calls_reply, UserProxyAgent.generate_tool_calls_reply)),
+            0,
+        )
+        self.register_reply([Agent, None], ConcurrentToolExecutor.generate_concurrent_tool_calls_reply, position=position)
+
+    async def _execute_tool_call(self, tool_call: Dict) -> Dict[str, str]:
+        # Tool response message for one call, in the format of generate_tool_calls_reply
+        _, func_return = await self.a_execute_function(tool_call.get("function", {}))
+        response = {"role": "tool", "content": func_return.get("content", "") or ""}
+        if tool_call.get("id") is not None:
+            response["tool_call_id"] = tool_call["id"]
+        return response
+
+    async def _gather_tool_calls(self, tool_calls: List[Dict]) -> List[Dict[str, str]]:
+        # Start every pooled (async) tool call together, then run the plain ones in message order
+        responses: List[Optional[Dict[str, str]]] = [None] * len(tool_calls)
+        pooled = [i for i, tool_call in enumerate(tool_calls)
+                  if inspect.iscoroutinefunction(self._function_map.get(tool_call.get("function", {}).get("name")))]
+        for i, response in zip(pooled, await asyncio.gather(*(self._execute_tool_call(tool_calls[i]) for i in pooled))):
+            responses[i] = response
+        for i, tool_call in enumerate(tool_calls):
+            if responses[i] is None:
+                responses[i] = await self._execute_tool_call(tool_call)
+        return responses
+
+    def generate_concurrent_tool_calls_reply(
+        self,
+        messages: Optional[List[Dict]] = None,
+        sender: Optional[Agent] = None,
+        config: Optional[any] = None,
+    ) -> Tuple[bool, Union[Dict, None]]:
+        # Reply to a message with tool calls by executing all of them concurrently
+        if messages is None:
+            messages = self._oai_messages[sender]
+        tool_calls = messages[-1].get("tool_calls", [])
+        if not tool_calls:
+            return False, None
+        tool_returns = run_coroutine(self._gather_tool_calls(tool_calls))
+        return True, {
+            "role": "tool",
+            "tool_responses": tool_returns,
+            "content": "\n\n".join(self._str_for_tool_response(tool_return) for tool_return in tool_returns),
+        }
@@ -4,37 +4,363 @@
 # Moving Average Convergence Divergence (MACD) strategy. It utilizes the Backtrader library to simulate
 # trading strategies and analyze their performance.
 
-import backtrader as bt  # Backtrader is used for backtesting trading strategies
+import numpy as np  # For the vectorized backtest engine
 import pandas as pd  # For data manipulation
 import json  # For handling JSON data, particularly for strategy parameters
+import math  # For log/exp helpers used by the return statistics
 import os  # For file and directory operations
-import matplotlib.pyplot as plt  # For plotting backtesting results
-from typing import Optional, Dict, Annotated  # For type annotations and optional parameters
-from config import backtesting_result, file_path, start_date, end_date  # Import configuration variables
+import sys  # For sys.maxsize, mirrored from Backtrader's trade statistics
+from functools import lru_cache  # For defining the Backtrader strategy once, on first use
+from typing import Callable, Optional, Dict, List, Annotated  # For type annotations and optional parameters
+from settings import backtesting_result, file_path, start_date, end_date  # Import configuration variables
+from data_loader import get_ohlcv_range  # Import the shared OHLCV loader
+from telemetry import span  # For timing the backtest phases
+from result_summary import compact_stats, default_details, payload_size  # For compact tool results
+from indicator_store import default_indicators  # For precomputed EMAs
 
-class MACDStrategy(bt.Strategy):
-    # Define a basic MACD trading strategy using Backtrader's strategy class
+@lru_cache(maxsize=None)
+def _macd_strategy_class():
+    # Backtrader is only imported, and MACDStrategy only defined, when a Cerebro run needs them
+    import backtrader as bt
+
+    class MACDStrategy(bt.Strategy):
+        # Define a basic MACD trading strategy using Backtrader's strategy class
+        params = (('short_ema', 12), ('long_ema', 26), ('signal_ema', 9),)
+
+        def __init__(self):
+            # Initialize the MACD indicator and a crossover indicator for buy/sell signals
+            self.macd = bt.indicators.MACD(
+                self.data.close,
+                period_me1=self.params.short_ema,
+                period_me2=self.params.long_ema,
+                period_signal=self.params.signal_ema
+            )
+            self.crossover = bt.indicators.CrossOver(self.macd.macd, self.macd.signal)
+
+        def next(self):
+            # Implement the trading logic: Buy on MACD crossover above the signal line, sell on crossover below
+            if self.crossover > 0:
+                self.buy()
+            elif self.crossover < 0:
+                self.sell()
+
+    MACDStrategy.__qualname__ = "MACDStrategy"  # Resolvable as backtesting.MACDStrategy, e.g. for pickling
+    return MACDStrategy
+
+def __getattr__(name: str):
+    # Keep `from backtesting import MACDStrategy` working without importing Backtrader at module load
+    if name == "MACDStrategy":
+        return _macd_strategy_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Largest integer Backtrader uses as the "unset" minimum in its trade length statistics
+MAXINT = sys.maxsize
+
+def seeded_ema(values: np.ndarray, period: int, start: int = 0) -> np.ndarray:
+    # Exponential moving average matching Backtrader's EMA: NaN until `period` values are available from `start`,
+    # seeded with their simple average, then smoothed with alpha = 2 / (1 + period)
+    result = np.full(len(values), np.nan)
+    first = start + period - 1
+    if period < 1 or first >= len(values):
+        return result
+    seeded = np.array(values[first:], dtype=np.float64)
+    seeded[0] = math.fsum(values[start:first + 1]) / period
+    result[first:] = pd.Series(seeded).ewm(alpha=2.0 / (1.0 + period), adjust=False).mean().to_numpy()
+    # pandas skips missing values, whereas Backtrader's recursion stays NaN from the first missing value on
+    missing = np.flatnonzero(np.isnan(seeded))
+    if len(missing):
+        result[first + missing[0]:] = np.nan
+    return result
+
+def macd_crossover(macd: np.ndarray, signal: np.ndarray) -> np.ndarray:
+    # Vectorized equivalent of bt.indicators.CrossOver: +1 where MACD crosses above the signal line, -1 where it
+    # crosses below, 0 otherwise. Like Backtrader, a zero difference keeps the sign of the last non-zero one.
+    diff = macd - signal
+    crossover = np.zeros(len(diff), dtype=np.int8)
+    valid = np.flatnonzero(~np.isnan(diff))
+    if len(valid) < 2:
+        return crossover
+    first = valid[0]
+    # Index of the last non-zero difference at each bar (the first valid bar seeds it even when zero)
+    positions = np.arange(len(diff))
+    keep = diff != 0.0
+    keep[:first + 1] = True
+    last_nonzero = diff[np.maximum.accumulate(np.where(keep, positions, 0))][first:]
+    current = diff[first + 1:]
+    crossover[first + 1:] = (
+        ((last_nonzero[:-1] < 0.0) & (current > 0.0)).astype(np.int8)
+        - ((last_nonzero[:-1] > 0.0) & (current < 0.0)).astype(np.int8)
+    )
+    return crossover
+
+class _AnalysisTree(dict):
+    # Nested dict that creates missing branches on access, like Backtrader's AutoOrderedDict, so the trade
+    # statistics below can be built with the same key order as bt.analyzers.TradeAnalyzer
+    def __missing__(self, key):
+        value = self[key] = _AnalysisTree()
+        return value
+
+def _plain_dict(tree: dict) -> dict:
+    # Convert an _AnalysisTree into plain nested dicts so later lookups cannot grow it
+    return {key: _plain_dict(value) if isinstance(value, dict) else value for key, value in tree.items()}
+
+def trade_analysis(trade_events: List[tuple]) -> Dict[str, any]:
+    # Rebuild the bt.analyzers.TradeAnalyzer report from ("open", size, 0.0, 0) and ("close", size, pnl, barlen)
+    # events. There are no commissions in these backtests, so gross and net PnL are the same.
+    rets = _AnalysisTree()
+    rets["total"]["total"] = 0
+
+    for kind, size, pnl, barlen in trade_events:
+        total = rets["total"]
+        if kind == "open":
+            total["total"] += 1
+            total["open"] = (total["open"] or 0) + 1
+            continue
+
+        res = {"won": int(pnl >= 0.0), "tlong": int(size > 0)}
+        res["lost"] = int(not res["won"])
+        res["tshort"] = int(not res["tlong"])
+
+        total["open"] = (total["open"] or 0) - 1
+        total["closed"] = (total["closed"] or 0) + 1
+
+        # Streak
+        for wlname in ("won", "lost"):
+            streak = rets["streak"][wlname]
+            streak["current"] = (streak["current"] or 0) * res[wlname] + res[wlname]
+            streak["longest"] = max(streak["longest"] or 0, streak["current"])
+
+        for pnl_kind in ("gross", "net"):
+            node = rets["pnl"][pnl_kind]
+            node["total"] = (node["total"] or 0) + pnl
+            node["average"] = node["total"] / total["closed"]
+
+        # Won/Lost statistics
+        for wlname in ("won", "lost"):
+            trwl = rets[wlname]
+            trwl["total"] = (trwl["total"] or 0) + res[wlname]
+            wlpnl = pnl * res[wlname]
+            trwl["pnl"]["total"] = (trwl["pnl"]["total"] or 0) + wlpnl
+            trwl["pnl"]["average"] = trwl["pnl"]["total"] / (trwl["total"] or 1.0)
+            extreme = max if wlname == "won" else min
+            trwl["pnl"]["max"] = extreme(trwl["pnl"]["max"] or 0.0, wlpnl)
+
+        # Long/Short statistics
+        for tname in ("long", "short"):
+            trls = rets[tname]
+            ls = res["t" + tname]
+            trls["total"] = (trls["total"] or 0) + ls
+            trls["pnl"]["total"] = (trls["pnl"]["total"] or 0) + pnl * ls
+            trls["pnl"]["average"] = trls["pnl"]["total"] / (trls["total"] or 1.0)
+            for wlname in ("won", "lost"):
+                lspnl = pnl * res[wlname] * ls
+                trls[wlname] = (trls[wlname] or 0) + res[wlname] * ls
+                node = trls["pnl"][wlname]
+                node["total"] = (node["total"] or 0) + lspnl
+                node["average"] = node["total"] / (trls[wlname] or 1.0)
+                extreme = max if wlname == "won" else min
+                node["max"] = extreme(node["max"] or 0.0, lspnl)
+
+        # Length
+        length = rets["len"]
+        length["total"] = (length["total"] or 0) + barlen
+        length["average"] = length["total"] / total["closed"]
+        length["max"] = max(length["max"] or 0, barlen)
+        length["min"] = min(length["min"] or MAXINT, barlen)
+
+        # Length Won/Lost
+        for wlname in ("won", "lost"):
+            node = length[wlname]
+            wlbars = barlen * res[wlname]
+            node["total"] = (node["total"] or 0) + wlbars
+            node["average"] = node["total"] / (rets[wlname]["total"] or 1.0)
+            node["max"] = max(node["max"] or 0, wlbars)
+            if wlbars:
+                node["min"] = min(node["min"] or MAXINT, wlbars)
+
+        # Length Long/Short
+        for lsname in ("long", "short"):
+            trls = length[lsname]
+            lsbars = barlen * res["t" + lsname]
+            trls["total"] = (trls["total"] or 0) + lsbars
+            trls["average"] = trls["total"] / (rets[lsname]["total"] or 1.0)
+            trls["max"] = max(trls["max"] or 0, lsbars)
+            current_min = trls["min"] or MAXINT
+            trls["min"] = min(current_min, lsbars or current_min)
+            for wlname in ("won", "lost"):
+                node = trls[wlname]
+                wlbars = lsbars * res[wlname]
+                node["total"] = (node["total"] or 0) + wlbars
+                node["average"] = node["total"] / (rets[lsname][wlname] or 1.0)
+                node["max"] = max(node["max"] or 0, wlbars)
+                current_min = node["min"] or MAXINT
+                node["min"] = min(current_min, wlbars or current_min)
+
+    return _plain_dict(rets)
+
+class VectorizedMACDStrategy:
+    # NumPy counterpart of MACDStrategy. It follows the same rules as the Backtrader run (Backtrader's seeded EMAs,
+    # CrossOver signals, one-unit market orders filled at the next bar's open, default broker cash checks) but
+    # evaluates indicators, positions and the equity curve over the whole series at once instead of bar by bar.
     params = (('short_ema', 12), ('long_ema', 26), ('signal_ema', 9),)
 
-    def __init__(self):
-        # Initialize the MACD indicator and a crossover indicator for buy/sell signals
-        self.macd = bt.indicators.MACD(
-            self.data.close,
-            period_me1=self.params.short_ema,
-            period_me2=self.params.long_ema,
-            period_signal=self.params.signal_ema
-        )
-        self.crossover = bt.indicators.CrossOver(self.macd.macd, self.macd.signal)
+    def __init__(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9, stored_ema: Optional[Callable[[int], Optional[np.ndarray]]] = None):
+        # stored_ema optionally serves precomputed seeded EMAs of the close by span (see IndicatorStore.lookup)
+        self.short_ema = short_ema
+        self.long_ema = long_ema
+        self.signal_ema = signal_ema
+        self.stored_ema = stored_ema
+
+    def close_ema(self, close: np.ndarray, period: int) -> np.ndarray:
+        # Seeded EMA of the close, read from the indicator store when it holds the span
+        stored = self.stored_ema(period) if self.stored_ema is not None else None
+        return seeded_ema(close, period) if stored is None else stored
 
-    def next(self):
-        # Implement the trading logic: Buy on MACD crossover above the signal line, sell on crossover below
-        if self.crossover > 0:
-            self.buy()
-        elif self.crossover < 0:
-            self.sell()
+    def crossover(self, close: np.ndarray) -> np.ndarray:
+        # MACD line from the short/long EMAs, signal line seeded once the MACD line exists, then crossovers
+        macd = self.close_ema(close, self.short_ema) - self.close_ema(close, self.long_ema)
+        signal = seeded_ema(macd, self.signal_ema, start=max(self.short_ema, self.long_ema) - 1)
+        return macd_crossover(macd, signal)
+
+    @staticmethod
+    def simulate(crossover: np.ndarray, open_prices: np.ndarray, close_prices: np.ndarray, cash: float):
+        # Turn crossover signals into fills and a per-bar portfolio value. Only the handful of signal bars are
+        # visited in Python; the position, cash and value series are built with cumulative sums.
+        position = 0
+        available_cash = cash
+        fills = []
+        # A signal on the last bar never reaches the market, just like an unfilled Backtrader order
+        for bar in np.flatnonzero(crossover[:-1]):
+            size = int(crossover[bar])
+            fill_price = open_prices[bar + 1]
+            # The broker rejects any order that would leave negative cash at the submission bar's close, and an
+            # opening (not closing) order that would leave negative cash at the fill price
+            if available_cash - size * close_prices[bar] < 0.0:
+                continue
+            if position * size >= 0 and available_cash - size * fill_price < 0.0:
+                continue
+            available_cash -= size * fill_price
+            position += size
+            fills.append((int(bar) + 1, size, float(fill_price)))
+
+        position_delta = np.zeros(len(close_prices))
+        cash_delta = np.zeros(len(close_prices))
+        cash_delta[0] = cash
+        for bar, size, fill_price in fills:
+            position_delta[bar] += size
+            cash_delta[bar] -= size * fill_price
+        value = np.cumsum(cash_delta) + np.cumsum(position_delta) * close_prices
+        return value, fills
+
+    @staticmethod
+    def trade_events(fills: List[tuple]) -> List[tuple]:
+        # Pair fills into trades the way Backtrader's Trade objects do: increases average the entry price,
+        # reductions realize PnL, and the trade closes when the position returns to zero
+        events = []
+        position, entry_bar, entry_price, trade_size, trade_pnl = 0, 0, 0.0, 0, 0.0
+        for bar, size, fill_price in fills:
+            old_position = position
+            position += size
+            if old_position == 0:
+                entry_bar, entry_price, trade_size, trade_pnl = bar, fill_price, size, 0.0
+                events.append(("open", size, 0.0, 0))
+            elif abs(position) > abs(old_position):
+                entry_price = (old_position * entry_price + size * fill_price) / position
+            else:
+                trade_pnl += -size * (fill_price - entry_price)
+            if position == 0:
+                events.append(("close", trade_size, trade_pnl, bar - entry_bar))
+        return events
+
+    @staticmethod
+    def drawdown_stats(value: np.ndarray) -> Dict[str, any]:
+        # Same figures as bt.analyzers.DrawDown, which tracks the running peak of the portfolio value
+        # (missing values never raise the peak or the maxima, as with Python's max() in the analyzer)
+        peak = np.fmax.accumulate(value)
+        moneydown = peak - value
+        drawdown = 100.0 * moneydown / peak
+        bars = np.arange(len(value))
+        # Length of the current drawdown run at each bar: bars since the last bar without a drawdown
+        run_length = bars - np.maximum.accumulate(np.where(drawdown == 0.0, bars, -1))
+        return {
+            "len": int(run_length[-1]),
+            "drawdown": float(drawdown[-1]),
+            "moneydown": float(moneydown[-1]),
+            "max": {
+                "len": max(0.0, int(run_length.max())),
+                "drawdown": float(np.fmax.reduce(drawdown, initial=0.0)),
+                "moneydown": float(np.fmax.reduce(moneydown, initial=0.0)),
+            },
+        }
+
+    @staticmethod
+    def returns_stats(start_value: float, end_value: float, bars: int, tann: float = 252.0) -> Dict[str, float]:
+        # Same figures as bt.analyzers.Returns on daily data: log total return, per-bar average, annualized
+        try:
+            ratio = end_value / start_value
+        except ZeroDivisionError:
+            ratio = -1.0
+        rtot = float('-inf') if ratio < 0.0 else math.log(ratio)
+        ravg = rtot / bars
+        rnorm = math.expm1(ravg * tann) if ravg > float('-inf') else ravg
+        return {"rtot": rtot, "ravg": ravg, "rnorm": rnorm, "rnorm100": rnorm * 100.0}
+
+    @staticmethod
+    def sharpe_ratio(dates: pd.DatetimeIndex, value: np.ndarray, start_value: float, riskfreerate: float = 0.01) -> Dict[str, Optional[float]]:
+        # Same figure as bt.analyzers.SharpeRatio with its defaults: calendar-year returns of the portfolio value,
+        # excess over the risk-free rate, divided by their population standard deviation. `dates` may also be the
+        # array of their calendar years, which sweeps precompute once instead of per evaluated window.
+        years = dates if isinstance(dates, np.ndarray) else np.asarray(dates.year)
+        year_ends = np.append(np.flatnonzero(years[1:] != years[:-1]), len(years) - 1)
+        year_end_values = value[year_ends]
+        previous_values = np.concatenate(([start_value], year_end_values[:-1]))
+        excess = [float(r) - riskfreerate for r in year_end_values / previous_values - 1.0]
+        average = math.fsum(excess) / len(excess)
+        deviation = math.sqrt(math.fsum([pow(r - average, 2.0) for r in excess]) / len(excess))
+        try:
+            ratio = average / deviation
+        except ZeroDivisionError:
+            ratio = None
+        return {"sharperatio": ratio}
+
+    def run(self, df: pd.DataFrame, cash: float = 10000.0) -> Dict[str, any]:
+        # Backtest a date-indexed frame with lowercase open/high/low/close/volume columns and return the same
+        # stats_dict layout as BackTraderUtils.back_test_macd
+        open_prices = df['open'].to_numpy(dtype=np.float64)
+        close_prices = df['close'].to_numpy(dtype=np.float64)
+        value, fills = self.simulate(self.crossover(close_prices), open_prices, close_prices, cash)
+        self.value = pd.Series(value, index=df.index, name="value")
+        self.fills = fills
+
+        stats_dict: Dict[str, any] = {"Starting Portfolio Value": cash}
+        stats_dict["Final Portfolio Value"] = float(value[-1])
+        stats_dict["Sharpe Ratio"] = self.sharpe_ratio(df.index, value, cash)
+        stats_dict["Drawdown"] = self.drawdown_stats(value)
+        stats_dict["Returns"] = self.returns_stats(cash, float(value[-1]), len(value))
+        stats_dict["Trade Analysis"] = trade_analysis(self.trade_events(fills))
+        return stats_dict
+
+    def plot(self, df: pd.DataFrame, save_fig: str):
+        # Lightweight replacement for cerebro.plot(): close price with fills, and the portfolio value below it
+        import matplotlib.pyplot as plt  # Deferred so backtests without a figure never load matplotlib
+        fig, (price_ax, value_ax) = plt.subplots(2, 1, figsize=(16, 10), sharex=True, gridspec_kw={"height_ratios": (3, 1)})
+        price_ax.plot(df.index, df['close'], color='black', linewidth=1.0, label='Close')
+        buys = [bar for bar, size, _ in self.fills if size > 0]
+        sells = [bar for bar, size, _ in self.fills if size < 0]
+        price_ax.scatter(df.index[buys], df['open'].iloc[buys], marker='^', color='green', label='Buy')
+        price_ax.scatter(df.index[sells], df['open'].iloc[sells], marker='v', color='red', label='Sell')
+        price_ax.legend(loc='upper left')
+        value_ax.plot(self.value.index, self.value, color='blue', linewidth=1.0, label='Portfolio Value')
+        value_ax.legend(loc='upper left')
+        fig.savefig(save_fig)
+        plt.close(fig)
 
 class BackTraderUtils:
     # Utility class for running the backtest with the MACD strategy
+    def load_data(self, csv_file_path: str, start_date: str, end_date: str) -> pd.DataFrame:
+        # Datetime-indexed OHLCV frame limited to [start_date, end_date], served by the shared loader as a view
+        return get_ohlcv_range(csv_file_path, start_date, end_date)
+
     def back_test_macd(
         self,
         csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
@@ -43,14 +369,19 @@ class BackTraderUtils:
         strategy_params: Annotated[str, "JSON string of strategy parameters, e.g., '{\"short_ema\": 12, \"long_ema\": 26, \"signal_ema\": 9}'"] = "",
         cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
         save_fig: Optional[Annotated[str, "File path to save the backtest result plot"]] = None,
+        engine: Annotated[str, "Backtest engine: 'backtrader' (bar-by-bar Cerebro run) or 'vectorized' (NumPy fast path)"] = "backtrader",
+        output: Annotated[str, "'compact' for a fixed metrics summary plus a result id for the full report, 'full' for every analyzer"] = "full",
     ) -> str:
         """
         Use the Backtrader library to backtest the MACD strategy on historical stock data from a CSV file.
+        With engine='vectorized' the same strategy is evaluated by VectorizedMACDStrategy instead of Cerebro.
+        With output='compact' the analyzers are reduced to a fixed set of metrics and the full report is stored on disk.
         """
 
-        # Initialize the Backtrader engine
-        cerebro = bt.Cerebro()
-        strategy_class = MACDStrategy
+        if engine not in ("backtrader", "vectorized"):
+            return f"Error: Unknown engine '{engine}'. Use 'backtrader' or 'vectorized'."
+        if output not in ("compact", "full"):
+            return f"Error: Unknown output '{output}'. Use 'compact' or 'full'."
 
         # Load strategy parameters from the provided JSON string
         try:
@@ -58,24 +389,14 @@ class BackTraderUtils:
         except json.JSONDecodeError:
             return "Error: Invalid JSON format for strategy_params."
 
-        cerebro.addstrategy(strategy_class, **strategy_params_dict)
-
-        # Load historical stock data from CSV file
+        # Load historical stock data from CSV file, filtered to the specified date range
         try:
-            df = pd.read_csv(csv_file_path, parse_dates=['date'])
+            df = self.load_data(csv_file_path, start_date, end_date)
         except FileNotFoundError:
             return f"Error: File not found at {csv_file_path}."
         except pd.errors.ParserError:
             return "Error: Failed to parse CSV file."
 
-        # Prepare the data for Backtrader
-        df['datetime'] = pd.to_datetime(df['date'])
-        df.set_index('datetime', inplace=True)
-        df = df[['open', 'high', 'low', 'close', 'volume']]
-
-        # Filter data within the specified date range
-        df = df.loc[start_date:end_date]
-
         # Ensure there's enough data for the specified MACD periods
         if len(df) < max(strategy_params_dict.get('short_ema', 12), strategy_params_dict.get('long_ema', 26), strategy_params_dict.get('signal_ema', 9)):
             return "Error: Not enough data available for the specified date range to calculate MACD."
@@ -83,6 +404,55 @@ class BackTraderUtils:
         if df.empty:
             return "Error: No data available for the specified date range."
 
+        # Make sure the save directory exists before either engine writes a plot
+        if save_fig:
+            directory = os.path.dirname(save_fig)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        with span("backtest.run", engine=engine, bars=len(df)):
+            if engine == "vectorized":
+                stats_dict = self._run_vectorized(df, strategy_params_dict, cash, save_fig, csv_file_path)
+            else:
+                stats_dict = self._run_cerebro(df, strategy_params_dict, cash, save_fig)
+
+        # Store the results in the global backtesting_result variable
+        backtesting_result = stats_dict
+
+        # Return the backtesting results as a formatted JSON string
+        full_report = json.dumps(stats_dict, indent=2)
+        if output == "full":
+            return "Back Test Finished. Results: \n" + full_report
+
+        # Compact form: the fixed metrics schema, with the full report stored on disk under a result id
+        context = {"csv_file_path": csv_file_path, "start_date": start_date, "end_date": end_date,
+                   "strategy_params": strategy_params_dict, "cash": cash, "engine": engine}
+        result_id = default_details.save(stats_dict, context)
+        metrics = json.dumps(compact_stats(stats_dict), separators=(",", ":"))
+        full_size = payload_size(full_report)
+        compact_size = payload_size(metrics)
+        return (
+            "Back Test Finished. Results: \n" + metrics
+            + f"\nresult_id={result_id} (full analyzer report: get_backtest_details_tool). "
+            + f"Payload ~{compact_size['tokens']} tokens ({compact_size['chars']} chars) vs ~{full_size['tokens']} tokens for the full report."
+        )
+
+    def _run_vectorized(self, df: pd.DataFrame, strategy_params_dict: Dict[str, int], cash: float, save_fig: Optional[str], csv_file_path: Optional[str] = None) -> Dict[str, any]:
+        # Evaluate the strategy with the NumPy engine, reading stored EMAs of the CSV when the store can serve them
+        stored_ema = default_indicators.lookup(csv_file_path, "seeded", df.index) if csv_file_path else None
+        vectorized_strategy = VectorizedMACDStrategy(**strategy_params_dict, stored_ema=stored_ema)
+        stats_dict = vectorized_strategy.run(df, cash)
+        if save_fig:
+            with span("backtest.plot"):
+                vectorized_strategy.plot(df, save_fig)
+        return stats_dict
+
+    def _run_cerebro(self, df: pd.DataFrame, strategy_params_dict: Dict[str, int], cash: float, save_fig: Optional[str]) -> Dict[str, any]:
+        # Initialize the Backtrader engine (imported here so the vectorized engine runs without it)
+        import backtrader as bt
+        cerebro = bt.Cerebro()
+        cerebro.addstrategy(_macd_strategy_class(), **strategy_params_dict)
+
         # Rename columns to match Backtrader's expected format
         df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
 
@@ -115,16 +485,11 @@ class BackTraderUtils:
 
         # Save a plot of the backtest results if a file path is provided
         if save_fig:
-            directory = os.path.dirname(save_fig)
-            if directory:
-                os.makedirs(directory, exist_ok=True)
-            plt.figure(figsize=(16, 10))
-            cerebro.plot()
-            plt.savefig(save_fig)
-            plt.close()
+            import matplotlib.pyplot as plt
+            with span("backtest.plot"):
+                plt.figure(figsize=(16, 10))
+                cerebro.plot()
+                plt.savefig(save_fig)
+                plt.close()
 
-        # Store the results in the global backtesting_result variable
-        backtesting_result = stats_dict
-
-        # Return the backtesting results as a formatted JSON string
-        return "Back Test Finished. Results: \n" + json.dumps(stats_dict, indent=2)
\ No newline at end of file
+        return stats_dict
@@ -0,0 +1,157 @@
+# batch_backtesting.py
+
+# This file defines `UniverseBacktester`, which runs the MACD strategy over many symbols and parameter sets at once.
+# Symbols are split into chunks that are backtested in a process pool; each worker loads a symbol once and evaluates
+# every parameter set on it, failures are recorded per symbol instead of aborting the run, and all results are
+# consolidated into a single table. With a pool, the bars of the universe are published once as shared frames
+# and workers read them zero-copy instead of each loading and caching its own copy.
+
+import os  # For CPU count and file paths
+import sys  # For progress output
+import time  # For elapsed-time reporting
+from contextlib import nullcontext  # For running without shared frames
+import pandas as pd  # For the consolidated results table
+from concurrent.futures import ProcessPoolExecutor, as_completed  # For multi-core execution
+from typing import Callable, Dict, List, Optional, Tuple  # For type annotations
+from backtesting import BackTraderUtils  # For loading data and running Backtrader backtests
+from optimization import MACDParameterSweep, SWEEP_METRICS  # For vectorized evaluation of parameter sets
+from data_store import DATA_DIR, list_universe  # For locating the symbols of the universe
+from result_summary import summarize_stats  # For reducing Backtrader stats to flat metrics
+from indicator_store import default_indicators  # For precomputed EMAs
+from shared_data import SharedFrames, SharedFramesHandle  # For the bars shared with the pool workers
+
+# Columns of the consolidated results table
+RESULT_COLUMNS = ["symbol", "short_ema", "long_ema", "signal_ema", *SWEEP_METRICS, "error"]
+
+def _backtest_symbol(csv_file_path: str, param_sets: List[Tuple[int, int, int]], start_date: str, end_date: str, cash: float, engine: str,
+                     df: Optional[pd.DataFrame] = None) -> List[Dict[str, any]]:
+    # Load one symbol once (unless its bars are given) and evaluate every parameter set on it
+    utils = BackTraderUtils()
+    df = utils.load_data(csv_file_path, start_date, end_date) if df is None else df
+    if df.empty:
+        raise ValueError("No data available for the specified date range.")
+    if engine == "vectorized":
+        sweep = MACDParameterSweep(df, cash, default_indicators.lookup(csv_file_path, "seeded", df.index))
+        return [sweep.evaluate(*params) for params in param_sets]
+    rows = []
+    for short_ema, long_ema, signal_ema in param_sets:
+        params = {"short_ema": short_ema, "long_ema": long_ema, "signal_ema": signal_ema}
+        stats_dict = utils._run_cerebro(df.copy(), params, cash, None)
+        rows.append({**params, **summarize_stats(stats_dict)})
+    return rows
+
+# Shared bars of the universe, set in each pool worker by the initializer
+_shared_frames: Optional[SharedFramesHandle] = None
+
+def _init_worker(shared_frames: Optional[SharedFramesHandle]):
+    global _shared_frames
+    _shared_frames = shared_frames
+
+def _backtest_chunk(work_unit: List[Tuple[str, str]], param_sets: List[Tuple[int, int, int]], start_date: str, end_date: str, cash: float, engine: str) -> List[Dict[str, any]]:
+    # Worker entry point: backtest a chunk of symbols, isolating failures to the symbol that raised them
+    rows = []
+    for symbol, csv_file_path in work_unit:
+        try:
+            df = _shared_frames.frame(symbol) if _shared_frames is not None and symbol in _shared_frames else None
+            rows.extend({"symbol": symbol, **row} for row in _backtest_symbol(csv_file_path, param_sets, start_date, end_date, cash, engine, df))
+        except Exception as e:
+            rows.append({"symbol": symbol, "error": f"{type(e).__name__}: {e}"})
+    return rows
+
+def print_progress(done: int, total: int, errors: int, elapsed: float):
+    # Default progress reporter: one status line rewritten in place
+    rate = done / elapsed if elapsed else 0.0
+    sys.stderr.write(f"\rBacktested {done}/{total} symbols ({errors} errors) in {elapsed:.1f}s, {rate:.1f} symbols/s")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+class UniverseBacktester:
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: Optional[int] = None, engine: str = "vectorized", share_data: bool = True):
+        # max_workers defaults to the CPU count; chunk_size defaults to about eight work units per worker;
+        # share_data publishes the bars once for all workers instead of letting each load its own copy
+        if engine not in ("backtrader", "vectorized"):
+            raise ValueError(f"Unknown engine '{engine}'. Use 'backtrader' or 'vectorized'.")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.engine = engine
+        self.share_data = share_data
+
+    def chunks(self, universe: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        # Split the universe into work units small enough to balance load but large enough to amortize dispatch
+        size = self.chunk_size or max(1, len(universe) // (self.max_workers * 8))
+        return [universe[i:i + size] for i in range(0, len(universe), size)]
+
+    def run(
+        self,
+        param_sets: List[Tuple[int, int, int]],
+        start_date: str,
+        end_date: str,
+        symbols: Optional[List[str]] = None,
+        data_dir: str = DATA_DIR,
+        cash: float = 10000.0,
+        progress: Optional[Callable[[int, int, int, float], None]] = print_progress,
+    ) -> pd.DataFrame:
+        # Backtest every symbol x parameter set and return one table with a row per pair (or per failed symbol)
+        universe = list_universe(data_dir, symbols)
+        work_units = self.chunks(universe)
+        rows: List[Dict[str, any]] = []
+        done = errors = 0
+        started = time.perf_counter()
+
+        def collect(work_unit, unit_rows):
+            nonlocal done, errors
+            rows.extend(unit_rows)
+            done += len(work_unit)
+            errors += sum(1 for row in unit_rows if row.get("error"))
+            if progress:
+                progress(done, len(universe), errors, time.perf_counter() - started)
+
+        if self.max_workers == 1:
+            # Run in-process, which keeps tracebacks and profilers simple for small jobs
+            for work_unit in work_units:
+                collect(work_unit, _backtest_chunk(work_unit, param_sets, start_date, end_date, cash, self.engine))
+        else:
+            shared = SharedFrames.from_universe(universe, start_date, end_date) if self.share_data else None
+            with shared or nullcontext(), ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                                              initargs=(shared.handle if shared else None,)) as executor:
+                futures = {
+                    executor.submit(_backtest_chunk, work_unit, param_sets, start_date, end_date, cash, self.engine): work_unit
+                    for work_unit in work_units
+                }
+                for future in as_completed(futures):
+                    work_unit = futures[future]
+                    try:
+                        unit_rows = future.result()
+                    except Exception as e:
+                        # A crashed worker only loses its own chunk
+                        unit_rows = [{"symbol": symbol, "error": f"{type(e).__name__}: {e}"} for symbol, _ in work_unit]
+                    collect(work_unit, unit_rows)
+
+        results = pd.DataFrame(rows, columns=RESULT_COLUMNS)
+        return results.sort_values(["symbol", "short_ema", "long_ema", "signal_ema"], kind="mergesort").reset_index(drop=True)
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for batch runs
+    from optimization import parse_range
+
+    parser = argparse.ArgumentParser(description="Backtest the MACD strategy across the symbols in data/DailyData.")
+    parser.add_argument("--start-date", default="2022-01-01")
+    parser.add_argument("--end-date", default="2024-01-01")
+    parser.add_argument("--short-ema", default="12", help="short_ema values as 'start:stop:step' or a comma list")
+    parser.add_argument("--long-ema", default="26", help="long_ema values as 'start:stop:step' or a comma list")
+    parser.add_argument("--signal-ema", default="9", help="signal_ema values as 'start:stop:step' or a comma list")
+    parser.add_argument("--symbols", default=None, help="Comma separated symbols (default: every CSV in --data-dir)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--engine", default="vectorized", choices=("vectorized", "backtrader"))
+    parser.add_argument("--output", default="universe_backtest.csv")
+    args = parser.parse_args()
+
+    param_sets = MACDParameterSweep.grid(parse_range(args.short_ema), parse_range(args.long_ema), parse_range(args.signal_ema))
+    backtester = UniverseBacktester(args.workers, args.chunk_size, args.engine)
+    results = backtester.run(param_sets, args.start_date, args.end_date, args.symbols.split(",") if args.symbols else None, args.data_dir, args.cash)
+    results.to_csv(args.output, index=False)
+    print(f"Saved {len(results)} rows to {args.output}")
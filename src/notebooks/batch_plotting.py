@@ -0,0 +1,301 @@
+# batch_plotting.py
+
+# This file defines `BatchChartRenderer`, which renders MACD chart packs for many symbols without a display.
+# Charts are drawn with the Agg canvas directly (no pyplot, no GUI backend), each worker process builds one figure
+# template with its panels, lines and legends and only swaps the data between symbols, symbols are split into
+# chunks rendered in a process pool, and ranges with more bars than the price panel has pixels are downsampled to
+# one OHLC bar per pixel column. The output is a directory of PNGs plus a manifest.json with per-chart timings.
+
+import json  # For the manifest
+import os  # For CPU count and file paths
+import sys  # For progress output
+import time  # For per-chart timings
+import numpy as np  # For downsampling and drawing arrays
+import pandas as pd  # For the date-indexed frames
+from concurrent.futures import ProcessPoolExecutor, as_completed  # For multi-core rendering
+from typing import Callable, Dict, List, Optional, Tuple  # For type annotations
+from data_processing import MACD_COLUMNS, MACDDataProcessor, bucket_bounds  # For the same MACD components and buckets as MACDPlotter
+from data_store import DATA_DIR, list_universe  # For locating the symbols of the universe
+
+def downsample_ohlc(df: pd.DataFrame, indicators: Dict[str, pd.Series], max_points: int) -> Tuple[pd.DataFrame, Dict[str, np.ndarray], np.ndarray]:
+    # Merge consecutive bars into at most max_points buckets: first open, highest high, lowest low, last close and
+    # summed volume per bucket, and the last value of each indicator. Also returns, per bucket, the index of its last
+    # bar in df so crossovers can be mapped onto the buckets.
+    n = len(df)
+    if n <= max_points:
+        return df, {name: series.to_numpy(dtype=np.float64) for name, series in indicators.items()}, np.arange(n)
+    starts, ends = bucket_bounds(n, max_points)
+    high = df['high'].to_numpy(dtype=np.float64)
+    low = df['low'].to_numpy(dtype=np.float64)
+    volume = df['volume'].to_numpy(dtype=np.float64)
+    buckets = pd.DataFrame({
+        'open': df['open'].to_numpy(dtype=np.float64)[starts],
+        'high': np.fmax.reduceat(high, starts),
+        'low': np.fmin.reduceat(low, starts),
+        'close': df['close'].to_numpy(dtype=np.float64)[ends],
+        'volume': np.add.reduceat(np.nan_to_num(volume), starts),
+    }, index=df.index[ends])
+    return buckets, {name: series.to_numpy(dtype=np.float64)[ends] for name, series in indicators.items()}, ends
+
+class MACDChartTemplate:
+    def __init__(self, width: float = 15.0, height: float = 9.0, dpi: int = 100):
+        # Build the figure once: price, volume and MACD panels with their lines and legends, laid out like
+        # MACDPlotter.plot_macd (panel ratios 5:2:6, legends to the right of the panels)
+        from matplotlib.backends.backend_agg import FigureCanvasAgg  # Headless canvas, independent of pyplot's backend
+        from matplotlib.figure import Figure
+        from matplotlib.ticker import EngFormatter
+
+        self.dpi = dpi
+        self.figure = Figure(figsize=(width, height), dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        grid = self.figure.add_gridspec(3, 1, height_ratios=(5, 2, 6), hspace=0.05, left=0.07, right=0.75, top=0.9, bottom=0.08)
+        self.price_ax = self.figure.add_subplot(grid[0])
+        self.volume_ax = self.figure.add_subplot(grid[1], sharex=self.price_ax)
+        self.macd_ax = self.figure.add_subplot(grid[2], sharex=self.price_ax)
+        self.title = self.figure.suptitle('MACD with EMA and Histogram', y=0.95, fontsize=12)
+
+        self.ema_short_line, = self.price_ax.plot([], [], color='red', linewidth=2.0, label='EMA Short')
+        self.ema_long_line, = self.price_ax.plot([], [], color='green', linewidth=2.0, label='EMA Long')
+        self.macd_line, = self.macd_ax.plot([], [], color='blue', linewidth=2.0, label='MACD')
+        self.signal_line, = self.macd_ax.plot([], [], color='magenta', linewidth=2.0, label='Signal')
+        self.crossover_marks, = self.macd_ax.plot([], [], color='purple', marker='o', markersize=7, linestyle='None', label='Crossovers')
+        self.price_ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1))
+        self.macd_ax.legend(loc='upper left', bbox_to_anchor=(1.02, 1))
+        self.price_ax.set_ylabel('Price')
+        self.volume_ax.set_ylabel('Volume')
+        self.macd_ax.set_ylabel('MACD')
+        self.volume_ax.yaxis.set_major_formatter(EngFormatter())
+        for ax in (self.price_ax, self.volume_ax):
+            ax.tick_params(labelbottom=False)
+        self._collections = []  # Per-symbol candles, volume and histogram, replaced on every draw
+
+    @property
+    def pixel_width(self) -> int:
+        # Width of the price panel in pixels, i.e. the most bars that can be told apart
+        return int(self.price_ax.get_position().width * self.figure.get_figwidth() * self.dpi)
+
+    def draw(self, df: pd.DataFrame, lines: Dict[str, np.ndarray], crossovers: np.ndarray, title: str):
+        # Replace the data of the template with one symbol's (possibly downsampled) bars and indicators
+        from matplotlib.collections import LineCollection
+
+        for collection in self._collections:
+            collection.remove()
+        x = np.arange(len(df), dtype=np.float64)
+        open_, high, low, close = (df[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close'))
+        colors = np.where(close >= open_, 'green', 'red')
+        volume = np.nan_to_num(df['volume'].to_numpy(dtype=np.float64))
+        histogram = np.nan_to_num(lines['histogram'])
+
+        # Bars are vertical segments whose width follows the space each bar gets, but never drops below one pixel,
+        # so downsampled charts stay legible. Collections sit below the indicator lines.
+        bar_width = max(0.7 * self.pixel_width / max(len(df), 1), 1.0) * 72.0 / self.dpi  # In points
+
+        def bars(bottom, top, bar_colors, width):
+            return LineCollection(np.stack([np.column_stack([x, bottom]), np.column_stack([x, top])], axis=1),
+                                  colors=bar_colors, linewidths=width, antialiaseds=False, zorder=1)
+
+        zeros = np.zeros_like(x)
+        self._collections = [
+            self.price_ax.add_collection(bars(low, high, colors, min(bar_width, 72.0 / self.dpi))),  # Wicks
+            self.price_ax.add_collection(bars(np.minimum(open_, close), np.maximum(open_, close), colors, bar_width)),  # Bodies
+            self.volume_ax.add_collection(bars(zeros, volume, colors, bar_width)),
+            self.macd_ax.add_collection(bars(zeros, histogram, np.where(histogram >= 0, 'green', 'red'), bar_width)),
+        ]
+
+        self.ema_short_line.set_data(x, lines['ema_short'])
+        self.ema_long_line.set_data(x, lines['ema_long'])
+        self.macd_line.set_data(x, lines['macd'])
+        self.signal_line.set_data(x, lines['signal'])
+        self.crossover_marks.set_data(x[crossovers], lines['macd'][crossovers])
+
+        # Limits from the data, since collections do not take part in autoscaling
+        self.price_ax.set_xlim(-1, len(df))
+        price_values = np.concatenate([low, high, lines['ema_short'], lines['ema_long']])
+        self._set_ylim(self.price_ax, price_values)
+        self.volume_ax.set_ylim(0, max(float(volume.max(initial=0.0)) * 1.05, 1.0))
+        self._set_ylim(self.macd_ax, np.concatenate([lines['macd'], lines['signal'], histogram]))
+
+        # Date labels on the shared x axis, as mplfinance does with datetime_format '%b %Y'
+        ticks = np.unique(np.linspace(0, len(df) - 1, num=min(8, len(df))).astype(np.int64))
+        self.macd_ax.set_xticks(ticks)
+        self.macd_ax.set_xticklabels(df.index[ticks].strftime('%b %Y'))
+        self.title.set_text(title)
+
+    @staticmethod
+    def _set_ylim(ax, values: np.ndarray):
+        values = values[np.isfinite(values)]
+        if values.size:
+            low, high = float(values.min()), float(values.max())
+            pad = (high - low) * 0.05 or abs(high) * 0.05 or 1.0
+            ax.set_ylim(low - pad, high + pad)
+
+    def save(self, path: str):
+        self.figure.savefig(path, dpi=self.dpi)
+
+# One template per worker process, created on its first chart and reused for the rest
+_template: Optional[MACDChartTemplate] = None
+_template_key: Optional[tuple] = None
+
+def _get_template(width: float, height: float, dpi: int) -> MACDChartTemplate:
+    global _template, _template_key
+    if _template is None or _template_key != (width, height, dpi):
+        _template, _template_key = MACDChartTemplate(width, height, dpi), (width, height, dpi)
+    return _template
+
+def render_chart(symbol: str, csv_file_path: str, start_date: str, end_date: str, output_dir: str,
+                 width: float = 15.0, height: float = 9.0, dpi: int = 100, max_points: Optional[int] = None,
+                 short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9) -> Dict[str, any]:
+    # Render one symbol's MACD chart to output_dir/<symbol>.png and return its manifest entry with phase timings
+    timings = {}
+    started = time.perf_counter()
+    processor = MACDDataProcessor(csv_file_path)
+    processor.filter_data(start_date, end_date)
+    df = processor.filtered_data
+    if df.empty:
+        raise ValueError("No data available for the specified date range.")
+    timings["load"] = time.perf_counter() - started
+
+    phase = time.perf_counter()
+    template = _get_template(width, height, dpi)  # Only the first chart of a worker pays for building the figure
+    timings["setup"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    components = processor.calculate_macd(short_ema, long_ema, signal_ema)
+    macd, signal = components['macd'], components['signal']
+    # Same crossover points as MACDPlotter.plot_macd
+    crossover_points = ((macd.shift(1) > signal.shift(1)) & (macd <= signal)) | ((macd.shift(1) < signal.shift(1)) & (macd >= signal))
+    indicators = {column: components[column] for column in MACD_COLUMNS}
+    bars, lines, bucket_ends = downsample_ohlc(df, indicators, max_points or template.pixel_width)
+    # A bucket is marked when any bar in it is a crossover
+    crossed = np.flatnonzero(crossover_points.to_numpy())
+    crossovers = np.unique(np.searchsorted(bucket_ends, crossed))
+    timings["compute"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    title = f"{symbol}: MACD ({short_ema}, {long_ema}, {signal_ema}) with EMA and Histogram ({df.index[0]:%Y-%m-%d} to {df.index[-1]:%Y-%m-%d})"
+    template.draw(bars, lines, crossovers, title)
+    timings["render"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    path = os.path.join(output_dir, f"{symbol}.png")
+    template.save(path)
+    timings["save"] = time.perf_counter() - phase
+    timings["total"] = time.perf_counter() - started
+    return {"symbol": symbol, "path": os.path.basename(path), "bars": len(df), "plotted_bars": len(bars),
+            "crossovers": int(crossover_points.sum()), "seconds": {name: round(value, 6) for name, value in timings.items()}}
+
+def _render_chunk(work_unit: List[Tuple[str, str]], start_date: str, end_date: str, output_dir: str, options: Dict[str, any]) -> List[Dict[str, any]]:
+    # Worker entry point: render a chunk of symbols, isolating failures to the symbol that raised them
+    entries = []
+    for symbol, csv_file_path in work_unit:
+        started = time.perf_counter()
+        try:
+            entries.append(render_chart(symbol, csv_file_path, start_date, end_date, output_dir, **options))
+        except Exception as e:
+            entries.append({"symbol": symbol, "error": f"{type(e).__name__}: {e}", "seconds": {"total": round(time.perf_counter() - started, 6)}})
+    return entries
+
+def print_progress(done: int, total: int, errors: int, elapsed: float):
+    # Default progress reporter: one status line rewritten in place
+    rate = done / elapsed if elapsed else 0.0
+    sys.stderr.write(f"\rRendered {done}/{total} charts ({errors} errors) in {elapsed:.1f}s, {rate:.1f} charts/s")
+    if done == total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+class BatchChartRenderer:
+    def __init__(self, max_workers: Optional[int] = None, chunk_size: Optional[int] = None, width: float = 15.0, height: float = 9.0,
+                 dpi: int = 100, max_points: Optional[int] = None, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9):
+        # max_workers defaults to the CPU count; max_points defaults to the pixel width of the price panel
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.options = {"width": width, "height": height, "dpi": dpi, "max_points": max_points,
+                        "short_ema": short_ema, "long_ema": long_ema, "signal_ema": signal_ema}
+
+    def chunks(self, universe: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        # Work units of several symbols, so each worker reuses its figure template across them
+        size = self.chunk_size or max(1, len(universe) // (self.max_workers * 4))
+        return [universe[i:i + size] for i in range(0, len(universe), size)]
+
+    def run(
+        self,
+        start_date: str,
+        end_date: str,
+        output_dir: str,
+        symbols: Optional[List[str]] = None,
+        data_dir: str = DATA_DIR,
+        progress: Optional[Callable[[int, int, int, float], None]] = print_progress,
+    ) -> Dict[str, any]:
+        # Render a chart per symbol into output_dir, write output_dir/manifest.json and return the manifest
+        os.makedirs(output_dir, exist_ok=True)
+        universe = list_universe(data_dir, symbols)
+        work_units = self.chunks(universe)
+        entries: List[Dict[str, any]] = []
+        done = errors = 0
+        started = time.perf_counter()
+
+        def collect(work_unit, unit_entries):
+            nonlocal done, errors
+            entries.extend(unit_entries)
+            done += len(work_unit)
+            errors += sum(1 for entry in unit_entries if entry.get("error"))
+            if progress:
+                progress(done, len(universe), errors, time.perf_counter() - started)
+
+        if self.max_workers == 1:
+            for work_unit in work_units:
+                collect(work_unit, _render_chunk(work_unit, start_date, end_date, output_dir, self.options))
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    executor.submit(_render_chunk, work_unit, start_date, end_date, output_dir, self.options): work_unit
+                    for work_unit in work_units
+                }
+                for future in as_completed(futures):
+                    work_unit = futures[future]
+                    try:
+                        unit_entries = future.result()
+                    except Exception as e:
+                        # A crashed worker only loses its own chunk
+                        unit_entries = [{"symbol": symbol, "error": f"{type(e).__name__}: {e}"} for symbol, _ in work_unit]
+                    collect(work_unit, unit_entries)
+
+        elapsed = time.perf_counter() - started
+        manifest = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "options": self.options,
+            "workers": self.max_workers,
+            "charts": len(entries) - errors,
+            "errors": errors,
+            "elapsed_seconds": round(elapsed, 3),
+            "entries": sorted(entries, key=lambda entry: entry["symbol"]),
+        }
+        with open(os.path.join(output_dir, "manifest.json"), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        return manifest
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for chart packs
+
+    parser = argparse.ArgumentParser(description="Render MACD charts for the symbols in data/DailyData.")
+    parser.add_argument("--start-date", default="2022-01-01")
+    parser.add_argument("--end-date", default="2024-01-01")
+    parser.add_argument("--symbols", default=None, help="Comma separated symbols (default: every CSV in --data-dir)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output-dir", default="charts")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--width", type=float, default=15.0, help="Figure width in inches")
+    parser.add_argument("--height", type=float, default=9.0, help="Figure height in inches")
+    parser.add_argument("--dpi", type=int, default=100)
+    parser.add_argument("--max-points", type=int, default=None, help="Most bars per chart (default: the pixel width of the price panel)")
+    parser.add_argument("--short-ema", type=int, default=12)
+    parser.add_argument("--long-ema", type=int, default=26)
+    parser.add_argument("--signal-ema", type=int, default=9)
+    args = parser.parse_args()
+
+    renderer = BatchChartRenderer(args.workers, args.chunk_size, args.width, args.height, args.dpi, args.max_points,
+                                  args.short_ema, args.long_ema, args.signal_ema)
+    manifest = renderer.run(args.start_date, args.end_date, args.output_dir, args.symbols.split(",") if args.symbols else None, args.data_dir)
+    print(f"Rendered {manifest['charts']} charts ({manifest['errors']} errors) to {args.output_dir} in {manifest['elapsed_seconds']:.1f}s")
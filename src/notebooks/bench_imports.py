@@ -0,0 +1,92 @@
+# bench_imports.py
+
+# This file measures how long it takes a fresh interpreter to import the modules used by pool workers, command-line
+# batch jobs and the agents, and checks that the worker-facing modules do not pull in the agent, plotting or Backtrader
+# stacks. Each module is imported in its own subprocess a few times and the median wall time is reported; the exit
+# status is non-zero when a module exceeds its time budget or loads a forbidden package, so it can guard startup time.
+#
+#   python bench_imports.py                 # report all modules
+#   python bench_imports.py --repeat 10     # more samples per module
+
+import json  # For passing results back from the subprocesses
+import os  # For the working directory of the subprocesses
+import statistics  # For the median of the samples
+import subprocess  # For importing each module in a fresh interpreter
+import sys  # For the interpreter path and exit status
+from typing import Dict, List, Tuple  # For type annotations
+
+# Packages that must stay out of lightweight imports: the agent framework, plotting and Backtrader
+HEAVY_PACKAGES = ("autogen", "openai", "matplotlib", "mplfinance", "IPython", "backtrader")
+
+# (module, time budget in seconds, whether heavy packages are allowed) for the startup paths we care about
+MODULES: List[Tuple[str, float, bool]] = [
+    ("settings", 0.05, False),
+    ("data_store", 1.0, False),
+    ("market_data", 1.0, False),
+    ("shared_data", 1.0, False),
+    ("indicator_store", 1.0, False),
+    ("data_processing", 1.0, False),
+    ("streaming", 1.0, False),
+    ("scanner", 1.0, False),
+    ("portfolio", 1.0, False),
+    ("backtesting", 1.0, False),
+    ("optimization", 1.0, False),
+    ("walk_forward", 1.0, False),
+    ("local_search", 1.0, False),
+    ("batch_backtesting", 1.0, False),
+    ("tools", 1.5, False),
+    ("agents", 10.0, True),
+]
+
+# Code run in the subprocess: time the import and report which heavy packages ended up loaded
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+def measure(module: str, repeat: int = 5) -> Dict[str, any]:
+    # Median import time of a module over `repeat` fresh interpreters, plus the heavy packages it loaded
+    directory = os.path.dirname(os.path.abspath(__file__))
+    samples, heavy = [], []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+            cwd=directory, capture_output=True, text=True,
+        )
+        if completed.returncode != 0:
+            return {"module": module, "error": completed.stderr.strip().splitlines()[-1]}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        heavy = result["heavy"]
+    return {"module": module, "seconds": statistics.median(samples), "heavy": heavy}
+
+def run(repeat: int = 5) -> bool:
+    # Print one line per module and return whether every module met its budget
+    ok = True
+    for module, budget, heavy_allowed in MODULES:
+        result = measure(module, repeat)
+        if "error" in result:
+            print(f"{module:<20} ERROR  {result['error']}")
+            ok = False
+            continue
+        problems = []
+        if result["seconds"] > budget:
+            problems.append(f"over budget of {budget:.2f}s")
+        if result["heavy"] and not heavy_allowed:
+            problems.append(f"loads {', '.join(result['heavy'])}")
+        ok = ok and not problems
+        status = "FAIL" if problems else "ok"
+        print(f"{module:<20} {result['seconds'] * 1000:8.1f} ms  {status:<4} {'; '.join(problems)}")
+    return ok
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for the benchmark
+
+    parser = argparse.ArgumentParser(description="Measure cold import times of the MACD modules.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.repeat) else 1)
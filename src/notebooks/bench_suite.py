@@ -0,0 +1,280 @@
+# bench_suite.py
+
+# This file is a reproducible benchmark suite for the data loading, MACD computation, backtesting, plotting and tool
+# paths, run on real files from data/DailyData at several sizes (one symbol, 100 symbols, the full universe) and for
+# a short and a full date range. Every case runs in a fresh interpreter so its wall time and peak RSS are not skewed by
+# earlier cases. Results are appended to a history file and compared against the median of the last few runs on the
+# same machine, flagging regressions that exceed both a relative threshold and an absolute noise floor; cases too short
+# to time reliably are reported without a verdict.
+#
+#   python bench_suite.py --quick               # skip the full-universe cases
+#   python bench_suite.py --cases backtest      # only cases whose name contains "backtest"
+#   python bench_suite.py --list                # show the cases without running them
+
+import json  # For passing results between processes and for the history file
+import os  # For file paths and environment variables
+import platform  # For tagging runs with the machine they ran on
+import resource  # For peak RSS
+import statistics  # For the median of the repeats
+import subprocess  # For running each case in a fresh interpreter
+import sys  # For the interpreter path and exit status
+import tempfile  # For cold-cache runs
+import time  # For wall time
+from typing import Callable, Dict, List, Optional, Tuple  # For type annotations
+from data_store import DATA_DIR, list_universe  # For locating the symbols of the universe
+from settings import company  # The configured company is the single-symbol case
+
+# Default location of the run history
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'benchmarks', 'bench_suite.json')
+
+# Runs kept in the history file
+HISTORY_RUNS = 20
+
+# Date ranges: one year of bars, and every bar in the file
+RANGES = {"short": ("2023-01-01", "2024-01-01"), "full": (None, None)}
+
+# A case is slower than its baseline when its median wall time grows by more than this fraction
+REGRESSION_THRESHOLD = 0.20
+
+# ... and by more than this many seconds, so scheduler noise on short cases is not flagged
+NOISE_FLOOR_SECONDS = 0.05
+
+# Cases whose baseline is shorter than this are too noisy for the relative test and get no verdict
+MIN_SECONDS = 0.1
+
+# Number of earlier runs on the same machine whose median is the baseline
+BASELINE_RUNS = 5
+
+def symbols_for(size: str) -> List[Tuple[str, str]]:
+    # (symbol, csv path) pairs for a size: the configured company, 100 symbols spread over the universe, or all of them
+    universe = list_universe(DATA_DIR)
+    if size == "1":
+        return list_universe(DATA_DIR, [company])
+    if size == "100":
+        return universe[::max(1, len(universe) // 100)][:100]
+    return universe
+
+# Case bodies. Each takes (symbols, start_date, end_date) and returns (units processed, unit name), plus the seconds
+# of the measured section when setup should not count.
+
+def case_load(symbols, start_date, end_date):
+    # Construct MACDDataProcessor (parse or memory-map the CSV) and filter it
+    from data_processing import MACDDataProcessor
+    bars = 0
+    for _, path in symbols:
+        processor = MACDDataProcessor(path)
+        processor.filter_data(start_date, end_date)
+        bars += len(processor.filtered_data)
+    return bars, "bars"
+
+def case_macd(symbols, start_date, end_date):
+    # MACDDataProcessor.calculate_macd on data that is already loaded
+    from data_processing import MACDDataProcessor
+    processors = []
+    for _, path in symbols:
+        processor = MACDDataProcessor(path)
+        processor.filter_data(start_date, end_date)
+        processors.append(processor)
+    started = time.perf_counter()
+    bars = 0
+    for processor in processors:
+        bars += len(processor.calculate_macd())
+    return bars, "bars", time.perf_counter() - started
+
+def _backtest(symbols, start_date, end_date, engine):
+    from backtesting import BackTraderUtils
+    utils = BackTraderUtils()
+    count = 0
+    for _, path in symbols:
+        result = utils.back_test_macd(path, start_date or "1900-01-01", end_date or "2100-01-01", "", 10000.0, None, engine)
+        count += result.startswith("Back Test Finished")
+    return count, "backtests"
+
+def case_backtest_backtrader(symbols, start_date, end_date):
+    # BackTraderUtils.back_test_macd through Cerebro, without a figure
+    return _backtest(symbols, start_date, end_date, "backtrader")
+
+def case_backtest_vectorized(symbols, start_date, end_date):
+    # BackTraderUtils.back_test_macd through the vectorized engine, without a figure
+    return _backtest(symbols, start_date, end_date, "vectorized")
+
+def case_universe_backtest(symbols, start_date, end_date):
+    # UniverseBacktester over the symbols with the default parameter set, using every core
+    from batch_backtesting import UniverseBacktester
+    results = UniverseBacktester().run([(12, 26, 9)], start_date, end_date, [symbol for symbol, _ in symbols], progress=None)
+    return int(results["error"].isna().sum()), "backtests"
+
+def case_plot_mplfinance(symbols, start_date, end_date):
+    # MACDPlotter.plot_macd, the chart the agents request
+    import matplotlib
+    matplotlib.use("Agg")
+    from plotting import MACDPlotter
+    with tempfile.TemporaryDirectory() as directory:
+        for symbol, path in symbols:
+            MACDPlotter(path).plot_macd(start_date, end_date, os.path.join(directory, f"{symbol}.png"))
+    return len(symbols), "charts"
+
+def case_plot_batch(symbols, start_date, end_date):
+    # BatchChartRenderer chart packs, using every core
+    from batch_plotting import BatchChartRenderer
+    with tempfile.TemporaryDirectory() as directory:
+        manifest = BatchChartRenderer().run(start_date, end_date, directory, [symbol for symbol, _ in symbols], progress=None)
+    return manifest["charts"], "charts"
+
+def case_scan(symbols, start_date, end_date):
+    # MACDCrossoverScanner over the symbols
+    from scanner import MACDCrossoverScanner
+    scanner = MACDCrossoverScanner(symbols, start_date, end_date)
+    scanner.scan()
+    return int(scanner.present.sum()), "bars"
+
+def case_tool_round_trip(symbols, start_date, end_date):
+    # The tool calls of one agent turn (plot, then backtest) without the result cache. The LLM calls of main.py
+    # need network access and API keys, so they are not part of the suite.
+    import matplotlib
+    matplotlib.use("Agg")
+    from tools import backtest_macd_tool, plot_macd_tool
+    with tempfile.TemporaryDirectory() as directory:
+        for symbol, path in symbols:
+            plot_macd_tool(path, start_date or "1900-01-01", end_date or "2100-01-01", os.path.join(directory, f"{symbol}.png"), use_cache=False)
+            backtest_macd_tool(path, start_date or "1900-01-01", end_date or "2100-01-01", use_cache=False)
+    return len(symbols), "turns"
+
+# (name, body, sizes, ranges, cold cache). Cold cases use an empty OHLCV cache directory so CSVs are parsed.
+CASES: List[Tuple[str, Callable, Tuple[str, ...], Tuple[str, ...], bool]] = [
+    ("load_cold", case_load, ("1", "100"), ("full",), True),
+    ("load_warm", case_load, ("1", "100", "universe"), ("short", "full"), False),
+    ("macd", case_macd, ("1", "100", "universe"), ("short", "full"), False),
+    ("backtest_backtrader", case_backtest_backtrader, ("1", "100"), ("short", "full"), False),
+    ("backtest_vectorized", case_backtest_vectorized, ("1", "100", "universe"), ("short", "full"), False),
+    ("universe_backtest", case_universe_backtest, ("100", "universe"), ("short", "full"), False),
+    ("plot_mplfinance", case_plot_mplfinance, ("1",), ("short", "full"), False),
+    ("plot_batch", case_plot_batch, ("1", "100"), ("short", "full"), False),
+    ("scan", case_scan, ("100", "universe"), ("short", "full"), False),
+    ("tool_round_trip", case_tool_round_trip, ("1",), ("short",), False),
+]
+
+def expand_cases(pattern: Optional[str] = None, quick: bool = False) -> List[Dict[str, any]]:
+    # Every (case, size, range) combination, optionally filtered by name and without the universe-sized ones
+    expanded = []
+    for name, _, sizes, ranges, cold in CASES:
+        for size in sizes:
+            if quick and size == "universe":
+                continue
+            for range_name in ranges:
+                case_id = f"{name}[{size}-{range_name}]"
+                if pattern is None or pattern in case_id:
+                    expanded.append({"id": case_id, "name": name, "size": size, "range": range_name, "cold": cold})
+    return expanded
+
+def run_case_in_process(name: str, size: str, range_name: str) -> Dict[str, any]:
+    # Body of the child process: run one case and report its wall time, peak RSS and units processed
+    body = next(case[1] for case in CASES if case[0] == name)
+    symbols = symbols_for(size)
+    start_date, end_date = RANGES[range_name]
+    started = time.perf_counter()
+    outcome = body(symbols, start_date, end_date)
+    seconds = outcome[2] if len(outcome) > 2 else time.perf_counter() - started
+    # ru_maxrss is in kilobytes on Linux; children covers the process pools
+    peak_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {"seconds": seconds, "peak_rss_mb": peak_kb / 1024.0, "units": outcome[0], "unit": outcome[1], "symbols": len(symbols)}
+
+def measure(case: Dict[str, any], repeat: int) -> Dict[str, any]:
+    # Median wall time and largest peak RSS of a case over `repeat` fresh interpreters
+    directory = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeat):
+        env = dict(os.environ, MACD_RESULT_CACHE="0")
+        with tempfile.TemporaryDirectory() as cold_cache:
+            if case["cold"]:
+                env["MACD_CACHE_DIR"] = cold_cache
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run-case", case["name"], case["size"], case["range"]],
+                cwd=directory, env=env, capture_output=True, text=True,
+            )
+        if completed.returncode != 0:
+            return {**case, "error": (completed.stderr.strip().splitlines() or ["exited with status %d" % completed.returncode])[-1]}
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    seconds = statistics.median(sample["seconds"] for sample in samples)
+    return {
+        **case,
+        "seconds": seconds,
+        "peak_rss_mb": max(sample["peak_rss_mb"] for sample in samples),
+        "units": samples[0]["units"],
+        "unit": samples[0]["unit"],
+        "symbols": samples[0]["symbols"],
+        "throughput": samples[0]["units"] / seconds if seconds else float('nan'),
+    }
+
+def load_history(path: str) -> List[Dict[str, any]]:
+    try:
+        with open(path) as history_file:
+            return json.load(history_file)["runs"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+def save_history(path: str, runs: List[Dict[str, any]]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as history_file:
+        json.dump({"runs": runs[-HISTORY_RUNS:]}, history_file, indent=2)
+
+def baseline_for(runs: List[Dict[str, any]], case_id: str) -> Optional[Dict[str, any]]:
+    # The case's baseline on this machine: the median seconds over its last BASELINE_RUNS earlier results
+    seconds = [run["results"][case_id]["seconds"] for run in runs
+               if run.get("machine") == platform.node() and case_id in run["results"]][-BASELINE_RUNS:]
+    if not seconds:
+        return None
+    return {"seconds": statistics.median(seconds), "runs": len(seconds)}
+
+def compare(seconds: float, baseline_seconds: float) -> Tuple[Optional[float], bool]:
+    # Relative change against the baseline (None when the case is too short to judge) and whether it is a regression
+    if baseline_seconds < MIN_SECONDS:
+        return None, False
+    delta = seconds / baseline_seconds - 1.0
+    return delta, delta > REGRESSION_THRESHOLD and seconds - baseline_seconds > NOISE_FLOOR_SECONDS
+
+def run(pattern: Optional[str] = None, quick: bool = False, repeat: int = 3, history_path: str = HISTORY_PATH) -> bool:
+    # Run the suite, print one line per case with the change against the baseline, and store the run
+    runs = load_history(history_path)
+    results = {}
+    ok = True
+    print(f"{'case':<42} {'median':>10} {'peak RSS':>10} {'throughput':>22} {'vs baseline':>12}")
+    for case in expand_cases(pattern, quick):
+        result = measure(case, repeat)
+        if "error" in result:
+            print(f"{case['id']:<42} ERROR {result['error']}")
+            ok = False
+            continue
+        results[case["id"]] = {key: result[key] for key in ("seconds", "peak_rss_mb", "units", "unit", "symbols", "throughput")}
+        baseline = baseline_for(runs, case["id"])
+        change = ""
+        if baseline:
+            delta, regressed = compare(result["seconds"], baseline["seconds"])
+            ok = ok and not regressed
+            change = "too short" if delta is None else f"{delta:+.0%}{' REGRESSION' if regressed else ''}"
+        throughput = f"{result['throughput']:,.1f} {result['unit']}/s"
+        print(f"{case['id']:<42} {result['seconds']:>9.3f}s {result['peak_rss_mb']:>8.0f}MB {throughput:>22} {change:>12}")
+    runs.append({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "machine": platform.node(), "python": platform.python_version(),
+                 "cpus": os.cpu_count(), "repeat": repeat, "results": results})
+    save_history(history_path, runs)
+    return ok
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for the suite
+
+    parser = argparse.ArgumentParser(description="Benchmark loading, MACD, backtesting and plotting on data/DailyData.")
+    parser.add_argument("--cases", default=None, help="Only run cases whose id contains this text, e.g. 'backtest' or '[1-short]'")
+    parser.add_argument("--quick", action="store_true", help="Skip the full-universe cases")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per case; the median wall time is reported")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON file holding previous runs; the median of the last few is the baseline")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    parser.add_argument("--run-case", nargs=3, metavar=("NAME", "SIZE", "RANGE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case_in_process(*args.run_case)))
+    elif args.list:
+        for case in expand_cases(args.cases, args.quick):
+            print(case["id"])
+    else:
+        sys.exit(0 if run(args.cases, args.quick, args.repeat, args.history) else 1)
@@ -1,49 +1,38 @@
 # config.py
-# This configuration file sets up the environment and necessary configurations for running backtesting and trading analysis. 
+# This configuration file sets up the environment and necessary configurations for running backtesting and trading analysis.
+# The run settings live in settings.py and are re-exported here. The LLM configurations are only loaded from the
+# configuration file (and autogen only imported) the first time one of them is accessed, e.g. `from config import llm_config`.
 
-# Agent-related imports
-import autogen
-from autogen import AssistantAgent, UserProxyAgent, register_function
-from autogen.agentchat.contrib.multimodal_conversable_agent import MultimodalConversableAgent
-from autogen.cache import Cache
-
-# Data manipulation and handling
-import pandas as pd
-
-# Plotting and visualization
-import matplotlib.pyplot as plt
-import mplfinance as mpf
-from IPython.display import Image, display
-
-# Backtesting and trading analysis
-import backtrader as bt
-
-# Standard library imports
-import json
-import os
-from textwrap import dedent
-from typing import Optional, Dict, Annotated
+from functools import lru_cache  # For loading each configuration once
 
 # Configuration for backtesting
-company = "AAKASH"  # The company for which financial data will be analyzed
-start_date = "2022-01-01"  # Start date for the backtest
-end_date = "2024-01-01"  # End date for the backtest
-file_path = f'../../data/DailyData/{company}.csv'  # Path to the data file
-
-# Global variable to store backtesting results
-backtesting_result = None
+from settings import company, start_date, end_date, file_path, config_file, backtesting_result
 
 # Function to load specific configurations from a JSON file
 def load_config(filter_model: str):
+    import autogen  # Deferred: importing autogen takes seconds and is only needed by the agents
     return autogen.config_list_from_json(
-        "./CONFIG.json",  # Path to the configuration file
+        config_file,  # Path to the configuration file
         filter_dict={"model": [filter_model]},  # Filter configurations based on the specified model
     )
 
-# Load configurations for the 'gpt-4o' model
-config_list_4o = load_config("gpt-4o")
-config_list = load_config("gpt-4o")  
-
-# Language model configuration settings
-llm_config_4o = {"config_list": config_list_4o, "max_tokens": 300, "temperature": 0.0}  # Specific to 'gpt-4o'
-llm_config = {"config_list": config_list, "max_tokens": 300, "temperature": 0.0}  # General settings
\ No newline at end of file
+@lru_cache(maxsize=None)
+def _config_list(filter_model: str):
+    # Configurations for one model, read from the configuration file once per process
+    return load_config(filter_model)
+
+# Lazily built attributes: configurations for the 'gpt-4o' model and the language model configuration settings
+_LAZY_SETTINGS = {
+    "config_list_4o": lambda: _config_list("gpt-4o"),
+    "config_list": lambda: _config_list("gpt-4o"),
+    "llm_config_4o": lambda: {"config_list": _config_list("gpt-4o"), "max_tokens": 300, "temperature": 0.0},  # Specific to 'gpt-4o'
+    "llm_config": lambda: {"config_list": _config_list("gpt-4o"), "max_tokens": 300, "temperature": 0.0},  # General settings
+}
+
+def __getattr__(name: str):
+    # Build an LLM configuration on first access and keep it as a regular module attribute afterwards
+    if name in _LAZY_SETTINGS:
+        value = _LAZY_SETTINGS[name]()
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,106 @@
+# data_loader.py
+
+# This file defines `OHLCVLoader`, the single in-process entry point for OHLCV data used by the processing, plotting
+# and backtesting modules. Parsed, date-indexed frames are kept in a least-recently-used cache bounded by their size
+# in bytes, so one agent turn that plots and then backtests the same file loads it only once. Date-range requests
+# are served as positional slices of the cached frame, which share its memory instead of copying it. Frames come from
+# the consolidated market dataset when it holds the current contents of the CSV, and from the per-file store otherwise.
+
+import os  # For source file signatures and the cache size setting
+import threading  # For a lock around the cache, since tools may run concurrently
+import pandas as pd  # For the cached DataFrames
+from collections import OrderedDict  # For LRU ordering
+from typing import Dict, Optional  # For type annotations
+from data_store import OHLCVStore, default_store  # For loading frames through the columnar cache
+from market_data import MarketDataset, default_dataset  # For serving frames from the consolidated dataset
+from telemetry import add_counters, span  # For load timings and hit/miss counters
+
+# Default upper bound on the bytes held by the loader, overridable with the MACD_LOADER_MAX_BYTES environment variable
+MAX_BYTES = int(os.environ.get("MACD_LOADER_MAX_BYTES", 512 * 1024 * 1024))
+
+def slice_range(df: pd.DataFrame, start_date: Optional[str], end_date: Optional[str]) -> pd.DataFrame:
+    # Rows between start_date and end_date with the same semantics as df.loc[start_date:end_date], taken as a
+    # positional slice so the result is a view on df rather than a copy
+    return df.iloc[df.index.slice_indexer(start_date, end_date)]
+
+class OHLCVLoader:
+    def __init__(self, store: OHLCVStore = default_store, max_bytes: int = MAX_BYTES, dataset: Optional[MarketDataset] = default_dataset):
+        # Files the dataset is up to date with are read from it, others through the per-file store
+        self.store = store
+        self.dataset = dataset
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()  # path -> (source signature, frame, bytes), least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, csv_file_path: str) -> pd.DataFrame:
+        # Date-indexed OHLCV frame for a CSV. The frame is shared with other callers and must be treated as read-only.
+        key = os.path.abspath(csv_file_path)
+        signature = OHLCVStore.source_signature(csv_file_path)
+        with self._lock:
+            cached = self._frames.get(key)
+            if cached is not None and cached[0] == signature:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                add_counters(loader_hits=1)
+                return cached[1]
+            self.misses += 1
+
+        with span("load_ohlcv", path=os.path.basename(csv_file_path)):
+            if self.dataset is not None and self.dataset.covers(csv_file_path, signature):
+                df = self.dataset.load_source(csv_file_path)
+            else:
+                df = self.store.load(csv_file_path)
+            size = int(df.memory_usage(index=True).sum())
+            add_counters(loader_misses=1, bytes_loaded=size)
+        with self._lock:
+            if key in self._frames:
+                self._bytes -= self._frames.pop(key)[2]
+            if size <= self.max_bytes:
+                self._frames[key] = (signature, df, size)
+                self._bytes += size
+                # Evict least recently used frames until the cache fits its byte budget again
+                while self._bytes > self.max_bytes:
+                    self._bytes -= self._frames.popitem(last=False)[1][2]
+                    self.evictions += 1
+        return df
+
+    def load_range(self, csv_file_path: str, start_date: Optional[str], end_date: Optional[str]) -> pd.DataFrame:
+        # Rows of a cached frame between start_date and end_date, as a zero-copy view
+        return slice_range(self.load(csv_file_path), start_date, end_date)
+
+    def stats(self) -> Dict[str, int]:
+        # Hit/miss counters and current occupancy of the cache
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._frames),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        # Drop every cached frame (counters are kept)
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+# Loader shared by the processing, plotting and backtesting modules
+default_loader = OHLCVLoader()
+
+def get_ohlcv(csv_file_path: str) -> pd.DataFrame:
+    # Load a daily CSV through the shared loader
+    return default_loader.load(csv_file_path)
+
+def get_ohlcv_range(csv_file_path: str, start_date: Optional[str], end_date: Optional[str]) -> pd.DataFrame:
+    # Load a date range of a daily CSV through the shared loader
+    return default_loader.load_range(csv_file_path, start_date, end_date)
+
+def loader_stats() -> Dict[str, int]:
+    # Hit/miss counters of the shared loader
+    return default_loader.stats()
@@ -1,66 +1,133 @@
 # data_processing.py
 
-# This file defines a class `MACDDataProcessor` used for processing stock market data, 
+# This file defines a class `MACDDataProcessor` used for processing stock market data,
 # specifically for calculating the Moving Average Convergence Divergence (MACD) indicator.
 # The class includes methods to filter data by date, calculate Exponential Moving Averages (EMAs),
 # and compute the MACD along with its components like the signal line and histogram.
+# MACD components come back as one date-indexed DataFrame backed by a single float64 block. The dictionary
+# views (`get_filtered_data`, `get_macd_components`) are `FrameView`s: downsampled to at most `max_points` rows
+# and converted to Python objects only when a column is read.
 
+import numpy as np  # Importing NumPy for the component arrays and downsampling
 import pandas as pd  # Importing pandas for data manipulation
-from config import file_path, start_date, end_date  # Importing configuration variables
+from collections.abc import Mapping  # Importing the read-only mapping interface of the dictionary views
+from typing import Dict, Iterator, Optional, Tuple  # Importing type annotations
+from settings import file_path, start_date, end_date  # Importing configuration variables
+from data_loader import get_ohlcv, slice_range  # Importing the shared OHLCV loader
+from indicator_store import default_indicators  # Importing the store of precomputed EMAs
+
+# Columns of the frame returned by MACDDataProcessor.calculate_macd
+MACD_COLUMNS = ('ema_short', 'ema_long', 'macd', 'signal', 'histogram')
+
+# Default number of rows in the dictionary views
+DEFAULT_VIEW_POINTS = 500
+
+# How the dictionary view of the filtered data merges the bars of a bucket; other columns keep the last value
+OHLCV_AGGREGATIONS = {'open': 'first', 'high': np.fmax, 'low': np.fmin, 'volume': np.add}
+
+def bucket_bounds(n: int, max_points: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    # First and last row of each of at most max_points buckets of consecutive rows (one bucket per row when n fits)
+    if not max_points or n <= max_points:
+        rows = np.arange(n)
+        return rows, rows
+    bounds = np.linspace(0, n, max_points + 1).astype(np.int64)
+    return bounds[:-1], bounds[1:] - 1
+
+class SeriesView(Mapping):
+    def __init__(self, index: pd.DatetimeIndex, values: np.ndarray):
+        # Read-only {Timestamp: float} view of one downsampled column; values become Python floats on access
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, key) -> float:
+        return float(self.values[self.index.get_loc(pd.Timestamp(key))])
+
+    def __iter__(self) -> Iterator[pd.Timestamp]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+class FrameView(Mapping):
+    def __init__(self, frame: pd.DataFrame, max_points: Optional[int] = DEFAULT_VIEW_POINTS, aggregations: Optional[Dict[str, any]] = None):
+        # Read-only {column: SeriesView} view of a frame downsampled to at most max_points rows, keyed by the date
+        # of the last row of each bucket. Each column is aggregated on first access with aggregations[column]:
+        # 'first', a NumPy ufunc reduced over the bucket, or by default the last value.
+        self.frame = frame
+        self.starts, self.ends = bucket_bounds(len(frame), max_points)
+        self.index = frame.index[self.ends]
+        self.aggregations = aggregations or {}
+        self._columns: Dict[str, SeriesView] = {}
+
+    def __getitem__(self, column: str) -> SeriesView:
+        if column not in self._columns:
+            values = self.frame[column].to_numpy()
+            how = self.aggregations.get(column, 'last')
+            if len(self.ends) == len(values) or how == 'last':
+                values = values[self.ends]
+            elif how == 'first':
+                values = values[self.starts]
+            else:
+                values = how.reduceat(np.nan_to_num(values) if how is np.add else values, self.starts)
+            self._columns[column] = SeriesView(self.index, values)
+        return self._columns[column]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.frame.columns)
+
+    def __len__(self) -> int:
+        return len(self.frame.columns)
 
 class MACDDataProcessor:
     def __init__(self, csv_file_path: str):
-        # Initialize the processor by loading the data from a CSV file and setting the date column as the index
-        self.data = pd.read_csv(csv_file_path, parse_dates=['date'])
-        self.data.set_index('date', inplace=True)
+        # Initialize the processor with the date-indexed data of a CSV file, shared through the in-process loader
+        self.csv_file_path = csv_file_path
+        self.data = get_ohlcv(csv_file_path)
 
     def filter_data(self, start_date: str, end_date: str):
-        # Filter the data to include only the rows between start_date and end_date
-        self.filtered_data = self.data.loc[start_date:end_date]
+        # Filter the data to include only the rows between start_date and end_date (a view, not a copy)
+        self.filtered_data = slice_range(self.data, start_date, end_date)
+        # Precomputed EMAs of the file, corrected to this window (None when the store cannot serve it)
+        self.stored_emas = default_indicators.lookup(self.csv_file_path, "ewm", self.filtered_data.index)
 
     def calculate_ema(self, period: int):
-        # Calculate the Exponential Moving Average (EMA) for the specified period
+        # Calculate the Exponential Moving Average (EMA) for the specified period, or read it from the indicator store
+        stored = self.stored_emas(period) if self.stored_emas is not None else None
+        if stored is not None:
+            return pd.Series(stored, index=self.filtered_data.index, name='close')
         return self.filtered_data['close'].ewm(span=period, adjust=False).mean()
 
-    def calculate_macd(self):
-        # Calculate the MACD components:
-        ema_short = self.calculate_ema(12)
-        ema_long = self.calculate_ema(26)
-        macd = ema_short - ema_long
-        signal = macd.ewm(span=9, adjust=False).mean()
-        histogram = macd - signal
-        return ema_short, ema_long, macd, signal, histogram
-
-    def get_filtered_data(self):
-        # Return the filtered data as a dictionary
-        return self.filtered_data.to_dict()
-
-    def get_macd_components(self):
-        # Calculate and return the MACD components as dictionaries
-        ema_short, ema_long, macd, signal, histogram = self.calculate_macd()
-        return {
-            'ema_short': ema_short.to_dict(),
-            'ema_long': ema_long.to_dict(),
-            'macd': macd.to_dict(),
-            'signal': signal.to_dict(),
-            'histogram': histogram.to_dict()
-        }
-
-    def inspect_data(self):
+    def calculate_macd(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9) -> pd.DataFrame:
+        # Calculate the MACD components for the given periods as one frame over the filtered dates, with the
+        # MACD_COLUMNS columns stored in a single column-major float64 block (each column is a contiguous array)
+        values = np.empty((len(self.filtered_data), len(MACD_COLUMNS)), order='F')
+        values[:, 0] = self.calculate_ema(short_ema).to_numpy()
+        values[:, 1] = self.calculate_ema(long_ema).to_numpy()
+        np.subtract(values[:, 0], values[:, 1], out=values[:, 2])
+        values[:, 3] = pd.Series(values[:, 2]).ewm(span=signal_ema, adjust=False).mean().to_numpy()
+        np.subtract(values[:, 2], values[:, 3], out=values[:, 4])
+        components = pd.DataFrame(values, index=self.filtered_data.index, columns=list(MACD_COLUMNS), copy=False)
+        components.attrs.update(short_ema=short_ema, long_ema=long_ema, signal_ema=signal_ema)
+        return components
+
+    def get_filtered_data(self, max_points: Optional[int] = DEFAULT_VIEW_POINTS) -> FrameView:
+        # Return the filtered data as a lazy {column: {date: value}} view, merged into at most max_points OHLCV bars
+        # (None for every bar)
+        return FrameView(self.filtered_data, max_points, OHLCV_AGGREGATIONS)
+
+    def get_macd_components(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9, max_points: Optional[int] = DEFAULT_VIEW_POINTS) -> FrameView:
+        # Calculate and return the MACD components as a lazy {component: {date: value}} view with at most max_points
+        # dates (the last value of each bucket; None for every bar)
+        return FrameView(self.calculate_macd(short_ema, long_ema, signal_ema), max_points)
+
+    def inspect_data(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9):
         # A utility method to inspect the filtered data and the MACD components
         print("Filtered Data Info:")
         print(self.filtered_data.info())  # Show summary information of the filtered data
-        ema_short, ema_long, macd, signal, histogram = self.calculate_macd()  # Calculate MACD components
+        components = self.calculate_macd(short_ema, long_ema, signal_ema)  # Calculate MACD components
         # Print the lengths of the various calculated series to ensure they are consistent
-        print("EMA Short Length:", len(ema_short))
-        print("EMA Long Length:", len(ema_long))
-        print("MACD Length:", len(macd))
-        print("Signal Length:", len(signal))
-        print("Histogram Length:", len(histogram))
+        print("MACD Components Length:", len(components))
+        print("Filtered Data Length:", len(self.filtered_data))
         # Print the first few rows of the data and MACD components for a quick check
         print("Filtered Data Head:\n", self.filtered_data.head())
-        print("EMA Short Head:\n", ema_short.head())
-        print("EMA Long Head:\n", ema_long.head())
-        print("MACD Head:\n", macd.head())
-        print("Signal Head:\n", signal.head())
-        print("Histogram Head:\n", histogram.head())
\ No newline at end of file
+        print(f"MACD Components ({short_ema}, {long_ema}, {signal_ema}) Head:\n", components.head())
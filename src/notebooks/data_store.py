@@ -0,0 +1,176 @@
+# data_store.py
+
+# This file defines `OHLCVStore`, an on-disk columnar cache for the daily CSV files in data/DailyData.
+# The first load of a CSV converts it to one NumPy .npy file per column (datetime64 dates, float64 prices and the
+# volume as parsed), and later loads memory-map those arrays instead of re-parsing the text. Each cache entry
+# records the size and modification time of its source CSV and is rebuilt automatically when the CSV changes.
+# CSVs are parsed by `validate_bars`, which the consolidated market dataset uses too, so every store and the loader
+# serve the same sorted, de-duplicated rows of a file.
+
+import hashlib  # For cache entry names that are unique per source path, and row fingerprints
+import json  # For the cache entry metadata
+import os  # For file and directory operations
+import shutil  # For replacing stale cache entries
+import tempfile  # For building cache entries atomically
+import numpy as np  # For the .npy column files
+import pandas as pd  # For parsing CSVs and returning DataFrames
+from typing import Dict, List, Optional, Tuple  # For type annotations
+
+# Default location of the cache, overridable with the MACD_CACHE_DIR environment variable
+CACHE_DIR = os.environ.get(
+    "MACD_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'cache'),
+)
+
+# Directory holding one CSV of daily bars per symbol
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'DailyData')
+
+# Price and volume columns kept for every symbol, next to the date index
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Bumped whenever the on-disk layout changes so old entries are rebuilt
+CACHE_VERSION = 2
+
+# Columns every CSV must have
+REQUIRED_COLUMNS = ('date', *COLUMNS)
+
+def validate_bars(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    # Date-indexed OHLCV frame of a parsed CSV plus counts of what was fixed or looks wrong. Rows with unparseable
+    # dates are dropped, non-numeric values become NaN, rows are sorted by date and, for repeated dates, the last
+    # row of the file wins. Bars whose close lies outside their high-low range are kept and counted.
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    dates = pd.to_datetime(df['date'], errors='coerce')
+    values = {column: pd.to_numeric(df[column], errors='coerce') for column in COLUMNS}
+    issues = {"bad_values": int(sum((values[column].isna() & df[column].notna()).sum() for column in COLUMNS))}
+    frame = pd.DataFrame(values)
+    frame.index = pd.DatetimeIndex(dates.to_numpy(dtype='datetime64[ns]'), name='date')
+    issues["bad_dates"] = int(frame.index.isna().sum())
+    frame = frame[~frame.index.isna()]
+    issues["unsorted"] = int(not frame.index.is_monotonic_increasing)
+    duplicated = frame.index.duplicated(keep='last')
+    issues["duplicates"] = int(duplicated.sum())
+    frame = frame[~duplicated].sort_index(kind='stable')
+    high, low, close = frame['high'], frame['low'], frame['close']
+    issues["invalid_ranges"] = int(((high < low) | (close > high) | (close < low)).sum())
+    return frame, issues
+
+def list_universe(data_dir: str = DATA_DIR, symbols: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+    # (symbol, csv path) pairs for the requested symbols, or for every CSV in the directory
+    if symbols is None:
+        symbols = sorted(name[:-4] for name in os.listdir(data_dir) if name.endswith('.csv'))
+    return [(symbol, os.path.join(data_dir, f"{symbol}.csv")) for symbol in symbols]
+
+def fingerprint(dates: np.ndarray, close: np.ndarray) -> str:
+    # Hash of the rows an entry was computed from, to check that a grown CSV only appended rows to them
+    digest = hashlib.sha1(np.ascontiguousarray(dates).tobytes())
+    digest.update(np.ascontiguousarray(close, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+class OHLCVStore:
+    def __init__(self, cache_dir: str = CACHE_DIR, mmap: bool = True):
+        # mmap=True serves cached columns as read-only memory maps; False reads them into memory
+        self.cache_dir = cache_dir
+        self.mmap = mmap
+
+    def entry_dir(self, csv_file_path: str) -> str:
+        # One directory per source file: readable symbol name plus a hash of the absolute path to avoid clashes
+        source = os.path.abspath(csv_file_path)
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.cache_dir, f"{stem}-{hashlib.sha1(source.encode()).hexdigest()[:12]}")
+
+    @staticmethod
+    def source_signature(csv_file_path: str) -> dict:
+        # Size and modification time of the source CSV; raises FileNotFoundError for a missing file
+        stat = os.stat(csv_file_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_fresh(self, csv_file_path: str) -> bool:
+        # Whether a cache entry exists for the CSV and was built from its current contents
+        try:
+            with open(os.path.join(self.entry_dir(csv_file_path), 'meta.json')) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return False
+        signature = self.source_signature(csv_file_path)
+        return meta.get("version") == CACHE_VERSION and all(meta.get(key) == value for key, value in signature.items())
+
+    @staticmethod
+    def parse_csv(csv_file_path: str) -> pd.DataFrame:
+        # Parse a daily CSV into a date-indexed frame with the OHLCV columns, validated like the market dataset's
+        # (see validate_bars) so both serve the same rows
+        return validate_bars(pd.read_csv(csv_file_path))[0]
+
+    def build(self, csv_file_path: str) -> pd.DataFrame:
+        # Parse the CSV, write its columns to the cache and return the parsed frame. The entry is written to a
+        # temporary directory and renamed into place, so concurrent readers never see a half-written entry.
+        signature = self.source_signature(csv_file_path)
+        df = self.parse_csv(csv_file_path)
+        entry = self.entry_dir(csv_file_path)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            staging = tempfile.mkdtemp(prefix=os.path.basename(entry) + '.', dir=self.cache_dir)
+        except OSError:
+            return df  # Read-only or unavailable cache location: serve the parsed data uncached
+
+        try:
+            np.save(os.path.join(staging, 'date.npy'), df.index.to_numpy(dtype='datetime64[ns]'))
+            for column in COLUMNS:
+                np.save(os.path.join(staging, f'{column}.npy'), df[column].to_numpy())
+            meta = {
+                "version": CACHE_VERSION,
+                "source": os.path.abspath(csv_file_path),
+                "rows": len(df),
+                "dtypes": {column: str(df[column].dtype) for column in COLUMNS},
+                **signature,
+            }
+            with open(os.path.join(staging, 'meta.json'), 'w') as meta_file:
+                json.dump(meta, meta_file)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except OSError:
+            # Another process replaced the entry first, or the disk is full; the parsed data is still valid
+            shutil.rmtree(staging, ignore_errors=True)
+        return df
+
+    def read(self, csv_file_path: str) -> pd.DataFrame:
+        # Load the cached columns of a fresh entry without touching the CSV
+        entry = self.entry_dir(csv_file_path)
+        mmap_mode = 'r' if self.mmap else None
+        columns = {column: np.load(os.path.join(entry, f'{column}.npy'), mmap_mode=mmap_mode) for column in COLUMNS}
+        index = pd.DatetimeIndex(np.load(os.path.join(entry, 'date.npy'), mmap_mode=mmap_mode), name='date')
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def load_arrays(self, csv_file_path: str, columns=COLUMNS) -> Dict[str, np.ndarray]:
+        # Dates plus the requested columns of a CSV as plain arrays, skipping DataFrame construction for callers
+        # that only need a column or two of many symbols
+        if self.is_fresh(csv_file_path):
+            entry = self.entry_dir(csv_file_path)
+            mmap_mode = 'r' if self.mmap else None
+            try:
+                return {name: np.load(os.path.join(entry, f'{name}.npy'), mmap_mode=mmap_mode) for name in ('date', *columns)}
+            except (OSError, ValueError):
+                pass  # Entry removed or damaged underneath us: rebuild it
+        df = self.build(csv_file_path)
+        return {'date': df.index.to_numpy(dtype='datetime64[ns]'), **{name: df[name].to_numpy() for name in columns}}
+
+    def load(self, csv_file_path: str) -> pd.DataFrame:
+        # Date-indexed OHLCV frame for a CSV, served from the cache when it is up to date
+        if self.is_fresh(csv_file_path):
+            try:
+                return self.read(csv_file_path)
+            except (OSError, ValueError):
+                pass  # Entry removed or damaged underneath us: rebuild it
+        return self.build(csv_file_path)
+
+    def clear(self):
+        # Remove every cache entry
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+# Store shared by the data processing and backtesting modules
+default_store = OHLCVStore()
+
+def load_ohlcv(csv_file_path: str) -> pd.DataFrame:
+    # Load a daily CSV through the default columnar cache
+    return default_store.load(csv_file_path)
@@ -0,0 +1,289 @@
+# indicator_store.py
+
+# This file defines `IndicatorStore`, an on-disk cache of precomputed close-price EMAs for a configurable set of spans.
+# Each symbol gets one memory-mappable .npy array per EMA kind, with one contiguous row per span: "ewm" is the
+# pandas ewm(span, adjust=False) average used by MACDDataProcessor and the plots, and "seeded" is the Backtrader-style
+# EMA of the backtest engine, seeded with the simple average of its first `span` closes. Both are computed from the
+# first bar of the file and kept next to its dates and closes. An EMA depends on where its window starts, but after
+# the window's first value (or seed) both recurrences are linear, so the EMA of a window starting at bar s is the
+# full-history one plus a decaying correction, ema_w[t] = ema_f[t] + (1 - alpha)^(t - s) * (x[s] - ema_f[s]) (the
+# seeded kind uses the window's seed instead of x[s], from its seed bar on). `lookup` serves any window without
+# missing closes this way, equal to a recomputation up to float rounding (exactly for windows starting at the first
+# bar), and callers compute the EMAs as before otherwise. `refresh` brings an entry up to date with its CSV, appending only the new bars
+# when the old rows are unchanged. Entries are only built by `refresh`; readers never build them.
+#
+#   python indicator_store.py                       # refresh every symbol in data/DailyData
+#   python indicator_store.py --symbols TCS,INFY    # refresh some symbols
+
+import hashlib  # For entry names
+import json  # For the entry metadata
+import math  # For the exact sum of a window's seed closes
+import os  # For file and directory operations
+import shutil  # For replacing entries
+import tempfile  # For building entries atomically
+import numpy as np  # For the EMA arrays
+import pandas as pd  # For the batch EMA computation
+from typing import Dict, List, Optional, Tuple  # For type annotations
+from data_store import CACHE_DIR, DATA_DIR, OHLCVStore, default_store, fingerprint, list_universe  # For the source columns and paths
+
+# Default location of the store, overridable with the MACD_INDICATOR_DIR environment variable
+INDICATOR_DIR = os.environ.get("MACD_INDICATOR_DIR", os.path.join(CACHE_DIR, 'indicators'))
+
+# Spans stored by default: the usual MACD periods between 5 and 50
+DEFAULT_SPANS = (5, 6, 7, 8, 9, 10, 12, 13, 15, 17, 19, 20, 21, 24, 26, 30, 34, 35, 39, 40, 45, 50)
+
+# EMA kinds kept for every span
+KINDS = ("ewm", "seeded")
+
+# Bumped whenever the on-disk layout changes so old entries are rebuilt
+STORE_VERSION = 2
+
+def ewm_state(ema: np.ndarray, close: np.ndarray, span: int) -> Dict[str, float]:
+    # StreamingEMA state at the end of an ewm series: its last value, and the weight of the history decayed once
+    # for every missing close since the last observed one (pandas resets it to 1 on each observation)
+    observed = np.flatnonzero(~np.isnan(close))
+    old_weight = 1.0
+    if len(observed):
+        for _ in range(len(close) - 1 - observed[-1]):
+            old_weight *= 1.0 - 2.0 / (span + 1.0)
+    return {"period": span, "value": float(ema[-1]) if len(ema) else float('nan'), "old_weight": old_weight}
+
+class IndicatorStore:
+    def __init__(self, cache_dir: str = INDICATOR_DIR, spans: Tuple[int, ...] = DEFAULT_SPANS, source: OHLCVStore = default_store, mmap: bool = True):
+        # spans applies to entries built or rebuilt by this instance; reads serve whatever spans an entry holds
+        self.cache_dir = cache_dir
+        self.spans = tuple(sorted(set(spans)))
+        self.source = source
+        self.mmap = mmap
+
+    def entry_dir(self, csv_file_path: str) -> str:
+        # Same naming as the OHLCV cache: symbol name plus a hash of the absolute path
+        source = os.path.abspath(csv_file_path)
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.cache_dir, f"{stem}-{hashlib.sha1(source.encode()).hexdigest()[:12]}")
+
+    def meta(self, csv_file_path: str) -> Optional[Dict[str, any]]:
+        try:
+            with open(os.path.join(self.entry_dir(csv_file_path), 'meta.json')) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("version") == STORE_VERSION else None
+
+    def is_fresh(self, csv_file_path: str, meta: Optional[Dict[str, any]] = None) -> bool:
+        # Whether the entry was computed from the current contents of the CSV
+        meta = meta or self.meta(csv_file_path)
+        if meta is None:
+            return False
+        try:
+            signature = OHLCVStore.source_signature(csv_file_path)
+        except OSError:
+            return False
+        return all(meta.get(key) == value for key, value in signature.items())
+
+    def compute(self, close: np.ndarray, spans: Tuple[int, ...]) -> Dict[str, np.ndarray]:
+        # (spans x rows) arrays of every kind for a close series
+        from backtesting import seeded_ema  # Deferred: the backtest engine reads this store
+        series = pd.Series(close)
+        return {
+            "ewm": np.array([series.ewm(span=span, adjust=False).mean().to_numpy() for span in spans]).reshape(len(spans), len(close)),
+            "seeded": np.array([seeded_ema(close, span) for span in spans]).reshape(len(spans), len(close)),
+        }
+
+    def append(self, arrays: Dict[str, np.ndarray], states: List[Dict[str, float]], close: np.ndarray, rows: int, spans: Tuple[int, ...]) -> Dict[str, np.ndarray]:
+        # Extend stored arrays with the closes after the first `rows`, continuing each EMA from its final state
+        from backtesting import seeded_ema  # Deferred: the backtest engine reads this store
+        from streaming import StreamingEMA  # Same recurrence as pandas' ewm, one value at a time
+        new = close[rows:]
+        ewm = np.empty((len(spans), len(new)))
+        seeded = np.empty((len(spans), len(new)))
+        for i, span in enumerate(spans):
+            ema = StreamingEMA.from_dict(states[i])
+            ewm[i] = [ema.update(float(x)) for x in new]
+            states[i] = ema.to_dict()
+            last = arrays["seeded"][i, -1] if rows else float('nan')
+            if rows < span:
+                # Not seeded yet within the stored rows: the seed needs the new closes as well
+                seeded[i] = seeded_ema(close, span)[rows:]
+            elif np.isnan(last):
+                # Backtrader's EMA stays undefined after a missing value
+                seeded[i] = np.nan
+            else:
+                # After the seed, the seeded EMA follows the ewm recurrence with no missing values so far
+                ema = StreamingEMA.from_dict({"period": span, "value": float(last), "old_weight": 1.0})
+                # seeded_ema passes alpha to pandas, which round-trips it through the center of mass
+                alpha = 2.0 / (1.0 + span)
+                ema.alpha = 1.0 / (1.0 + (1.0 - alpha) / alpha)
+                values = []
+                for x in new:
+                    if np.isnan(x) or np.isnan(ema.value):
+                        ema.value = float('nan')
+                        values.append(float('nan'))
+                    else:
+                        values.append(ema.update(float(x)))
+                seeded[i] = values
+        return {"ewm": np.concatenate([arrays["ewm"], ewm], axis=1), "seeded": np.concatenate([arrays["seeded"], seeded], axis=1)}
+
+    def refresh(self, csv_file_path: str) -> str:
+        # Bring the entry of a CSV up to date and return what was done: "fresh", "appended" or "built"
+        meta = self.meta(csv_file_path)
+        if meta is not None and self.is_fresh(csv_file_path, meta) and tuple(meta["spans"]) == self.spans:
+            return "fresh"
+        signature = OHLCVStore.source_signature(csv_file_path)
+        source = self.source.load_arrays(csv_file_path, ('close',))
+        dates = np.asarray(source['date'])
+        close = np.asarray(source['close'], dtype=np.float64)
+
+        rows = meta["rows"] if meta is not None else 0
+        if (meta is not None and tuple(meta["spans"]) == self.spans and len(close) >= rows
+                and meta["fingerprint"] == fingerprint(dates[:rows], close[:rows])):
+            stored = self.load(csv_file_path, mmap=False)
+            states = meta["ewm_state"]
+            arrays = self.append(stored, states, close, rows, self.spans) if len(close) > rows else stored
+            action = "appended"
+        else:
+            arrays = self.compute(close, self.spans)
+            states = [ewm_state(arrays["ewm"][i], close, span) for i, span in enumerate(self.spans)]
+            action = "built"
+
+        arrays = {**arrays, "date": dates, "close": close}
+        meta = {
+            "version": STORE_VERSION,
+            "source": os.path.abspath(csv_file_path),
+            "rows": len(close),
+            "first_date": str(dates[0]) if len(dates) else None,
+            "spans": list(self.spans),
+            "fingerprint": fingerprint(dates, close),
+            "ewm_state": states,
+            **signature,
+        }
+        self.write(csv_file_path, arrays, meta)
+        return action
+
+    def write(self, csv_file_path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, any]):
+        # Write an entry to a temporary directory and rename it into place, so readers never see half an entry
+        entry = self.entry_dir(csv_file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=os.path.basename(entry) + '.', dir=self.cache_dir)
+        try:
+            for kind in (*KINDS, 'date', 'close'):
+                np.save(os.path.join(staging, f'{kind}.npy'), arrays[kind])
+            with open(os.path.join(staging, 'meta.json'), 'w') as meta_file:
+                json.dump(meta, meta_file)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def load(self, csv_file_path: str, mmap: Optional[bool] = None, kinds: Tuple[str, ...] = KINDS) -> Dict[str, np.ndarray]:
+        # (spans x rows) arrays of the given kinds ('date' and 'close' give the source rows), memory-mapped unless
+        # mmap is False
+        mmap_mode = 'r' if (self.mmap if mmap is None else mmap) else None
+        entry = self.entry_dir(csv_file_path)
+        return {kind: np.load(os.path.join(entry, f'{kind}.npy'), mmap_mode=mmap_mode) for kind in kinds}
+
+    def lookup(self, csv_file_path: str, kind: str, dates: pd.DatetimeIndex) -> Optional["StoredEMAs"]:
+        # Stored EMAs of one kind for the window of bars with the given dates (the index of the frame being served),
+        # or None when the entry cannot serve it: missing or stale, rows that are not exactly the stored ones, or
+        # missing closes in the window
+        meta = self.meta(csv_file_path)
+        if meta is None or meta["first_date"] is None or not len(dates) or not self.is_fresh(csv_file_path, meta):
+            return None
+        try:
+            source = self.load(csv_file_path, kinds=('date', 'close'))
+        except (OSError, ValueError):
+            return None
+        window = dates.to_numpy(dtype='datetime64[ns]')
+        start = int(np.searchsorted(source['date'], window[0]))
+        rows = len(window)
+        # The entry and the frame must hold the same rows (both come from validate_bars, but either may be stale)
+        if start + rows > len(source['date']) or not np.array_equal(source['date'][start:start + rows], window):
+            return None
+        if np.isnan(source['close'][start:start + rows]).any():
+            return None
+        return StoredEMAs(self, csv_file_path, kind, meta["spans"], start, rows)
+
+    def refresh_universe(self, data_dir: str = DATA_DIR, symbols: Optional[List[str]] = None) -> Dict[str, str]:
+        # Refresh every symbol and return the action taken for each (or the error that stopped it)
+        actions = {}
+        for symbol, csv_file_path in list_universe(data_dir, symbols):
+            try:
+                actions[symbol] = self.refresh(csv_file_path)
+            except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+                actions[symbol] = f"error: {type(e).__name__}: {e}"
+        return actions
+
+    def clear(self):
+        # Remove every entry
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+class StoredEMAs:
+    # Callable returning the EMA of a span over one window (rows start:start + rows of the entry), or None for spans
+    # the entry does not hold or cannot serve. The arrays are memory-mapped on first use and left out when pickled,
+    # so the object can be sent to pool workers.
+    def __init__(self, store: IndicatorStore, csv_file_path: str, kind: str, spans: List[int], start: int, rows: int):
+        self.store = store
+        self.csv_file_path = csv_file_path
+        self.kind = kind
+        self.positions = {span: i for i, span in enumerate(spans)}
+        self.start = start
+        self.rows = rows
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    def __call__(self, span: int) -> Optional[np.ndarray]:
+        if span not in self.positions:
+            return None
+        if self._arrays is None:
+            try:
+                self._arrays = self.store.load(self.csv_file_path, kinds=(self.kind, 'close'))
+            except (OSError, ValueError):
+                self.positions.clear()  # Entry removed underneath us: compute from now on
+                return None
+        start, rows = self.start, self.rows
+        full = self._arrays[self.kind][self.positions[span], start:start + rows]
+        if start == 0:
+            return full
+        close = self._arrays['close']
+        if self.kind == "ewm":
+            # pandas derives alpha from the span through the center of mass
+            alpha = 1.0 / (1.0 + (span - 1.0) / 2.0)
+            return full + (1.0 - alpha) ** np.arange(rows) * (close[start] - full[0])
+        # Seeded kind: NaN until the window's seed bar, then the full-history EMA corrected towards the window's seed
+        seed = span - 1
+        result = np.full(rows, np.nan)
+        if seed >= rows:
+            return result
+        if np.isnan(full[seed]):
+            return None  # A missing close before the window left the full-history EMA undefined
+        alpha = 2.0 / (1.0 + span)
+        alpha = 1.0 / (1.0 + (1.0 - alpha) / alpha)  # As seeded_ema, which passes alpha through pandas
+        window_seed = math.fsum(close[start:start + span]) / span
+        result[seed:] = full[seed:] + (1.0 - alpha) ** np.arange(rows - seed) * (window_seed - full[seed])
+        return result
+
+    def __getstate__(self) -> Dict[str, any]:
+        return {**self.__dict__, "_arrays": None}
+
+# Store shared by the data processing and backtesting modules
+default_indicators = IndicatorStore()
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for refreshing the store
+    import time  # For elapsed-time reporting
+    from collections import Counter  # For the summary of actions
+
+    parser = argparse.ArgumentParser(description="Precompute close-price EMAs for the symbols in data/DailyData.")
+    parser.add_argument("--symbols", default=None, help="Comma separated symbols (default: every CSV in --data-dir)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--spans", default=",".join(str(span) for span in DEFAULT_SPANS), help="Comma separated EMA spans")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    store = IndicatorStore(spans=tuple(int(span) for span in args.spans.split(",")))
+    actions = store.refresh_universe(args.data_dir, args.symbols.split(",") if args.symbols else None)
+    summary = Counter(action if not action.startswith("error") else "error" for action in actions.values())
+    print(f"Refreshed {len(actions)} symbols in {time.perf_counter() - started:.1f}s: " + ", ".join(f"{count} {action}" for action, count in summary.items()))
+    for symbol, action in actions.items():
+        if action.startswith("error"):
+            print(f"{symbol}: {action}")
@@ -0,0 +1,269 @@
+# local_search.py
+
+# This file defines `SuccessiveHalvingOptimizer`, a local search over the MACD parameters that an agent can run as a
+# single tool call instead of iterating on guesses over several LLM round trips. Candidate parameter sets are first
+# backtested on a short window of the most recent bars, and only the best third (by default) of them is promoted to a
+# window three times longer, until the survivors run on the full range. The best full-range set is then refined by a
+# coordinate search over neighbouring parameter values. Constraints (maximum drawdown, minimum profit factor, minimum
+# trades) rank infeasible sets last, a time budget stops the search at any point with the best full-range result so
+# far, and an optional target ends it as soon as a feasible set reaches it. Every evaluation is kept in a trace.
+
+import math  # For the daily Sharpe proxy
+import random  # For sampling the starting candidates
+import time  # For the time budget
+import numpy as np  # For the equity curves
+import pandas as pd  # For the search trace
+from typing import Annotated, Dict, List, Optional, Tuple  # For type annotations
+from backtesting import BackTraderUtils  # For loading the price data
+from indicator_store import StoredEMAs, default_indicators  # For precomputed EMAs
+from optimization import MACDParameterSweep, SWEEP_METRICS, ASCENDING_METRICS, parse_range  # Sweep pieces
+from walk_forward import WalkForwardSweep, window_crossover  # Window evaluation on full-history indicators
+
+# Columns of the search trace
+TRACE_COLUMNS = ["phase", "bars", "short_ema", "long_ema", "signal_ema", "score", "feasible", *SWEEP_METRICS, "elapsed"]
+
+def daily_sharpe(value: np.ndarray) -> float:
+    # Annualized Sharpe ratio of daily returns. Short rungs use it in place of the calendar-year Sharpe ratio of the
+    # engine, which needs returns from at least two calendar years to be defined.
+    returns = np.diff(value) / value[:-1]
+    deviation = returns.std()
+    return float(returns.mean() / deviation * math.sqrt(252.0)) if deviation > 0.0 else float('nan')
+
+class SuccessiveHalvingOptimizer:
+    def __init__(self, objective: str = "sharpe_ratio", max_drawdown: Optional[float] = None, min_profit_factor: Optional[float] = None,
+                 min_trades: Optional[int] = None, target: Optional[float] = None, time_budget: float = 30.0,
+                 n_candidates: int = 243, eta: int = 3, min_bars: int = 126, refine: bool = True, seed: int = 0):
+        # max_drawdown is in percent; target is an objective value at which a feasible full-range set ends the search
+        if objective not in SWEEP_METRICS:
+            raise ValueError(f"Unknown objective '{objective}'. Use one of: {', '.join(SWEEP_METRICS)}.")
+        if eta < 2:
+            raise ValueError("eta must be at least 2.")
+        self.objective = objective
+        self.max_drawdown = max_drawdown
+        self.min_profit_factor = min_profit_factor
+        self.min_trades = min_trades
+        self.target = target
+        self.time_budget = time_budget
+        self.n_candidates = n_candidates
+        self.eta = eta
+        self.min_bars = min_bars
+        self.refine = refine
+        self.seed = seed
+
+    def rungs(self, bars: int) -> List[int]:
+        # Window lengths from shortest to the full range, each `eta` times longer than the previous one
+        lengths = [bars]
+        while lengths[-1] // self.eta >= self.min_bars:
+            lengths.append(lengths[-1] // self.eta)
+        return lengths[::-1]
+
+    def feasible(self, metrics: Dict[str, float], fraction: float = 1.0) -> bool:
+        # Whether a result meets the constraints; the minimum trade count is scaled down for shorter windows
+        if self.max_drawdown is not None and not metrics["max_drawdown"] <= self.max_drawdown:
+            return False
+        if self.min_profit_factor is not None and not metrics["profit_factor"] >= self.min_profit_factor:
+            return False
+        if self.min_trades is not None and metrics["trades"] < math.ceil(self.min_trades * fraction):
+            return False
+        return True
+
+    def score(self, metrics: Dict[str, float], value: np.ndarray, full: bool) -> float:
+        # Objective oriented so that larger is better, with missing values last
+        objective = metrics[self.objective]
+        if self.objective == "sharpe_ratio" and not full:
+            objective = daily_sharpe(value)
+        if np.isnan(objective):
+            return float('-inf')
+        return -objective if self.objective in ASCENDING_METRICS else objective
+
+    def reached_target(self, metrics: Dict[str, float], feasible: bool) -> bool:
+        if self.target is None or not feasible:
+            return False
+        objective = metrics[self.objective]
+        return objective <= self.target if self.objective in ASCENDING_METRICS else objective >= self.target
+
+    def run(self, df: pd.DataFrame, short_emas: List[int], long_emas: List[int], signal_emas: List[int], cash: float = 10000.0, stored_ema: Optional[StoredEMAs] = None) -> Tuple[Optional[Dict[str, any]], pd.DataFrame, str]:
+        # Search the parameter lists and return the best full-range result (parameters, metrics, score, feasible),
+        # the trace of every evaluation, and why the search stopped
+        grid = MACDParameterSweep.grid(short_emas, long_emas, signal_emas)
+        if not grid:
+            raise ValueError("The parameter ranges contain no combination with short_ema < long_ema.")
+        sweep = WalkForwardSweep(df, cash, stored_ema)
+        bars = len(df)
+        started = time.perf_counter()
+        trace: List[Dict[str, any]] = []
+        evaluated: Dict[Tuple[int, int, int], Dict[str, any]] = {}
+
+        def evaluate(combination: Tuple[int, int, int], window: int, phase: str) -> Dict[str, any]:
+            # Backtest one combination on the last `window` bars, read from indicators computed over the full range
+            start = bars - window
+            macd = sweep.macd_line(*combination[:2])
+            signal = sweep.signal_line(*combination)
+            metrics, value = sweep.evaluate_window(window_crossover(macd, signal, start, bars), start, bars)
+            full = window == bars
+            feasible = self.feasible(metrics, window / bars)
+            result = {"combination": combination, "metrics": metrics, "score": self.score(metrics, value, full), "feasible": feasible}
+            short_ema, long_ema, signal_ema = combination
+            trace.append({"phase": phase, "bars": window, "short_ema": short_ema, "long_ema": long_ema, "signal_ema": signal_ema,
+                          "score": result["score"], "feasible": feasible, **metrics, "elapsed": time.perf_counter() - started})
+            if full:
+                evaluated[combination] = result
+            return result
+
+        def rank(result: Dict[str, any]) -> Tuple[bool, float]:
+            return result["feasible"], result["score"]
+
+        def best_full() -> Optional[Dict[str, any]]:
+            return max(evaluated.values(), key=rank) if evaluated else None
+
+        def out_of_time() -> bool:
+            return time.perf_counter() - started > self.time_budget
+
+        # Successive halving over rungs of growing windows
+        candidates = grid if len(grid) <= self.n_candidates else random.Random(self.seed).sample(grid, self.n_candidates)
+        stop_reason = "completed"
+        rung_lengths = self.rungs(bars)
+        survivors: List[Dict[str, any]] = []
+        for number, window in enumerate(rung_lengths, start=1):
+            results = []
+            for combination in candidates:
+                if out_of_time():
+                    stop_reason = "time budget"
+                    break
+                result = evaluate(combination, window, f"rung {number}")
+                results.append(result)
+                if window == bars and self.reached_target(result["metrics"], result["feasible"]):
+                    stop_reason = "target reached"
+                    break
+            survivors = sorted(results, key=rank, reverse=True)
+            if stop_reason != "completed":
+                break
+            if window != bars:
+                candidates = [result["combination"] for result in survivors[:max(1, len(survivors) // self.eta)]]
+
+        # The answer is always a full-range result: if the budget ran out early, run the leader of the last rung
+        if not evaluated and survivors:
+            evaluate(survivors[0]["combination"], bars, "final")
+
+        # Coordinate search around the best set over neighbouring values of each parameter list
+        if self.refine and stop_reason == "completed":
+            values = [sorted(set(short_emas)), sorted(set(long_emas)), sorted(set(signal_emas))]
+            improved = True
+            while improved and stop_reason == "completed":
+                improved = False
+                best = best_full()
+                for axis in range(3):
+                    position = values[axis].index(best["combination"][axis])
+                    for neighbour in (position - 1, position + 1):
+                        if not 0 <= neighbour < len(values[axis]):
+                            continue
+                        combination = list(best["combination"])
+                        combination[axis] = values[axis][neighbour]
+                        combination = tuple(combination)
+                        if combination in evaluated or not 0 < combination[0] < combination[1]:
+                            continue
+                        if out_of_time():
+                            stop_reason = "time budget"
+                            break
+                        result = evaluate(combination, bars, "refine")
+                        if self.reached_target(result["metrics"], result["feasible"]):
+                            stop_reason = "target reached"
+                        if rank(result) > rank(best):
+                            improved = True
+                        if stop_reason != "completed":
+                            break
+                    if improved or stop_reason != "completed":
+                        break
+
+        return best_full(), pd.DataFrame(trace, columns=TRACE_COLUMNS), stop_reason
+
+class LocalSearchUtils:
+    # Utility class exposing the local parameter search to the agents
+    def optimize_macd(
+        self,
+        csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
+        start_date: Annotated[str, "Start date of the full range in 'YYYY-MM-DD' format"],
+        end_date: Annotated[str, "End date of the full range in 'YYYY-MM-DD' format"],
+        objective: Annotated[str, "Metric to optimize: sharpe_ratio, total_return, final_value, max_drawdown, profit_factor, win_rate or trades"] = "sharpe_ratio",
+        max_drawdown: Annotated[Optional[float], "Constraint: maximum drawdown in percent"] = None,
+        min_profit_factor: Annotated[Optional[float], "Constraint: minimum profit factor"] = None,
+        min_trades: Annotated[Optional[int], "Constraint: minimum number of closed trades over the full range"] = None,
+        target: Annotated[Optional[float], "Stop as soon as a set meeting the constraints reaches this objective value"] = None,
+        time_budget: Annotated[float, "Maximum search time in seconds"] = 30.0,
+        short_ema_range: Annotated[str, "short_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "3:30:1",
+        long_ema_range: Annotated[str, "long_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "10:80:2",
+        signal_ema_range: Annotated[str, "signal_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "3:20:1",
+        n_candidates: Annotated[int, "Parameter sets sampled for the first (shortest) rung"] = 243,
+        cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
+        save_trace: Annotated[Optional[str], "CSV file path to save every evaluation of the search"] = None,
+        seed: Annotated[int, "Random seed for sampling the candidates"] = 0,
+    ) -> str:
+        """
+        Search the MACD parameters with successive halving over growing windows and a final coordinate search.
+        """
+
+        try:
+            optimizer = SuccessiveHalvingOptimizer(objective, max_drawdown, min_profit_factor, min_trades, target, time_budget, n_candidates, seed=seed)
+            ranges = parse_range(short_ema_range), parse_range(long_ema_range), parse_range(signal_ema_range)
+        except ValueError as e:
+            return f"Error: {e}"
+
+        # Load historical stock data from CSV file, filtered to the specified date range
+        try:
+            df = BackTraderUtils().load_data(csv_file_path, start_date, end_date)
+        except FileNotFoundError:
+            return f"Error: File not found at {csv_file_path}."
+        except pd.errors.ParserError:
+            return "Error: Failed to parse CSV file."
+
+        if df.empty:
+            return "Error: No data available for the specified date range."
+
+        try:
+            best, trace, stop_reason = optimizer.run(df, *ranges, cash, default_indicators.lookup(csv_file_path, "seeded", df.index))
+        except ValueError as e:
+            return f"Error: {e}"
+        if best is None:
+            return "Error: The time budget ran out before any parameter set was evaluated."
+        if save_trace:
+            trace.to_csv(save_trace, index=False)
+
+        short_ema, long_ema, signal_ema = best["combination"]
+        per_phase = trace.groupby("phase", sort=False).agg(bars=("bars", "first"), evaluated=("bars", "size"), feasible=("feasible", "sum"), best_score=("score", "max"))
+        status = "meets the constraints" if best["feasible"] else "does NOT meet the constraints (no evaluated set does)"
+        return (
+            f"Search Finished ({stop_reason}) after {len(trace)} evaluations in {trace['elapsed'].iloc[-1]:.2f}s. "
+            f"Best parameters: short_ema={short_ema}, long_ema={long_ema}, signal_ema={signal_ema}, which {status}. \n"
+            + "Full-range metrics: " + ", ".join(f"{key}={value:.4f}" for key, value in best["metrics"].items()) + "\n"
+            + "Search trace by phase: \n" + per_phase.to_string(float_format=lambda x: f"{x:.4f}")
+            + (f"\nFull trace saved to {save_trace}" if save_trace else "")
+        )
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for local searches
+    from settings import file_path, start_date, end_date
+
+    parser = argparse.ArgumentParser(description="Search the MACD parameters of one symbol with successive halving.")
+    parser.add_argument("--csv", default=file_path)
+    parser.add_argument("--start-date", default=start_date)
+    parser.add_argument("--end-date", default=end_date)
+    parser.add_argument("--objective", default="sharpe_ratio", choices=SWEEP_METRICS)
+    parser.add_argument("--max-drawdown", type=float, default=None)
+    parser.add_argument("--min-profit-factor", type=float, default=None)
+    parser.add_argument("--min-trades", type=int, default=None)
+    parser.add_argument("--target", type=float, default=None)
+    parser.add_argument("--time-budget", type=float, default=30.0)
+    parser.add_argument("--short-ema", default="3:30:1")
+    parser.add_argument("--long-ema", default="10:80:2")
+    parser.add_argument("--signal-ema", default="3:20:1")
+    parser.add_argument("--candidates", type=int, default=243)
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--save-trace", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(LocalSearchUtils().optimize_macd(
+        args.csv, args.start_date, args.end_date, args.objective, args.max_drawdown, args.min_profit_factor, args.min_trades,
+        args.target, args.time_budget, args.short_ema, args.long_ema, args.signal_ema, args.candidates, args.cash,
+        args.save_trace, args.seed,
+    ))
@@ -5,7 +5,7 @@
 from textwrap import dedent  # For formatting the multi-line task string
 from autogen.cache import Cache  # For managing caching during the agent interaction
 from agents import trade_strategy_optimizer, user_proxy  # Importing the agents used in the interaction
-from config import company, file_path, start_date, end_date  # Importing relevant configuration variables
+from settings import company, file_path, start_date, end_date  # Importing relevant configuration variables
 
 # Define the task for the trade_strategy_optimizer agent, specifying the objectives to be achieved.
 task = dedent(f"""
@@ -0,0 +1,383 @@
+# market_data.py
+
+# This file defines `MarketDataset`, the whole of data/DailyData consolidated into one partitioned columnar dataset.
+# Symbols are encoded with a dictionary (symbol -> integer id), and bars are stored in year partitions, each made of
+# immutable parts: one .npy file per column with rows sorted by (symbol id, date), plus the ids present and their row
+# offsets so a symbol's rows are found with a binary search. `ingest` validates every changed CSV (schema, dates,
+# numeric values, duplicates) and writes only new bars as new parts; a CSV whose history changed gets a new id and its
+# old rows are dropped by `compact`. `read`, `query` and `load` serve symbol lists and date ranges from memory-mapped
+# parts, and the shared loader and the universe panels use them for every CSV the dataset is up to date with.
+#
+#   python market_data.py                                      # ingest (or append to) data/DailyData
+#   python market_data.py --compact                            # merge the parts of each year and drop replaced rows
+#   python market_data.py --query TCS,INFY --start-date 2023-01-01 --output bars.csv
+
+import json  # For the dataset manifest
+import os  # For file and directory operations
+import shutil  # For removing compacted parts
+import tempfile  # For writing parts and the manifest atomically
+import threading  # For a lock around the manifest and part caches, since tools may run concurrently
+import numpy as np  # For the column files
+import pandas as pd  # For parsing CSVs and returning DataFrames
+from concurrent.futures import ProcessPoolExecutor  # For parsing CSVs on several cores
+from typing import Dict, List, Optional, Tuple  # For type annotations
+from data_store import CACHE_DIR, COLUMNS, DATA_DIR, OHLCVStore, fingerprint, list_universe, validate_bars  # For the source layout and CSV validation
+
+# Default location of the dataset, overridable with the MACD_MARKET_DATA_DIR environment variable
+MARKET_DATA_DIR = os.environ.get("MACD_MARKET_DATA_DIR", os.path.join(CACHE_DIR, 'universe'))
+
+# Bumped whenever the on-disk layout changes so old datasets are rebuilt
+DATASET_VERSION = 1
+
+def _parse(csv_file_path: str) -> Tuple[Optional[pd.DataFrame], Dict[str, int], Optional[str]]:
+    # Worker entry point: validated frame and issues of one CSV, or the error that stopped it
+    try:
+        frame, issues = validate_bars(pd.read_csv(csv_file_path))
+        return frame, issues, None
+    except (OSError, ValueError, pd.errors.ParserError) as e:
+        return None, {}, f"{type(e).__name__}: {e}"
+
+class MarketDataset:
+    def __init__(self, root: str = MARKET_DATA_DIR, mmap: bool = True):
+        # mmap=True serves part columns as read-only memory maps; False reads them into memory
+        self.root = root
+        self.mmap = mmap
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, any]] = None
+        self._manifest_signature: Optional[Tuple[int, int]] = None
+        self._parts: Dict[str, Dict[str, np.ndarray]] = {}
+
+    def manifest(self) -> Optional[Dict[str, any]]:
+        # Current manifest (symbol dictionary, sources and parts), re-read when the file changes; None without one
+        path = os.path.join(self.root, 'manifest.json')
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            if signature != self._manifest_signature:
+                try:
+                    with open(path) as manifest_file:
+                        manifest = json.load(manifest_file)
+                except (OSError, ValueError):
+                    return None
+                self._manifest = manifest if manifest.get("version") == DATASET_VERSION else None
+                self._manifest_signature = signature
+                # Parts are immutable and never renamed, so only compacted ones need to go
+                names = {part["name"] for part in (self._manifest or {}).get("parts", [])}
+                self._parts = {name: arrays for name, arrays in self._parts.items() if name in names}
+            return self._manifest
+
+    def _write_manifest(self, manifest: Dict[str, any]):
+        # Replace the manifest atomically; readers see either the old or the new set of parts
+        handle, staging = tempfile.mkstemp(prefix='manifest.', dir=self.root)
+        with os.fdopen(handle, 'w') as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(staging, os.path.join(self.root, 'manifest.json'))
+
+    @staticmethod
+    def empty_manifest() -> Dict[str, any]:
+        return {"version": DATASET_VERSION, "next_id": 0, "next_part": 0, "dead_rows": 0, "symbols": {}, "parts": [], "errors": {}}
+
+    def symbols(self) -> List[str]:
+        # Symbols held by the dataset
+        return sorted((self.manifest() or {}).get("symbols", {}))
+
+    def covers(self, csv_file_path: str, signature: Optional[Dict[str, int]] = None) -> bool:
+        # Whether the dataset holds the current contents of a CSV (same path, size and modification time)
+        manifest = self.manifest()
+        if manifest is None:
+            return False
+        entry = manifest["symbols"].get(os.path.splitext(os.path.basename(csv_file_path))[0])
+        if entry is None or entry["source"] != os.path.abspath(csv_file_path):
+            return False
+        try:
+            signature = signature or OHLCVStore.source_signature(csv_file_path)
+        except OSError:
+            return False
+        return all(entry.get(key) == value for key, value in signature.items())
+
+    def _part(self, name: str) -> Dict[str, np.ndarray]:
+        # Columns of one part ('ids', 'offsets', 'date' and COLUMNS), opened once per process
+        arrays = self._parts.get(name)
+        if arrays is None:
+            directory = os.path.join(self.root, name)
+            mmap_mode = 'r' if self.mmap else None
+            arrays = {column: np.load(os.path.join(directory, f'{column}.npy'), mmap_mode=mmap_mode)
+                      for column in ('ids', 'offsets', 'date', *COLUMNS)}
+            self._parts[name] = arrays
+        return arrays
+
+    def _write_parts(self, manifest: Dict[str, any], ids: np.ndarray, dates: np.ndarray, columns: Dict[str, np.ndarray]):
+        # Add rows as new parts, one per year they fall in, with rows sorted by (symbol id, date)
+        if not len(ids):
+            return
+        years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+        order = np.lexsort((dates, ids, years))
+        ids, dates, years = ids[order], dates[order], years[order]
+        columns = {column: values[order] for column, values in columns.items()}
+        bounds = np.flatnonzero(np.diff(years)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(ids)]):
+            name = f"year={years[lo]}/part-{manifest['next_part']:06d}"
+            manifest["next_part"] += 1
+            part_ids, starts = np.unique(ids[lo:hi], return_index=True)
+            directory = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(directory), exist_ok=True)
+            staging = tempfile.mkdtemp(prefix='part.', dir=os.path.dirname(directory))
+            np.save(os.path.join(staging, 'ids.npy'), part_ids.astype(np.int32))
+            np.save(os.path.join(staging, 'offsets.npy'), np.r_[starts, hi - lo].astype(np.int64))
+            np.save(os.path.join(staging, 'date.npy'), dates[lo:hi])
+            for column, values in columns.items():
+                np.save(os.path.join(staging, f'{column}.npy'), values[lo:hi])
+            os.replace(staging, directory)
+            manifest["parts"].append({"name": name, "year": int(years[lo]), "rows": int(hi - lo), "symbols": len(part_ids)})
+
+    def ingest(self, data_dir: str = DATA_DIR, symbols: Optional[List[str]] = None, max_workers: Optional[int] = None) -> Dict[str, str]:
+        # Bring the dataset up to date with the CSVs and return the action taken per symbol: "unchanged", "added",
+        # "appended" (only bars after the stored ones were written), "replaced" (stored rows changed, so the symbol
+        # was rewritten under a new id) or the error that stopped it
+        manifest = self.manifest() or self.empty_manifest()
+        manifest = json.loads(json.dumps(manifest))  # Edit a copy; readers keep the current one until it is replaced
+        actions: Dict[str, str] = {}
+        pending = []
+        for symbol, csv_file_path in list_universe(data_dir, symbols):
+            try:
+                signature = OHLCVStore.source_signature(csv_file_path)
+            except OSError as e:
+                actions[symbol] = f"error: {type(e).__name__}: {e}"
+                continue
+            entry = manifest["symbols"].get(symbol)
+            if entry is not None and entry["source"] == os.path.abspath(csv_file_path) and all(entry.get(key) == value for key, value in signature.items()):
+                actions[symbol] = "unchanged"
+            else:
+                pending.append((symbol, csv_file_path, signature))
+
+        max_workers = max_workers or os.cpu_count() or 1
+        paths = [csv_file_path for _, csv_file_path, _ in pending]
+        executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 and len(paths) > 1 else None
+        if executor is None:
+            parsed = map(_parse, paths)
+        else:
+            parsed = executor.map(_parse, paths, chunksize=max(1, len(paths) // (max_workers * 4)))
+
+        chunks = []
+        try:
+            for (symbol, csv_file_path, signature), (frame, issues, error) in zip(pending, parsed):
+                if error is not None:
+                    actions[symbol] = manifest["errors"][symbol] = f"error: {error}"
+                    continue
+                manifest["errors"].pop(symbol, None)
+                dates = frame.index.to_numpy(dtype='datetime64[ns]')
+                close = frame['close'].to_numpy(dtype=np.float64)
+                entry = manifest["symbols"].get(symbol)
+                rows = entry["rows"] if entry is not None else 0
+                if entry is not None and len(frame) >= rows and entry["fingerprint"] == fingerprint(dates[:rows], close[:rows]):
+                    actions[symbol] = "appended" if len(frame) > rows else "unchanged"
+                    symbol_id = entry["id"]
+                    new = frame.iloc[rows:]
+                else:
+                    actions[symbol] = "replaced" if entry is not None else "added"
+                    if entry is not None:
+                        manifest["dead_rows"] += rows
+                    symbol_id = manifest["next_id"]
+                    manifest["next_id"] += 1
+                    new, rows = frame, 0
+                volume_dtype = str(frame['volume'].dtype) if not rows else entry["volume_dtype"]
+                manifest["symbols"][symbol] = {
+                    "id": symbol_id,
+                    "source": os.path.abspath(csv_file_path),
+                    "rows": len(frame),
+                    "first_date": str(dates[0])[:10] if len(dates) else None,
+                    "last_date": str(dates[-1])[:10] if len(dates) else None,
+                    "fingerprint": fingerprint(dates, close),
+                    # Volumes are stored as float64 and cast back on load, so an integer column stays integer
+                    "volume_dtype": volume_dtype if str(new['volume'].dtype) == volume_dtype else "float64",
+                    "issues": {name: count for name, count in issues.items() if count},
+                    **signature,
+                }
+                if len(new):
+                    chunks.append((symbol_id, new))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        os.makedirs(self.root, exist_ok=True)
+        if chunks:
+            self._write_parts(
+                manifest,
+                np.concatenate([np.full(len(new), symbol_id, dtype=np.int32) for symbol_id, new in chunks]),
+                np.concatenate([new.index.to_numpy(dtype='datetime64[ns]') for _, new in chunks]),
+                {column: np.concatenate([new[column].to_numpy(dtype=np.float64) for _, new in chunks]) for column in COLUMNS},
+            )
+        self._write_manifest(manifest)
+        return actions
+
+    def compact(self) -> Dict[str, int]:
+        # Rewrite each year with several parts (or replaced rows) as a single part holding only the rows of current
+        # symbol ids, then remove the old parts
+        manifest = self.manifest()
+        if manifest is None:
+            return {"parts_before": 0, "parts_after": 0, "rows_dropped": 0}
+        manifest = json.loads(json.dumps(manifest))
+        live = np.array(sorted(entry["id"] for entry in manifest["symbols"].values()), dtype=np.int32)
+        old_parts = manifest["parts"]
+        manifest["parts"] = []
+        removed = []
+        dropped = 0
+        for year in sorted({part["year"] for part in old_parts}):
+            year_parts = [part for part in old_parts if part["year"] == year]
+            if len(year_parts) == 1 and not manifest["dead_rows"]:
+                manifest["parts"].extend(year_parts)  # Already compact
+                continue
+            removed.extend(year_parts)
+            pieces = []
+            for part in year_parts:
+                arrays = self._part(part["name"])
+                ids = np.repeat(arrays['ids'], np.diff(arrays['offsets']))
+                keep = np.isin(ids, live)
+                dropped += int(len(keep) - keep.sum())
+                pieces.append((ids[keep], arrays['date'][keep], {column: arrays[column][keep] for column in COLUMNS}))
+            self._write_parts(
+                manifest,
+                np.concatenate([ids for ids, _, _ in pieces]),
+                np.concatenate([dates for _, dates, _ in pieces]),
+                {column: np.concatenate([columns[column] for _, _, columns in pieces]) for column in COLUMNS},
+            )
+        manifest["dead_rows"] = 0
+        self._write_manifest(manifest)
+        for part in removed:
+            shutil.rmtree(os.path.join(self.root, part["name"]), ignore_errors=True)
+        return {"parts_before": len(old_parts), "parts_after": len(manifest["parts"]), "rows_dropped": dropped}
+
+    def read(self, symbols: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None,
+             columns: Tuple[str, ...] = COLUMNS) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        # Bars of the given symbols between start_date and end_date (inclusive), as 'date' and column arrays
+        # concatenated symbol by symbol in the order given, each symbol's rows in date order, plus the
+        # len(symbols) + 1 offsets of each symbol's rows. Unknown symbols get no rows.
+        manifest = self.manifest() or self.empty_manifest()
+        entries = [manifest["symbols"].get(symbol) for symbol in symbols]
+        wanted = np.array([entry["id"] if entry is not None else -1 for entry in entries], dtype=np.int64)
+        first = None if start_date is None else np.datetime64(pd.Timestamp(start_date), 'ns')
+        last = None if end_date is None else np.datetime64(pd.Timestamp(end_date), 'ns')
+        first_year = None if first is None else int(first.astype('datetime64[Y]').astype(np.int64)) + 1970
+        last_year = None if last is None else int(last.astype('datetime64[Y]').astype(np.int64)) + 1970
+
+        owners, pieces = [], []
+        for part in sorted(manifest["parts"], key=lambda part: (part["year"], part["name"])):
+            # Partition pruning: whole years outside the range are never opened
+            if (first_year is not None and part["year"] < first_year) or (last_year is not None and part["year"] > last_year):
+                continue
+            arrays = self._part(part["name"])
+            positions = np.searchsorted(arrays['ids'], wanted)
+            found = (positions < len(arrays['ids'])) & (arrays['ids'][np.minimum(positions, len(arrays['ids']) - 1)] == wanted)
+            if not found.any():
+                continue
+            starts = arrays['offsets'][positions[found]]
+            counts = arrays['offsets'][positions[found] + 1] - starts
+            # Row numbers of every wanted symbol's range, built without a Python loop over symbols
+            rows = np.repeat(starts - np.r_[0, np.cumsum(counts)[:-1]], counts) + np.arange(counts.sum())
+            owner = np.repeat(np.flatnonzero(found), counts)
+            dates = arrays['date'][rows]
+            keep = np.ones(len(rows), dtype=bool)
+            if first is not None:
+                keep &= dates >= first
+            if last is not None:
+                keep &= dates <= last
+            owners.append(owner[keep])
+            pieces.append({'date': dates[keep], **{column: arrays[column][rows[keep]] for column in columns}})
+
+        if not pieces:
+            return np.zeros(len(symbols) + 1, dtype=np.int64), {'date': np.array([], dtype='datetime64[ns]'), **{column: np.array([]) for column in columns}}
+        owner = np.concatenate(owners)
+        order = np.argsort(owner, kind='stable')  # Parts are in date order per symbol, so a stable sort keeps it
+        result = {name: np.concatenate([piece[name] for piece in pieces])[order] for name in ('date', *columns)}
+        offsets = np.r_[0, np.cumsum(np.bincount(owner, minlength=len(symbols)))].astype(np.int64)
+        if 'volume' in result:
+            # Cast the volumes of integer-volume symbols back, in one go when they all agree
+            dtypes = {entry["volume_dtype"] for entry in entries if entry is not None}
+            if dtypes == {"int64"}:
+                result['volume'] = result['volume'].astype(np.int64)
+        return offsets, result
+
+    def query(self, symbols: Optional[List[str]] = None, start_date: Optional[str] = None, end_date: Optional[str] = None,
+              columns: Tuple[str, ...] = COLUMNS) -> pd.DataFrame:
+        # Long frame of bars (symbol, date and the columns) for a symbol list (default: every symbol) and date range
+        symbols = self.symbols() if symbols is None else list(dict.fromkeys(symbols))
+        offsets, arrays = self.read(symbols, start_date, end_date, columns)
+        codes = np.repeat(np.arange(len(symbols)), np.diff(offsets))
+        return pd.DataFrame({
+            'symbol': pd.Categorical.from_codes(codes, categories=symbols),
+            'date': arrays['date'],
+            **{column: arrays[column] for column in columns},
+        })
+
+    def load(self, symbol: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        # Date-indexed OHLCV frame of one symbol, in the format of OHLCVStore.load
+        manifest = self.manifest() or self.empty_manifest()
+        entry = manifest["symbols"].get(symbol)
+        if entry is None:
+            raise KeyError(f"{symbol} is not in the dataset")
+        _, arrays = self.read([symbol], start_date, end_date)
+        volume = arrays['volume'].astype(entry["volume_dtype"], copy=False)
+        return pd.DataFrame({**{column: arrays[column] for column in COLUMNS}, 'volume': volume},
+                            index=pd.DatetimeIndex(arrays['date'], name='date'), copy=False)
+
+    def load_source(self, csv_file_path: str) -> pd.DataFrame:
+        # OHLCVStore.load for a CSV the dataset covers
+        return self.load(os.path.splitext(os.path.basename(csv_file_path))[0])
+
+    def clear(self):
+        # Remove the whole dataset
+        with self._lock:
+            self._parts.clear()
+            self._manifest = self._manifest_signature = None
+        shutil.rmtree(self.root, ignore_errors=True)
+
+# Dataset shared by the loader and the universe panels
+default_dataset = MarketDataset()
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for ingestion and queries
+    import time  # For elapsed-time reporting
+    from collections import Counter  # For the summary of actions
+
+    parser = argparse.ArgumentParser(description="Consolidate data/DailyData into one partitioned columnar dataset.")
+    parser.add_argument("--symbols", default=None, help="Comma separated symbols (default: every CSV in --data-dir)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--compact", action="store_true", help="Merge the parts of each year and drop replaced rows instead of ingesting")
+    parser.add_argument("--query", default=None, help="Comma separated symbols to print (or save with --output) instead of ingesting")
+    parser.add_argument("--start-date", default=None)
+    parser.add_argument("--end-date", default=None)
+    parser.add_argument("--output", default=None, help="CSV file for the --query result")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    dataset = MarketDataset()
+    if args.query:
+        result = dataset.query(args.query.split(","), args.start_date, args.end_date)
+        if args.output:
+            result.to_csv(args.output, index=False)
+            print(f"Saved {len(result)} rows to {args.output}")
+        else:
+            print(result.to_string(index=False, max_rows=40))
+    elif args.compact:
+        summary = dataset.compact()
+        print(f"Compacted {summary['parts_before']} parts into {summary['parts_after']} in {time.perf_counter() - started:.1f}s, dropping {summary['rows_dropped']} replaced rows")
+    else:
+        actions = dataset.ingest(args.data_dir, args.symbols.split(",") if args.symbols else None, args.workers)
+        summary = Counter(action if not action.startswith("error") else "error" for action in actions.values())
+        manifest = dataset.manifest()
+        print(f"Ingested {len(actions)} symbols in {time.perf_counter() - started:.1f}s: " + ", ".join(f"{count} {action}" for action, count in summary.items()))
+        print(f"Dataset: {len(manifest['symbols'])} symbols, {sum(part['rows'] for part in manifest['parts'])} rows in {len(manifest['parts'])} parts")
+        for symbol, action in actions.items():
+            if action.startswith("error"):
+                print(f"{symbol}: {action}")
+        # Validation findings of the symbols written in this run
+        issues = Counter()
+        for symbol, action in actions.items():
+            if action in ("added", "appended", "replaced"):
+                issues.update(manifest["symbols"][symbol]["issues"])
+        if issues:
+            print("Validation: " + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in issues.items()))
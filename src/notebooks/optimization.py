@@ -0,0 +1,168 @@
+# optimization.py
+
+# This file defines tools for searching the MACD parameter space with the vectorized backtest engine.
+# `MACDParameterSweep` evaluates many (short_ema, long_ema, signal_ema) combinations over one price series,
+# computing each EMA span once and reusing it for every combination that needs it, and `MACDOptimizerUtils`
+# wraps it into an agent-friendly method that returns a ranked table.
+
+import random  # For random sampling of the parameter grid
+import numpy as np  # For array operations on the price series
+import pandas as pd  # For the ranked results table
+from typing import Callable, Dict, List, Optional, Tuple, Annotated  # For type annotations
+from backtesting import BackTraderUtils, VectorizedMACDStrategy, macd_crossover, seeded_ema  # Vectorized engine pieces
+from indicator_store import default_indicators  # For precomputed EMAs
+
+# Metrics a sweep can be ranked by; max_drawdown is better when smaller, every other metric when larger
+SWEEP_METRICS = ("sharpe_ratio", "total_return", "final_value", "max_drawdown", "profit_factor", "win_rate", "trades")
+ASCENDING_METRICS = {"max_drawdown"}
+
+# Upper bound on the number of combinations evaluated by one sweep call
+MAX_COMBINATIONS = 20000
+
+def parse_range(spec: str) -> List[int]:
+    # Parse "start:stop[:step]" (stop inclusive) or a comma separated list such as "8,12,16" into periods
+    spec = str(spec).strip()
+    if ":" in spec:
+        parts = [int(part) for part in spec.split(":")]
+        if len(parts) not in (2, 3):
+            raise ValueError(f"Invalid range '{spec}', expected 'start:stop' or 'start:stop:step'.")
+        step = parts[2] if len(parts) == 3 else 1
+        if step < 1:
+            raise ValueError(f"Invalid range '{spec}', step must be positive.")
+        return list(range(parts[0], parts[1] + 1, step))
+    return [int(part) for part in spec.split(",") if part.strip()]
+
+class MACDParameterSweep:
+    def __init__(self, df: pd.DataFrame, cash: float = 10000.0, stored_ema: Optional[Callable[[int], Optional[np.ndarray]]] = None):
+        # Keep the price arrays of a date-indexed OHLCV frame plus caches for the shared EMA computations;
+        # stored_ema optionally serves precomputed seeded EMAs of the close by span (see IndicatorStore.lookup)
+        self.df = df
+        self.cash = cash
+        self.stored_ema = stored_ema
+        self.open_prices = df['open'].to_numpy(dtype=np.float64)
+        self.close_prices = df['close'].to_numpy(dtype=np.float64)
+        self.years = np.asarray(df.index.year)
+        self._close_emas: Dict[int, np.ndarray] = {}
+        self._macd_lines: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def close_ema(self, period: int) -> np.ndarray:
+        # EMA of the close for one span, computed once per sweep whichever role (short or long) it plays
+        if period not in self._close_emas:
+            stored = self.stored_ema(period) if self.stored_ema is not None else None
+            self._close_emas[period] = seeded_ema(self.close_prices, period) if stored is None else stored
+        return self._close_emas[period]
+
+    def macd_line(self, short_ema: int, long_ema: int) -> np.ndarray:
+        # MACD line for a (short, long) pair, shared by every signal span evaluated on top of it
+        key = (short_ema, long_ema)
+        if key not in self._macd_lines:
+            self._macd_lines[key] = self.close_ema(short_ema) - self.close_ema(long_ema)
+        return self._macd_lines[key]
+
+    def signal_line(self, short_ema: int, long_ema: int, signal_ema: int, stop: Optional[int] = None) -> np.ndarray:
+        # Signal line of a combination over the first `stop` bars (all of them by default), seeded once the MACD line exists
+        return seeded_ema(self.macd_line(short_ema, long_ema)[:stop], signal_ema, start=max(short_ema, long_ema) - 1)
+
+    def metrics(self, value: np.ndarray, fills: List[tuple], years: np.ndarray) -> Dict[str, float]:
+        # Reduce a simulated equity curve and its fills to the flat metrics used for ranking
+        sharpe = VectorizedMACDStrategy.sharpe_ratio(years, value, self.cash)["sharperatio"]
+        pnls = [pnl for kind, _, pnl, _ in VectorizedMACDStrategy.trade_events(fills) if kind == "close"]
+        gross_won = sum(pnl for pnl in pnls if pnl >= 0.0)
+        gross_lost = -sum(pnl for pnl in pnls if pnl < 0.0)
+        if gross_lost:
+            profit_factor = gross_won / gross_lost
+        else:
+            profit_factor = float('inf') if gross_won else float('nan')
+
+        return {
+            "final_value": float(value[-1]),
+            "total_return": (float(value[-1]) / self.cash - 1.0) * 100.0,
+            "sharpe_ratio": float('nan') if sharpe is None else sharpe,
+            "max_drawdown": VectorizedMACDStrategy.drawdown_stats(value)["max"]["drawdown"],
+            "profit_factor": profit_factor,
+            "win_rate": 100.0 * sum(pnl >= 0.0 for pnl in pnls) / len(pnls) if pnls else float('nan'),
+            "trades": len(pnls),
+        }
+
+    def evaluate(self, short_ema: int, long_ema: int, signal_ema: int) -> Dict[str, float]:
+        # Backtest one combination and reduce it to the flat metrics used for ranking
+        macd = self.macd_line(short_ema, long_ema)
+        signal = self.signal_line(short_ema, long_ema, signal_ema)
+        value, fills = VectorizedMACDStrategy.simulate(macd_crossover(macd, signal), self.open_prices, self.close_prices, self.cash)
+        return {"short_ema": short_ema, "long_ema": long_ema, "signal_ema": signal_ema, **self.metrics(value, fills, self.years)}
+
+    @staticmethod
+    def grid(short_emas: List[int], long_emas: List[int], signal_emas: List[int]) -> List[Tuple[int, int, int]]:
+        # Every combination with positive periods and a short EMA strictly faster than the long EMA
+        return [
+            (short_ema, long_ema, signal_ema)
+            for short_ema in short_emas
+            for long_ema in long_emas
+            for signal_ema in signal_emas
+            if 0 < short_ema < long_ema and signal_ema > 0
+        ]
+
+    def run(self, combinations: List[Tuple[int, int, int]], metric: str = "sharpe_ratio") -> pd.DataFrame:
+        # Evaluate the combinations, grouped by (short, long) so each MACD line stays hot in the cache, and
+        # return all of them ranked by the metric (missing values last)
+        results = [self.evaluate(*combination) for combination in sorted(combinations)]
+        ranked = pd.DataFrame(results, columns=["short_ema", "long_ema", "signal_ema", *SWEEP_METRICS])
+        return ranked.sort_values(metric, ascending=metric in ASCENDING_METRICS, na_position="last", kind="mergesort").reset_index(drop=True)
+
+class MACDOptimizerUtils:
+    # Utility class exposing parameter searches over the vectorized engine to the agents
+    def sweep_macd(
+        self,
+        csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
+        start_date: Annotated[str, "Start date of the sweep in 'YYYY-MM-DD' format"],
+        end_date: Annotated[str, "End date of the sweep in 'YYYY-MM-DD' format"],
+        short_ema_range: Annotated[str, "short_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "5:20:1",
+        long_ema_range: Annotated[str, "long_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "20:60:2",
+        signal_ema_range: Annotated[str, "signal_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "5:15:2",
+        metric: Annotated[str, "Ranking metric: sharpe_ratio, total_return, final_value, max_drawdown, profit_factor, win_rate or trades"] = "sharpe_ratio",
+        top_n: Annotated[int, "Number of best parameter sets to return"] = 10,
+        search: Annotated[str, "'grid' evaluates every combination, 'random' evaluates n_samples of them"] = "grid",
+        n_samples: Annotated[int, "Number of combinations to evaluate when search is 'random'"] = 500,
+        cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
+        seed: Annotated[int, "Random seed used when search is 'random'"] = 0,
+    ) -> str:
+        """
+        Backtest many MACD parameter combinations in one call and return the best ones ranked by a metric.
+        """
+
+        if metric not in SWEEP_METRICS:
+            return f"Error: Unknown metric '{metric}'. Use one of: {', '.join(SWEEP_METRICS)}."
+        if search not in ("grid", "random"):
+            return f"Error: Unknown search '{search}'. Use 'grid' or 'random'."
+        if search == "random" and n_samples < 1:
+            return f"Error: n_samples must be at least 1, got {n_samples}."
+
+        # Expand the parameter ranges into the combinations to evaluate
+        try:
+            combinations = MACDParameterSweep.grid(parse_range(short_ema_range), parse_range(long_ema_range), parse_range(signal_ema_range))
+        except ValueError as e:
+            return f"Error: {e}"
+        if not combinations:
+            return "Error: The parameter ranges contain no combination with short_ema < long_ema."
+        if search == "random" and n_samples < len(combinations):
+            combinations = random.Random(seed).sample(combinations, n_samples)
+        if len(combinations) > MAX_COMBINATIONS:
+            return f"Error: {len(combinations)} combinations requested, the limit is {MAX_COMBINATIONS}. Narrow the ranges or use search='random'."
+
+        # Load historical stock data from CSV file, filtered to the specified date range
+        try:
+            df = BackTraderUtils().load_data(csv_file_path, start_date, end_date)
+        except FileNotFoundError:
+            return f"Error: File not found at {csv_file_path}."
+        except pd.errors.ParserError:
+            return "Error: Failed to parse CSV file."
+
+        if df.empty:
+            return "Error: No data available for the specified date range."
+
+        stored_ema = default_indicators.lookup(csv_file_path, "seeded", df.index)
+        ranked = MACDParameterSweep(df, cash, stored_ema).run(combinations, metric)
+        return (
+            f"Sweep Finished. Evaluated {len(ranked)} parameter combinations ranked by {metric}. Top {min(top_n, len(ranked))}: \n"
+            + ranked.head(top_n).to_string(index=False, float_format=lambda x: f"{x:.4f}")
+        )
@@ -7,18 +7,24 @@
 import pandas as pd  
 import numpy as np  
 
+import matplotlib.pyplot as plt  # For closing figures once they are saved
 import mplfinance as mpf  # Specialized plotting library for financial data
-from data_processing import MACDDataProcessor  # Importing the data processing class for calculating MACD components
+from data_processing import MACD_COLUMNS, MACDDataProcessor  # Importing the data processing class for calculating MACD components
+from telemetry import span  # For timing the plotting phases
 
 class MACDPlotter:
     def __init__(self, csv_file_path: str):
         # Initialize the plotter by creating an instance of the MACDDataProcessor
         self.processor = MACDDataProcessor(csv_file_path)
 
-    def plot_macd(self, start_date: str, end_date: str, save_path: str, plot_type: str = "candle", plot_style: str = "default", show_nontrading: bool = False):
-        # Filters data based on the provided date range and calculates MACD components
-        self.processor.filter_data(start_date, end_date)
-        ema_short, ema_long, macd, signal, histogram = self.processor.calculate_macd()
+    def plot_macd(self, start_date: str, end_date: str, save_path: str, plot_type: str = "candle", plot_style: str = "default", show_nontrading: bool = False,
+                  short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9):
+        # Filters data based on the provided date range and calculates MACD components for the given periods
+        with span("plot.compute"):
+            self.processor.filter_data(start_date, end_date)
+            components = self.processor.calculate_macd(short_ema, long_ema, signal_ema)
+            ema_short, ema_long, macd, signal, histogram = (components[column] for column in MACD_COLUMNS)
+        title = f"MACD ({short_ema}, {long_ema}, {signal_ema}) with EMA and Histogram"
 
         # Identifies crossover points where MACD crosses the signal line
         crossover_points = ((macd.shift(1) > signal.shift(1)) & (macd <= signal)) | ((macd.shift(1) < signal.shift(1)) & (macd >= signal))
@@ -58,7 +64,7 @@ class MACDPlotter:
             "style": plot_style,
             "addplot": apds,
             "volume": True,
-            "title": "MACD with EMA and Histogram",
+            "title": title,
             "show_nontrading": show_nontrading,
             "savefig": save_path,
             "tight_layout": True,
@@ -69,9 +75,10 @@ class MACDPlotter:
         }
 
         # Create the plot and adjust the layout
-        fig, axlist = mpf.plot(self.processor.filtered_data, **plot_params, returnfig=True)
+        with span("plot.render", bars=len(self.processor.filtered_data)):
+            fig, axlist = mpf.plot(self.processor.filtered_data, **plot_params, returnfig=True)
         fig.subplots_adjust(top=0.9, right=0.75)
-        fig.suptitle('MACD with EMA and Histogram', y=0.95, fontsize=12)
+        fig.suptitle(title, y=0.95, fontsize=12)
 
         # Adding legends for different components
         legend_lines_main = [
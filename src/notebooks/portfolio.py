@@ -0,0 +1,277 @@
+# portfolio.py
+
+# This file defines `PortfolioBacktester`, which runs the MACD strategy over a basket of symbols with one shared cash
+# account. The basket is loaded into an aligned dates x symbols panel, entry and exit signals are computed for every
+# symbol with the vectorized engine's indicators (Backtrader-seeded EMAs and CrossOver semantics, orders filled at the
+# symbol's next open), and a single pass over the dates allocates capital: exits are filled first, then new entries
+# ranked by signal strength take the free slots up to `max_positions`, each sized as a fraction of portfolio equity.
+# The result reports portfolio equity, drawdown, turnover and the trade list.
+# The portfolio is long-only: a bullish crossover opens a long position and a bearish one only closes it. Unlike
+# MACDStrategy and VectorizedMACDStrategy, which reverse into a short position on a bearish crossover, it never
+# sells short, since a shared cash account has no margin to borrow against. Its entry dates therefore match the
+# single-symbol engines' long entries, but its results are not comparable to theirs on bars they spend short.
+# The basket must be given explicitly: data/DailyData also holds index, ETF, liquid and gold fund series (NIFTY50DIV,
+# BANKNIFTY, NIFTYBEES, ...) that cannot be traded as stocks and would dominate a whole-directory basket.
+
+import math  # For share rounding
+import numpy as np  # For the panel arrays
+import pandas as pd  # For the equity curve and trade list
+from typing import Annotated, Dict, List, Optional, Tuple  # For type annotations
+from backtesting import VectorizedMACDStrategy, macd_crossover, seeded_ema  # Indicators and statistics of the vectorized engine
+from data_store import DATA_DIR, list_universe  # For locating the symbols of the basket
+from scanner import PricePanel  # For the aligned dates x symbols prices
+from telemetry import span  # For timing the backtest phases
+
+# Trading days per year, for annualizing turnover
+TRADING_DAYS = 252
+
+# Columns of the trade list
+TRADE_COLUMNS = ["symbol", "entry_date", "entry_price", "exit_date", "exit_price", "shares", "pnl"]
+
+class PortfolioBacktester:
+    def __init__(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9, max_positions: int = 10,
+                 position_size: Optional[float] = None, cash: float = 100000.0, commission: float = 0.0):
+        # position_size is the fraction of equity committed to each new position (default: 1 / max_positions);
+        # commission is a fraction of the traded value charged on both entries and exits
+        if not 0 < short_ema < long_ema or signal_ema < 1:
+            raise ValueError("EMA periods must satisfy 0 < short_ema < long_ema and signal_ema > 0.")
+        if max_positions < 1:
+            raise ValueError("max_positions must be at least 1.")
+        position_size = position_size or 1.0 / max_positions
+        if not 0.0 < position_size <= 1.0:
+            raise ValueError("position_size must be a fraction of equity in (0, 1].")
+        self.short_ema = short_ema
+        self.long_ema = long_ema
+        self.signal_ema = signal_ema
+        self.max_positions = max_positions
+        self.position_size = position_size
+        self.cash = cash
+        self.commission = commission
+
+    def signals(self, panel: PricePanel) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Long entry (bullish crossover) and exit (bearish crossover) orders as dates x symbols booleans placed on the
+        # bar where they fill (each symbol's next trading day after the crossover), plus the score ranking competing
+        # entries: the histogram relative to the close at the signal bar. Indicators run on each symbol's own rows, so
+        # gaps in the calendar do not decay them.
+        entries = np.zeros(panel.present.shape, dtype=bool)
+        exits = np.zeros(panel.present.shape, dtype=bool)
+        scores = np.zeros(panel.present.shape)
+        for j in range(len(panel.symbols)):
+            rows = np.flatnonzero(panel.present[:, j])
+            close = panel.close[rows, j]
+            macd = seeded_ema(close, self.short_ema) - seeded_ema(close, self.long_ema)
+            signal = seeded_ema(macd, self.signal_ema, start=self.long_ema - 1)
+            crossover = macd_crossover(macd, signal)
+            # A signal on the symbol's last bar never reaches the market
+            signal_bars = np.flatnonzero(crossover[:-1])
+            fill_rows = rows[signal_bars + 1]
+            entries[fill_rows, j] = crossover[signal_bars] > 0
+            exits[fill_rows, j] = crossover[signal_bars] < 0
+            scores[fill_rows, j] = (macd[signal_bars] - signal[signal_bars]) / close[signal_bars]
+        return entries, exits, scores
+
+    def run(self, panel: PricePanel) -> Dict[str, any]:
+        # Simulate the basket and return a stats_dict in the layout of BackTraderUtils.back_test_macd plus portfolio
+        # figures; the per-date equity, cash, positions and turnover are kept in self.equity, the trades in self.trades
+        with span("portfolio.signals", symbols=len(panel.symbols)):
+            entries, exits, scores = self.signals(panel)
+        # Held positions are marked at their last close, so a symbol missing on a date keeps its previous value
+        marks = pd.DataFrame(panel.close).ffill().fillna(0.0).to_numpy()
+        dates = pd.DatetimeIndex(panel.dates)
+
+        shares = np.zeros(len(panel.symbols))
+        entry_price = np.zeros(len(panel.symbols))
+        entry_row = np.zeros(len(panel.symbols), dtype=np.int64)
+        cash = self.cash
+        equity = np.empty(len(dates))
+        cash_curve = np.empty(len(dates))
+        positions = np.empty(len(dates), dtype=np.int64)
+        traded = np.zeros(len(dates))
+        trades: List[Dict[str, any]] = []
+        previous_equity = self.cash
+
+        with span("portfolio.simulate", dates=len(dates)):
+            for i in range(len(dates)):
+                opens = panel.open[i]
+                # Exits first, so their proceeds can fund today's entries
+                for j in np.flatnonzero(exits[i] & (shares > 0)):
+                    price = opens[j] if np.isfinite(opens[j]) else marks[i, j]
+                    value = shares[j] * price
+                    cash += value - value * self.commission
+                    traded[i] += value
+                    trades.append({
+                        "symbol": panel.symbols[j], "entry_date": dates[entry_row[j]], "entry_price": entry_price[j],
+                        "exit_date": dates[i], "exit_price": price, "shares": int(shares[j]),
+                        "pnl": shares[j] * (price - entry_price[j]) - self.commission * shares[j] * (price + entry_price[j]),
+                    })
+                    shares[j] = 0.0
+
+                # Entries by descending score into the free slots, each sized from the equity at the previous close
+                slots = self.max_positions - int(np.count_nonzero(shares))
+                candidates = np.flatnonzero(entries[i] & (shares == 0) & np.isfinite(opens) & (opens > 0))
+                if slots > 0 and len(candidates):
+                    target = previous_equity * self.position_size
+                    for j in candidates[np.argsort(-scores[i, candidates], kind="stable")]:
+                        if slots == 0:
+                            break
+                        size = math.floor(min(target, cash) / (opens[j] * (1.0 + self.commission)))
+                        if size < 1:
+                            continue
+                        value = size * opens[j]
+                        cash -= value + value * self.commission
+                        traded[i] += value
+                        shares[j], entry_price[j], entry_row[j] = size, opens[j], i
+                        slots -= 1
+
+                previous_equity = equity[i] = cash + float(shares @ marks[i])
+                cash_curve[i] = cash
+                positions[i] = np.count_nonzero(shares)
+
+        # Positions still open at the end are listed at their last mark, like Backtrader's open trades
+        for j in np.flatnonzero(shares):
+            trades.append({
+                "symbol": panel.symbols[j], "entry_date": dates[entry_row[j]], "entry_price": entry_price[j],
+                "exit_date": None, "exit_price": marks[-1, j], "shares": int(shares[j]),
+                "pnl": shares[j] * (marks[-1, j] - entry_price[j]),
+            })
+
+        self.symbols = len(panel.symbols)
+        self.trades = pd.DataFrame(trades, columns=TRADE_COLUMNS)
+        self.equity = pd.DataFrame(
+            {"value": equity, "cash": cash_curve, "positions": positions, "turnover": traded / np.maximum(np.concatenate(([self.cash], equity[:-1])), 1e-12)},
+            index=dates,
+        )
+        return self.stats()
+
+    def stats(self) -> Dict[str, any]:
+        # Portfolio figures of the last run
+        value = self.equity["value"].to_numpy()
+        closed = self.trades[self.trades["exit_date"].notna()]
+        pnls = closed["pnl"].to_numpy(dtype=np.float64)
+        gross_won = pnls[pnls >= 0.0].sum()
+        gross_lost = -pnls[pnls < 0.0].sum()
+        if gross_lost:
+            profit_factor = gross_won / gross_lost
+        else:
+            profit_factor = float('inf') if gross_won else float('nan')
+        turnover = float(self.equity["turnover"].sum())
+        invested = 1.0 - self.equity["cash"].to_numpy() / value
+
+        stats_dict: Dict[str, any] = {"Starting Portfolio Value": self.cash}
+        stats_dict["Final Portfolio Value"] = float(value[-1])
+        stats_dict["Sharpe Ratio"] = VectorizedMACDStrategy.sharpe_ratio(self.equity.index, value, self.cash)
+        stats_dict["Drawdown"] = VectorizedMACDStrategy.drawdown_stats(value)
+        stats_dict["Returns"] = VectorizedMACDStrategy.returns_stats(self.cash, float(value[-1]), len(value))
+        stats_dict["Portfolio"] = {
+            "symbols": self.symbols,
+            "long_only": True,
+            "max_positions": self.max_positions,
+            "average_positions": float(self.equity["positions"].mean()),
+            "exposure": float(invested.mean()) * 100.0,
+            "turnover": turnover,
+            "annual_turnover": turnover * TRADING_DAYS / len(value),
+            "trades_closed": len(closed),
+            "trades_open": len(self.trades) - len(closed),
+            "win_rate": 100.0 * float((pnls >= 0.0).mean()) if len(pnls) else float('nan'),
+            "profit_factor": profit_factor,
+        }
+        return stats_dict
+
+    def plot(self, save_fig: str):
+        # Portfolio value above the number of open positions
+        import matplotlib.pyplot as plt  # Deferred so runs without a figure never load matplotlib
+        fig, (value_ax, positions_ax) = plt.subplots(2, 1, figsize=(16, 10), sharex=True, gridspec_kw={"height_ratios": (3, 1)})
+        value_ax.plot(self.equity.index, self.equity["value"], color='blue', linewidth=1.0, label='Portfolio Value')
+        value_ax.legend(loc='upper left')
+        positions_ax.step(self.equity.index, self.equity["positions"], color='black', linewidth=1.0, where='post', label='Open Positions')
+        positions_ax.legend(loc='upper left')
+        fig.savefig(save_fig)
+        plt.close(fig)
+
+class PortfolioUtils:
+    # Utility class exposing the portfolio backtest to the agents
+    def backtest_portfolio(
+        self,
+        start_date: Annotated[str, "Start date of the backtest in 'YYYY-MM-DD' format"],
+        end_date: Annotated[str, "End date of the backtest in 'YYYY-MM-DD' format"],
+        symbols: Annotated[Optional[str], "Comma separated stock symbols of the basket (required)"] = None,
+        short_ema: Annotated[int, "Short EMA period"] = 12,
+        long_ema: Annotated[int, "Long EMA period"] = 26,
+        signal_ema: Annotated[int, "Signal EMA period"] = 9,
+        max_positions: Annotated[int, "Maximum number of positions held at once"] = 10,
+        position_size: Annotated[Optional[float], "Fraction of equity per new position (default: 1 / max_positions)"] = None,
+        cash: Annotated[float, "Initial cash shared by the whole basket"] = 100000.0,
+        commission: Annotated[float, "Commission as a fraction of traded value"] = 0.0,
+        save_fig: Optional[Annotated[str, "File path to save the portfolio equity plot"]] = None,
+        data_dir: Annotated[str, "Directory holding one CSV per symbol"] = DATA_DIR,
+    ) -> str:
+        """
+        Backtest the long-only MACD strategy on a basket of symbols sharing one cash account and a maximum number of
+        positions: bullish crossovers open positions and bearish crossovers close them (no short selling).
+        """
+
+        basket = [symbol.strip() for symbol in (symbols or "").split(",") if symbol.strip()]
+        if not basket:
+            return ("Error: Give the basket as comma separated stock symbols. data/DailyData also holds index and ETF "
+                    "series (e.g. NIFTY50DIV, BANKNIFTY, NIFTYBEES) that cannot be traded as stocks.")
+        try:
+            backtester = PortfolioBacktester(short_ema, long_ema, signal_ema, max_positions, position_size, cash, commission)
+            universe = list_universe(data_dir, basket)
+        except ValueError as e:
+            return f"Error: {e}"
+        except FileNotFoundError:
+            return f"Error: Data directory not found at {data_dir}."
+
+        with span("portfolio.load", symbols=len(universe)):
+            panel = PricePanel(universe, start_date, end_date, ('open', 'close'))
+        if not panel.symbols:
+            return "Error: No data available for the specified date range."
+        stats_dict = backtester.run(panel)
+        if save_fig:
+            backtester.plot(save_fig)
+
+        portfolio = stats_dict["Portfolio"]
+        value = stats_dict["Final Portfolio Value"]
+        summary = {
+            "final_value": value,
+            "total_return": (value / cash - 1.0) * 100.0,
+            "annual_return": stats_dict["Returns"]["rnorm100"],
+            "sharpe_ratio": stats_dict["Sharpe Ratio"]["sharperatio"],
+            "max_drawdown": stats_dict["Drawdown"]["max"]["drawdown"],
+            **{key: portfolio[key] for key in ("average_positions", "exposure", "turnover", "annual_turnover", "trades_closed", "trades_open", "win_rate", "profit_factor")},
+        }
+        closed = backtester.trades[backtester.trades["exit_date"].notna()]
+        best = closed.groupby("symbol")["pnl"].sum().sort_values(ascending=False)
+        return (
+            f"Portfolio Backtest Finished (long-only). {len(panel.symbols)} symbols ({len(panel.errors)} failed to load), "
+            f"{len(panel.dates)} dates, at most {max_positions} positions. Results: \n"
+            + "\n".join(f"{key}: {'n/a' if val is None else round(val, 4)}" for key, val in summary.items())
+            + ("\nTop symbols by closed-trade PnL: " + ", ".join(f"{symbol} {pnl:.2f}" for symbol, pnl in best.head(5).items()) if len(best) else "")
+            + (f"\nPortfolio plot saved to {save_fig}" if save_fig else "")
+        )
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for basket backtests
+    import time  # For elapsed-time reporting
+
+    parser = argparse.ArgumentParser(description="Backtest the MACD strategy on a basket of symbols with shared cash.")
+    parser.add_argument("--start-date", default="2022-01-01")
+    parser.add_argument("--end-date", default="2024-01-01")
+    parser.add_argument("--symbols", required=True, help="Comma separated stock symbols of the basket")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--short-ema", type=int, default=12)
+    parser.add_argument("--long-ema", type=int, default=26)
+    parser.add_argument("--signal-ema", type=int, default=9)
+    parser.add_argument("--max-positions", type=int, default=10)
+    parser.add_argument("--position-size", type=float, default=None)
+    parser.add_argument("--cash", type=float, default=100000.0)
+    parser.add_argument("--commission", type=float, default=0.0)
+    parser.add_argument("--save-fig", default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print(PortfolioUtils().backtest_portfolio(
+        args.start_date, args.end_date, args.symbols, args.short_ema, args.long_ema, args.signal_ema, args.max_positions,
+        args.position_size, args.cash, args.commission, args.save_fig, args.data_dir,
+    ))
+    print(f"Elapsed {time.perf_counter() - started:.2f}s")
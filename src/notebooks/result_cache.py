@@ -0,0 +1,163 @@
+# result_cache.py
+
+# This file defines `ResultCache`, a persistent SQLite cache for tool results such as backtests and MACD charts.
+# Entries are keyed on a content hash of the input CSV plus every argument of the call, so a repeated request for
+# the same symbol, window and parameters (even from a new agent session) is answered without recomputing. Saved
+# images are stored alongside the text result and written back to disk on a hit. Entries expire after a TTL and the
+# least recently used ones are evicted once the database grows past its size budget.
+
+import hashlib  # For content hashes and cache keys
+import json  # For serializing call arguments into keys
+import os  # For file operations and settings
+import sqlite3  # For the on-disk cache
+import threading  # For guarding the in-process file hash memo
+import time  # For TTL bookkeeping
+from contextlib import closing  # For closing SQLite connections
+from typing import Callable, Dict, Optional  # For type annotations
+from telemetry import add_counters  # For hit/miss counters on the current span
+
+# Default database location, TTL and size budget, overridable through environment variables
+CACHE_PATH = os.environ.get(
+    "MACD_RESULT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'cache', 'results.sqlite'),
+)
+TTL_SECONDS = float(os.environ.get("MACD_RESULT_CACHE_TTL", 7 * 24 * 3600))
+MAX_BYTES = int(os.environ.get("MACD_RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Set MACD_RESULT_CACHE=0 to bypass the cache for every call
+ENABLED = os.environ.get("MACD_RESULT_CACHE", "1") != "0"
+
+# Part of every key; bump it when a change to the engines alters results so older entries stop matching
+KEY_VERSION = 1
+
+class ResultCache:
+    def __init__(self, path: str = CACHE_PATH, ttl_seconds: float = TTL_SECONDS, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._file_hashes: Dict[str, tuple] = {}  # path -> (size, mtime_ns, digest)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Open the database, creating it and its table on first use
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, artifact BLOB, "
+            "size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        return conn
+
+    def file_hash(self, file_path: str) -> str:
+        # SHA-256 of a file's contents, re-read only when its size or modification time changes
+        stat = os.stat(file_path)
+        key = os.path.abspath(file_path)
+        with self._lock:
+            memo = self._file_hashes.get(key)
+        if memo and memo[:2] == (stat.st_size, stat.st_mtime_ns):
+            return memo[2]
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as source:
+            for block in iter(lambda: source.read(1 << 20), b''):
+                digest.update(block)
+        with self._lock:
+            self._file_hashes[key] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+        return digest.hexdigest()
+
+    def make_key(self, namespace: str, csv_file_path: str, arguments: Dict[str, any]) -> str:
+        # Key for one call: tool name, content of the input data and all arguments
+        payload = json.dumps(
+            {"version": KEY_VERSION, "namespace": namespace, "data": self.file_hash(csv_file_path), "arguments": arguments},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[tuple]:
+        # (result, artifact) for a live entry, or None; expired entries are dropped on the way
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT result, artifact, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def set(self, key: str, result: str, artifact: Optional[bytes] = None):
+        # Store a result, then enforce the TTL and the size budget
+        now = time.time()
+        size = len(result.encode()) + len(artifact or b'')
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, result, artifact, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, result, artifact, size, now, now),
+            )
+            conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl_seconds,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk entries from least to most recently used and delete until the budget is met
+                excess = total - self.max_bytes
+                victims = []
+                for victim_key, victim_size in conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+                    if excess <= 0:
+                        break
+                    victims.append((victim_key,))
+                    excess -= victim_size
+                conn.executemany("DELETE FROM results WHERE key = ?", victims)
+
+    def cached_call(
+        self,
+        namespace: str,
+        csv_file_path: str,
+        arguments: Dict[str, any],
+        compute: Callable[[], str],
+        artifact_path: Optional[str] = None,
+        use_cache: bool = True,
+    ) -> str:
+        # Return the stored result for this call if there is one (restoring artifact_path), otherwise run compute()
+        # and store its result. Error results are never stored, and cache failures fall back to computing.
+        if not (use_cache and ENABLED):
+            return compute()
+        try:
+            key = self.make_key(namespace, csv_file_path, arguments)
+            cached = self.get(key)
+        except (OSError, sqlite3.Error):
+            return compute()  # Missing input file or unusable cache: let the tool report it
+
+        if cached is not None and (artifact_path is None or cached[1] is not None):
+            if artifact_path:
+                directory = os.path.dirname(artifact_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(artifact_path, 'wb') as artifact_file:
+                    artifact_file.write(cached[1])
+            self.hits += 1
+            add_counters(result_cache_hits=1)
+            return cached[0]
+
+        self.misses += 1
+        add_counters(result_cache_misses=1)
+        result = compute()
+        if not result.startswith("Error"):
+            try:
+                artifact = None
+                if artifact_path and os.path.exists(artifact_path):
+                    with open(artifact_path, 'rb') as artifact_file:
+                        artifact = artifact_file.read()
+                self.set(key, result, artifact)
+            except (OSError, sqlite3.Error):
+                pass  # The result is still valid even if it could not be stored
+        return result
+
+    def clear(self):
+        # Delete every stored result
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM results")
+
+# Cache shared by the agent tools
+default_cache = ResultCache()
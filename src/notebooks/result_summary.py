@@ -0,0 +1,175 @@
+# result_summary.py
+
+# This file turns the nested analyzer output of a backtest (TradeAnalyzer, DrawDown, Returns, SharpeRatio) into a
+# fixed, compact metrics schema for the LLM context. The full stats are kept on disk by `DetailStore` under a short
+# content-derived id, so an agent can still fetch a section of the detailed report when it needs it instead of
+# ingesting the whole tree every turn. Reports follow the result cache's retention policy: they expire after its TTL and
+# the least recently used ones are deleted once the directory grows past its size budget, so a stored report outlives
+# the cached compact results that point at it.
+
+import hashlib  # For content-derived result ids
+import json  # For the stored reports
+import math  # For non-finite checks
+import os  # For file operations and settings
+import tempfile  # For atomic writes
+import time  # For TTL bookkeeping
+from typing import Dict, Optional  # For type annotations
+from result_cache import MAX_BYTES, TTL_SECONDS  # For the retention policy shared with cached results
+
+# Default location of the detailed reports, overridable with the MACD_DETAIL_DIR environment variable
+DETAIL_DIR = os.environ.get(
+    "MACD_DETAIL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'cache', 'details'),
+)
+
+# Rough characters-per-token ratio of JSON text, used to report payload sizes in tokens
+CHARS_PER_TOKEN = 4
+
+def _get(tree: dict, *keys, default=None):
+    # Nested lookup that tolerates the sections Backtrader omits (e.g. "won"/"lost" before any trade closed)
+    for key in keys:
+        if not isinstance(tree, dict) or key not in tree:
+            return default
+        tree = tree[key]
+    return tree
+
+def _number(value, digits: int = 4) -> Optional[float]:
+    # Round finite numbers; NaN and missing values become None so the payload stays valid JSON
+    if value is None:
+        return None
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return round(value, digits) if math.isfinite(value) else value
+
+def summarize_stats(stats_dict: Dict[str, any]) -> Dict[str, float]:
+    # Reduce a back_test_macd stats_dict to the flat metrics used by sweeps and batch runs
+    trades = stats_dict["Trade Analysis"]
+    closed = trades.get("total", {}).get("closed", 0)
+    won_pnl = trades.get("won", {}).get("pnl", {}).get("total", 0.0) if closed else 0.0
+    lost_pnl = -trades.get("lost", {}).get("pnl", {}).get("total", 0.0) if closed else 0.0
+    if lost_pnl:
+        profit_factor = won_pnl / lost_pnl
+    else:
+        profit_factor = float('inf') if won_pnl else float('nan')
+    sharpe = stats_dict["Sharpe Ratio"]["sharperatio"]
+    final_value = stats_dict["Final Portfolio Value"]
+    return {
+        "final_value": final_value,
+        "total_return": (final_value / stats_dict["Starting Portfolio Value"] - 1.0) * 100.0,
+        "sharpe_ratio": float('nan') if sharpe is None else sharpe,
+        "max_drawdown": stats_dict["Drawdown"]["max"]["drawdown"],
+        "profit_factor": profit_factor,
+        "win_rate": 100.0 * trades["won"]["total"] / closed if closed else float('nan'),
+        "trades": closed,
+    }
+
+def compact_stats(stats_dict: Dict[str, any]) -> Dict[str, Optional[float]]:
+    # Fixed schema of a few dozen numbers covering value, risk, returns and trades; every key is always present
+    trades = stats_dict["Trade Analysis"]
+    drawdown = stats_dict["Drawdown"]
+    returns = stats_dict["Returns"]
+    flat = summarize_stats(stats_dict)
+    compact = {
+        "starting_value": stats_dict["Starting Portfolio Value"],
+        "final_value": flat["final_value"],
+        "total_return_pct": flat["total_return"],
+        "annual_return_pct": _get(returns, "rnorm100"),
+        "sharpe_ratio": flat["sharpe_ratio"],
+        "max_drawdown_pct": flat["max_drawdown"],
+        "max_drawdown_money": _get(drawdown, "max", "moneydown"),
+        "max_drawdown_bars": _get(drawdown, "max", "len"),
+        "current_drawdown_pct": _get(drawdown, "drawdown"),
+        "trades_total": _get(trades, "total", "total", default=0),
+        "trades_open": _get(trades, "total", "open", default=0),
+        "trades_closed": flat["trades"],
+        "trades_won": _get(trades, "won", "total", default=0),
+        "trades_lost": _get(trades, "lost", "total", default=0),
+        "win_rate_pct": flat["win_rate"],
+        "profit_factor": flat["profit_factor"],
+        "pnl_net": _get(trades, "pnl", "net", "total", default=0.0),
+        "pnl_net_avg": _get(trades, "pnl", "net", "average"),
+        "won_pnl_avg": _get(trades, "won", "pnl", "average"),
+        "won_pnl_max": _get(trades, "won", "pnl", "max"),
+        "lost_pnl_avg": _get(trades, "lost", "pnl", "average"),
+        "lost_pnl_max": _get(trades, "lost", "pnl", "max"),
+        "long_trades": _get(trades, "long", "total", default=0),
+        "long_pnl": _get(trades, "long", "pnl", "total"),
+        "short_trades": _get(trades, "short", "total", default=0),
+        "short_pnl": _get(trades, "short", "pnl", "total"),
+        "longest_win_streak": _get(trades, "streak", "won", "longest"),
+        "longest_loss_streak": _get(trades, "streak", "lost", "longest"),
+        "avg_bars_in_trade": _get(trades, "len", "average"),
+        "max_bars_in_trade": _get(trades, "len", "max"),
+    }
+    return {key: value if isinstance(value, int) else _number(value) for key, value in compact.items()}
+
+def payload_size(text: str) -> Dict[str, int]:
+    # Characters and approximate tokens of a tool result
+    return {"chars": len(text), "tokens": -(-len(text) // CHARS_PER_TOKEN)}
+
+class DetailStore:
+    def __init__(self, directory: str = DETAIL_DIR, ttl_seconds: float = TTL_SECONDS, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    def path(self, result_id: str) -> str:
+        return os.path.join(self.directory, f"{result_id}.json")
+
+    def save(self, stats_dict: Dict[str, any], context: Optional[Dict[str, any]] = None) -> str:
+        # Store the full report and return its id, then enforce the TTL and the size budget; identical reports share
+        # one file, whose modification time is refreshed so it lives at least as long as the result pointing at it
+        report = json.dumps({"context": context or {}, "stats": stats_dict}, sort_keys=True, default=str)
+        result_id = "bt-" + hashlib.sha256(report.encode()).hexdigest()[:12]
+        path = self.path(result_id)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, staging = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(handle, 'w') as report_file:
+                report_file.write(report)
+            os.replace(staging, path)
+        self.prune(keep=result_id)
+        return result_id
+
+    def prune(self, keep: Optional[str] = None):
+        # Delete expired reports, then the least recently used ones until the directory fits the size budget
+        now = time.time()
+        reports = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json') or entry.name == f"{keep}.json":
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Removed by a concurrent prune
+                reports.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in reports)
+        if keep is not None:
+            total += os.path.getsize(self.path(keep))
+        for mtime, size, path in sorted(reports):
+            if now - mtime <= self.ttl_seconds and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def load(self, result_id: str) -> Dict[str, any]:
+        # Full report stored under an id; raises FileNotFoundError for an unknown id
+        if os.path.basename(result_id) != result_id:
+            raise FileNotFoundError(result_id)
+        with open(self.path(result_id)) as report_file:
+            report = json.load(report_file)
+        try:
+            os.utime(self.path(result_id))  # Mark it recently used for the size budget
+        except FileNotFoundError:
+            pass  # Pruned meanwhile; the report was already read
+        return report
+
+# Store shared by the backtesting tools
+default_details = DetailStore()
@@ -0,0 +1,187 @@
+# scanner.py
+
+# This file defines `MACDCrossoverScanner`, a cross-sectional screen for MACD crossovers across the whole universe.
+# The close prices of every symbol are aligned into one dates x symbols array and the EMAs, MACD and signal line are
+# computed column-wise in a single vectorized pass over the dates, with the same results per symbol as
+# MACDDataProcessor. `MACDScannerUtils` wraps it into an agent-friendly method that lists the symbols whose MACD
+# crossed its signal line in the last few sessions, ranked by histogram magnitude.
+
+import os  # For the symbol names of dataset files
+import numpy as np  # For the dates x symbols arrays
+import pandas as pd  # For the results table
+from typing import Annotated, Dict, List, Optional, Tuple  # For type annotations
+from data_store import DATA_DIR, default_store, list_universe  # For reading symbols straight from the columnar cache
+from market_data import default_dataset  # For reading many symbols in one pass over the consolidated dataset
+
+# Columns of the scan results table
+SCAN_COLUMNS = ["symbol", "crossover", "crossover_date", "close", "macd", "signal", "histogram"]
+
+def panel_ema(values: np.ndarray, present: np.ndarray, period: int) -> np.ndarray:
+    # Column-wise EMA of a dates x symbols array with the recurrence of ewm(span=period, adjust=False).mean().
+    # Cells where a symbol has no row (present=False) carry its previous value without decaying the history,
+    # so every column matches the EMA of that symbol's own series; NaN closes on existing rows decay it as usual.
+    alpha = 2.0 / (period + 1.0)
+    out = np.empty_like(values)
+    weighted = np.full(values.shape[1], np.nan)
+    old_weight = np.ones(values.shape[1])
+    for i in range(values.shape[0]):
+        x = values[i]
+        row = present[i]
+        started = ~np.isnan(weighted)
+        observed = ~np.isnan(x)
+        decay = row & started
+        old_weight = np.where(decay, old_weight * (1.0 - alpha), old_weight)
+        update = decay & observed & (weighted != x)
+        blended = (old_weight * weighted + alpha * x) / (old_weight + alpha)
+        weighted = np.where(update, blended, weighted)
+        old_weight = np.where(decay & observed, 1.0, old_weight)
+        weighted = np.where(row & ~started & observed, x, weighted)
+        out[i] = weighted
+    return out
+
+class PricePanel:
+    def __init__(self, universe: List[Tuple[str, str]], start_date: Optional[str], end_date: Optional[str], columns: Tuple[str, ...] = ('close',)):
+        # Load the given columns of (symbol, csv path) pairs between start_date and end_date into aligned dates x
+        # symbols arrays, one attribute per column, with `present` marking the cells where a symbol has a row.
+        # Files the consolidated dataset is up to date with are read from it in one query, the others from the
+        # columnar cache directly, so a panel does not evict the frames cached for the tools.
+        self.errors: Dict[str, str] = {}
+        self.columns = columns
+        first = None if start_date is None else np.datetime64(pd.Timestamp(start_date), 'ns')
+        last = None if end_date is None else np.datetime64(pd.Timestamp(end_date), 'ns')
+        covered = [(symbol, csv_file_path) for symbol, csv_file_path in universe if default_dataset.covers(csv_file_path)]
+        offsets, arrays = default_dataset.read([os.path.splitext(os.path.basename(path))[0] for _, path in covered], start_date, end_date, columns)
+        stored = {symbol: (offsets[k], offsets[k + 1]) for k, (symbol, _) in enumerate(covered)}
+        series = []
+        for symbol, csv_file_path in universe:
+            if symbol in stored:
+                lo, hi = stored[symbol]
+                if hi > lo:
+                    series.append((symbol, arrays['date'][lo:hi], {name: arrays[name][lo:hi] for name in columns}))
+                continue
+            try:
+                file_arrays = default_store.load_arrays(csv_file_path, columns)
+            except (OSError, ValueError, KeyError, pd.errors.ParserError) as e:
+                self.errors[symbol] = f"{type(e).__name__}: {e}"
+                continue
+            dates = file_arrays['date']
+            if len(dates) > 1 and not (dates[1:] > dates[:-1]).all():
+                self.errors[symbol] = "Dates are not strictly increasing."
+                continue
+            # Same rows as df.loc[start_date:end_date] on the sorted dates
+            lo = 0 if first is None else int(np.searchsorted(dates, first, side='left'))
+            hi = len(dates) if last is None else int(np.searchsorted(dates, last, side='right'))
+            if hi > lo:
+                series.append((symbol, dates[lo:hi], {name: file_arrays[name][lo:hi] for name in columns}))
+
+        self.symbols = [symbol for symbol, _, _ in series]
+        self.dates = np.unique(np.concatenate([dates for _, dates, _ in series])) if series else np.array([], dtype='datetime64[ns]')
+        self.present = np.zeros((len(self.dates), len(series)), dtype=bool)
+        for name in columns:
+            setattr(self, name, np.full(self.present.shape, np.nan))
+        for j, (_, dates, values) in enumerate(series):
+            rows = np.searchsorted(self.dates, dates)
+            self.present[rows, j] = True
+            for name in columns:
+                getattr(self, name)[rows, j] = values[name]
+
+class MACDCrossoverScanner(PricePanel):
+    def __init__(self, universe: List[Tuple[str, str]], start_date: Optional[str], end_date: Optional[str]):
+        # Close prices of the universe between start_date and end_date, aligned into one panel
+        super().__init__(universe, start_date, end_date, ('close',))
+
+    def macd(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # MACD line, signal line and histogram of every symbol, as dates x symbols arrays. Dates on which a symbol
+        # did not trade hold its last values.
+        macd = panel_ema(self.close, self.present, short_ema) - panel_ema(self.close, self.present, long_ema)
+        signal = panel_ema(macd, self.present, signal_ema)
+        return macd, signal, macd - signal
+
+    @staticmethod
+    def crossovers(macd: np.ndarray, signal: np.ndarray, present: np.ndarray) -> np.ndarray:
+        # +1 where MACD crosses above the signal line, -1 where it crosses below, 0 elsewhere, using the crossover
+        # points of MACDPlotter.plot_macd against each symbol's previous trading day
+        events = np.zeros(macd.shape, dtype=np.int8)
+        previous_macd, previous_signal = macd[:-1], signal[:-1]
+        current_macd, current_signal = macd[1:], signal[1:]
+        with np.errstate(invalid='ignore'):
+            events[1:][(previous_macd < previous_signal) & (current_macd >= current_signal)] = 1
+            events[1:][(previous_macd > previous_signal) & (current_macd <= current_signal)] = -1
+        events[~present] = 0
+        return events
+
+    def scan(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9, window: int = 1, direction: str = "both") -> pd.DataFrame:
+        # Symbols with a crossover in the last `window` dates of the panel, one row per symbol (its latest crossover),
+        # ranked by the magnitude of the histogram on the last date
+        macd, signal, histogram = self.macd(short_ema, long_ema, signal_ema)
+        window = min(window, len(self.dates))  # A window longer than the panel covers all of it
+        events = self.crossovers(macd, signal, self.present)[len(self.dates) - window:]
+        if direction == "bullish":
+            events = np.where(events > 0, events, 0)
+        elif direction == "bearish":
+            events = np.where(events < 0, events, 0)
+
+        crossed = np.flatnonzero(events.any(axis=0))
+        if crossed.size == 0:
+            return pd.DataFrame(columns=SCAN_COLUMNS)
+        # Latest crossover within the window for each symbol that crossed
+        latest = events.shape[0] - 1 - np.argmax(events[::-1, crossed] != 0, axis=0)
+        results = pd.DataFrame({
+            "symbol": [self.symbols[j] for j in crossed],
+            "crossover": np.where(events[latest, crossed] > 0, "bullish", "bearish"),
+            "crossover_date": pd.DatetimeIndex(self.dates[len(self.dates) - window:][latest]).strftime('%Y-%m-%d'),
+            "close": pd.DataFrame(self.close[:, crossed]).ffill().to_numpy()[-1],
+            "macd": macd[-1, crossed],
+            "signal": signal[-1, crossed],
+            "histogram": histogram[-1, crossed],
+        })
+        order = np.argsort(-np.abs(results["histogram"].to_numpy()), kind="stable")
+        return results.iloc[order].reset_index(drop=True)
+
+class MACDScannerUtils:
+    def scan_crossovers(
+        self,
+        start_date: Annotated[str, "Start of the price history used for the EMAs in 'YYYY-MM-DD' format"],
+        end_date: Annotated[str, "Last date of the scan in 'YYYY-MM-DD' format"],
+        window: Annotated[int, "Number of most recent trading sessions in which to look for crossovers"] = 1,
+        short_ema: Annotated[int, "Short EMA period"] = 12,
+        long_ema: Annotated[int, "Long EMA period"] = 26,
+        signal_ema: Annotated[int, "Signal EMA period"] = 9,
+        direction: Annotated[str, "'bullish', 'bearish' or 'both'"] = "both",
+        top_n: Annotated[int, "Number of symbols to return"] = 20,
+        symbols: Annotated[Optional[str], "Comma separated symbols to scan (default: every CSV in data/DailyData)"] = None,
+        data_dir: Annotated[str, "Directory holding one CSV per symbol"] = DATA_DIR,
+    ) -> str:
+        """
+        Scan the universe for MACD/signal crossovers in the last `window` sessions and return them ranked by histogram magnitude.
+        """
+
+        if direction not in ("bullish", "bearish", "both"):
+            return f"Error: Unknown direction '{direction}'. Use 'bullish', 'bearish' or 'both'."
+        if window < 1:
+            return "Error: window must be at least 1."
+        if not 0 < short_ema < long_ema or signal_ema < 1:
+            return "Error: EMA periods must satisfy 0 < short_ema < long_ema and signal_ema > 0."
+
+        # Collect the (symbol, csv path) pairs to scan
+        try:
+            universe = list_universe(data_dir, [symbol.strip() for symbol in symbols.split(",") if symbol.strip()] if symbols else None)
+        except FileNotFoundError:
+            return f"Error: Data directory not found at {data_dir}."
+
+        scanner = MACDCrossoverScanner(universe, start_date, end_date)
+        if not scanner.symbols:
+            return "Error: No data available for the specified date range."
+        results = scanner.scan(short_ema, long_ema, signal_ema, window, direction)
+        window_start = pd.Timestamp(scanner.dates[-min(window, len(scanner.dates))]).strftime('%Y-%m-%d')
+        window_end = pd.Timestamp(scanner.dates[-1]).strftime('%Y-%m-%d')
+        bullish = int((results["crossover"] == "bullish").sum())
+
+        # Return the ranked table, rounding prices and indicators for readability
+        summary = (
+            f"Scan Finished. Scanned {len(scanner.symbols)} symbols ({len(scanner.errors)} failed to load) from {window_start} to {window_end}: "
+            f"{bullish} bullish and {len(results) - bullish} bearish crossovers. Top {min(top_n, len(results))} by |histogram|: \n"
+        )
+        if results.empty:
+            return summary + "No crossovers found."
+        return summary + results.head(top_n).round(4).to_string(index=False)
@@ -0,0 +1,20 @@
+# settings.py
+
+# This file holds the lightweight run settings shared by every module: the symbol, date range and data file of the
+# analysis, plus the location of the LLM configuration file. It imports nothing beyond the standard library, so data
+# processing, backtesting workers and command-line batch jobs can read their settings without loading the agent
+# stack; the LLM configurations themselves are built lazily in config.py.
+
+import os  # For the configuration file override
+
+# Configuration for backtesting
+company = "AAKASH"  # The company for which financial data will be analyzed
+start_date = "2022-01-01"  # Start date for the backtest
+end_date = "2024-01-01"  # End date for the backtest
+file_path = f'../../data/DailyData/{company}.csv'  # Path to the data file
+
+# Path of the JSON file with the LLM configurations, read only when an agent needs them
+config_file = os.environ.get("MACD_CONFIG_FILE", "./CONFIG.json")
+
+# Global variable to store backtesting results
+backtesting_result = None
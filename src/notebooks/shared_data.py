@@ -0,0 +1,160 @@
+# shared_data.py
+
+# This file defines `SharedFrames`, a shared-memory data plane for process pools. The parent publishes the OHLCV
+# columns of the frames a job needs (one symbol, or the active universe over a date range) once, as a single file
+# in /dev/shm, and pool workers receive a small picklable `SharedFramesHandle` instead of the data. Workers memory-map
+# the file read-only and build date-indexed frames whose columns are views on the mapping, so every process reads
+# the same physical pages and memory stays close to one copy of the data whatever the worker count. The parent
+# removes the file when the job ends (context manager, garbage collection or interpreter exit), workers keep valid
+# mappings until they exit, and files left by processes that were killed are removed by the next publisher.
+
+import os  # For segment files and process checks
+import tempfile  # For the fallback segment directory
+import weakref  # For removing the segment when its owner goes away
+import numpy as np  # For the mapped column arrays
+import pandas as pd  # For the frames served to workers
+from typing import Dict, List, Optional, Tuple  # For type annotations
+from data_store import COLUMNS, default_store  # For the column layout and loading files the dataset does not cover
+from data_loader import slice_range  # For the same date-range semantics as the loader
+from market_data import default_dataset  # For reading the active universe in one pass
+
+# Directory of the segment files: a RAM-backed filesystem when there is one, overridable with MACD_SHARED_DIR
+SHARED_DIR = os.environ.get("MACD_SHARED_DIR") or ("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+# Segment file names are PREFIX<owner pid>-<random>.bin
+PREFIX = "macd-frames-"
+
+# Byte alignment of each column in a segment
+ALIGNMENT = 64
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+def remove_stale_segments(directory: str = SHARED_DIR) -> int:
+    # Delete segment files whose owner process no longer exists (killed before it could clean up) and return how many
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    for name in names:
+        if not name.startswith(PREFIX):
+            continue
+        try:
+            pid = int(name[len(PREFIX):].split('-')[0])
+        except ValueError:
+            continue
+        if not _alive(pid):
+            _remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+# Column arrays of the segments this process has mapped, by segment path
+_attached: Dict[str, Dict[str, np.ndarray]] = {}
+
+class SharedFramesHandle:
+    def __init__(self, path: str, layout: Dict[str, Tuple[str, int, int]], keys: Dict[str, Tuple[int, int]]):
+        # Picklable description of a segment: column -> (dtype, byte offset, length) and frame key -> row range
+        self.path = path
+        self.layout = layout
+        self.keys = keys
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.keys
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        # Read-only column arrays of the segment, mapped once per process
+        arrays = _attached.get(self.path)
+        if arrays is None:
+            # Empty columns are not mapped: mmap cannot map zero bytes
+            arrays = {column: np.memmap(self.path, dtype=np.dtype(dtype), mode='r', offset=offset, shape=(length,)) if length else np.empty(0, dtype=dtype)
+                      for column, (dtype, offset, length) in self.layout.items()}
+            _attached[self.path] = arrays
+        return arrays
+
+    def frame(self, key: str) -> pd.DataFrame:
+        # Date-indexed frame of one key whose columns are views on the segment (treat it as read-only)
+        lo, hi = self.keys[key]
+        arrays = self.arrays()
+        index = pd.DatetimeIndex(arrays['date'][lo:hi], name='date', copy=False)
+        return pd.DataFrame({column: arrays[column][lo:hi] for column in self.layout if column != 'date'}, index=index, copy=False)
+
+class SharedFrames:
+    def __init__(self, keys: List[str], offsets: np.ndarray, arrays: Dict[str, np.ndarray], directory: str = SHARED_DIR):
+        # Publish frames given as concatenated 'date' and column arrays, with rows offsets[k]:offsets[k + 1] for
+        # keys[k], into a new segment file. Columns are stored as float64 (volumes included), dates as datetime64[ns].
+        remove_stale_segments(directory)
+        dtypes = {name: np.dtype('datetime64[ns]') if name == 'date' else np.dtype(np.float64) for name in arrays}
+        layout, size = {}, 0
+        for name, values in arrays.items():
+            layout[name] = (dtypes[name].str, size, len(values))
+            size += -(-len(values) * dtypes[name].itemsize // ALIGNMENT) * ALIGNMENT
+        handle, self.path = tempfile.mkstemp(prefix=f"{PREFIX}{os.getpid()}-", suffix='.bin', dir=directory)
+        os.close(handle)
+        # Registered before writing, so a failed write does not leave the file behind
+        self._finalizer = weakref.finalize(self, _remove, self.path)
+        if size:
+            segment = np.memmap(self.path, dtype=np.uint8, mode='w+', shape=(size,))
+            for name, values in arrays.items():
+                _, offset, length = layout[name]
+                segment[offset:offset + length * dtypes[name].itemsize].view(dtypes[name])[:] = values
+            segment.flush()
+            del segment
+        self.nbytes = size
+        self.handle = SharedFramesHandle(self.path, layout, {key: (int(offsets[k]), int(offsets[k + 1])) for k, key in enumerate(keys)})
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], directory: str = SHARED_DIR) -> "SharedFrames":
+        # Publish date-indexed OHLCV frames by key
+        keys = list(frames)
+        offsets = np.r_[0, np.cumsum([len(frames[key]) for key in keys])].astype(np.int64)
+        arrays = {'date': np.concatenate([frames[key].index.to_numpy(dtype='datetime64[ns]') for key in keys]) if keys else np.array([], dtype='datetime64[ns]')}
+        for column in COLUMNS:
+            arrays[column] = np.concatenate([frames[key][column].to_numpy(dtype=np.float64) for key in keys]) if keys else np.array([])
+        return cls(keys, offsets, arrays, directory)
+
+    @classmethod
+    def from_universe(cls, universe: List[Tuple[str, str]], start_date: Optional[str], end_date: Optional[str], directory: str = SHARED_DIR) -> "SharedFrames":
+        # Publish the bars between start_date and end_date of (symbol, csv path) pairs, keyed by symbol. Files the
+        # market dataset is up to date with are read from it in one pass, the others from the columnar cache.
+        # Symbols whose file cannot be read are left out, so workers load them (and report the error) themselves.
+        covered = [(symbol, path) for symbol, path in universe if default_dataset.covers(path)]
+        offsets, arrays = default_dataset.read([os.path.splitext(os.path.basename(path))[0] for _, path in covered], start_date, end_date)
+        covered_symbols = {symbol for symbol, _ in covered}
+        frames, keys = [], []
+        for symbol, csv_file_path in universe:
+            if symbol in covered_symbols:
+                continue
+            try:
+                frames.append(slice_range(default_store.load(csv_file_path), start_date, end_date))
+                keys.append(symbol)
+            except (OSError, ValueError, KeyError, pd.errors.ParserError):
+                continue
+        if frames:
+            lengths = np.r_[np.diff(offsets), [len(frame) for frame in frames]]
+            offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+            arrays = {'date': np.concatenate([arrays['date'], *(frame.index.to_numpy(dtype='datetime64[ns]') for frame in frames)]),
+                      **{column: np.concatenate([arrays[column], *(frame[column].to_numpy(dtype=np.float64) for frame in frames)]) for column in COLUMNS}}
+        return cls([symbol for symbol, _ in covered] + keys, offsets, arrays, directory)
+
+    def close(self):
+        # Remove the segment file; processes that mapped it keep their mappings until they exit
+        self._finalizer()
+
+    def __enter__(self) -> "SharedFrames":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
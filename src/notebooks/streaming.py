@@ -0,0 +1,180 @@
+# streaming.py
+
+# This file defines a stateful, incremental MACD for feeding new daily bars one at a time (or in small batches).
+# `StreamingMACD` keeps the short/long/signal EMA state of one symbol and updates it in O(1) per bar, reproducing
+# the batch `ewm(span=..., adjust=False).mean()` computation of MACDDataProcessor exactly, including its handling
+# of missing closes. `MACDStateStore` persists that state for a whole universe of symbols, so the nightly update
+# only processes the rows added since the last run.
+
+import json  # For state snapshots
+import math  # For NaN checks
+import os  # For file operations
+import tempfile  # For atomic snapshot writes
+import numpy as np  # For date comparisons on the loaded arrays
+import pandas as pd  # For timestamps
+from typing import Dict, List, Optional, Tuple  # For type annotations
+from data_loader import get_ohlcv  # For reading symbols through the shared loader
+
+class StreamingEMA:
+    def __init__(self, period: int):
+        # Exponential moving average with alpha = 2 / (period + 1), updated one value at a time
+        self.period = period
+        self.alpha = 2.0 / (period + 1.0)
+        self.value = float('nan')
+        self.old_weight = 1.0
+
+    def update(self, x: float) -> float:
+        # Same recurrence (and operation order) as pandas' ewm(adjust=False).mean(), so results match bit for bit.
+        # A missing value leaves the average unchanged but still decays the weight of the history.
+        observed = not math.isnan(x)
+        if not math.isnan(self.value):
+            self.old_weight *= 1.0 - self.alpha
+            if observed:
+                if self.value != x:
+                    self.value = (self.old_weight * self.value + self.alpha * x) / (self.old_weight + self.alpha)
+                self.old_weight = 1.0
+        elif observed:
+            self.value = x
+        return self.value
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"period": self.period, "value": self.value, "old_weight": self.old_weight}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, float]) -> "StreamingEMA":
+        ema = cls(state["period"])
+        ema.value = state["value"]
+        ema.old_weight = state["old_weight"]
+        return ema
+
+class StreamingMACD:
+    def __init__(self, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9):
+        # EMA state for the MACD line and its signal line, plus the last bar seen
+        self.ema_short = StreamingEMA(short_ema)
+        self.ema_long = StreamingEMA(long_ema)
+        self.signal = StreamingEMA(signal_ema)
+        self.macd = float('nan')
+        self.last_date: Optional[pd.Timestamp] = None
+        self.bars = 0
+
+    def update(self, close: float, date: Optional[pd.Timestamp] = None) -> Dict[str, any]:
+        # Ingest one bar and return the updated indicator values. crossover is "bullish"/"bearish" on the bars that
+        # MACDPlotter marks as crossovers (MACD moving from below/above the signal line to at/beyond it), else None.
+        previous_macd, previous_signal = self.macd, self.signal.value
+        ema_short = self.ema_short.update(close)
+        ema_long = self.ema_long.update(close)
+        self.macd = ema_short - ema_long
+        signal = self.signal.update(self.macd)
+        crossover = None
+        if previous_macd < previous_signal and self.macd >= signal:
+            crossover = "bullish"
+        elif previous_macd > previous_signal and self.macd <= signal:
+            crossover = "bearish"
+        self.last_date = pd.Timestamp(date) if date is not None else self.last_date
+        self.bars += 1
+        return {
+            "date": self.last_date,
+            "close": close,
+            "ema_short": ema_short,
+            "ema_long": ema_long,
+            "macd": self.macd,
+            "signal": signal,
+            "histogram": self.macd - signal,
+            "crossover": crossover,
+        }
+
+    def update_many(self, closes, dates=None) -> List[Dict[str, any]]:
+        # Ingest a small batch of bars in order
+        dates = [None] * len(closes) if dates is None else dates
+        return [self.update(float(close), date) for close, date in zip(closes, dates)]
+
+    def to_dict(self) -> Dict[str, any]:
+        # JSON-serializable snapshot of the state
+        return {
+            "ema_short": self.ema_short.to_dict(),
+            "ema_long": self.ema_long.to_dict(),
+            "signal": self.signal.to_dict(),
+            "macd": self.macd,
+            "last_date": None if self.last_date is None else self.last_date.isoformat(),
+            "bars": self.bars,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, any]) -> "StreamingMACD":
+        stream = cls()
+        stream.ema_short = StreamingEMA.from_dict(state["ema_short"])
+        stream.ema_long = StreamingEMA.from_dict(state["ema_long"])
+        stream.signal = StreamingEMA.from_dict(state["signal"])
+        stream.macd = state["macd"]
+        stream.last_date = None if state["last_date"] is None else pd.Timestamp(state["last_date"])
+        stream.bars = state["bars"]
+        return stream
+
+class MACDStateStore:
+    def __init__(self, path: str, short_ema: int = 12, long_ema: int = 26, signal_ema: int = 9):
+        # Per-symbol StreamingMACD state persisted as one JSON snapshot at `path`
+        self.path = path
+        self.params = (short_ema, long_ema, signal_ema)
+        self.streams: Dict[str, StreamingMACD] = {}
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        # Restore the snapshot; a snapshot taken with other MACD periods is ignored and rebuilt from scratch
+        with open(self.path) as snapshot:
+            data = json.load(snapshot)
+        if tuple(data.get("params", ())) == self.params:
+            self.streams = {symbol: StreamingMACD.from_dict(state) for symbol, state in data["symbols"].items()}
+
+    def save(self):
+        # Write the snapshot atomically so an interrupted run keeps the previous one
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        data = {"params": list(self.params), "symbols": {symbol: stream.to_dict() for symbol, stream in self.streams.items()}}
+        handle, staging = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'w') as snapshot:
+            json.dump(data, snapshot)
+        os.replace(staging, self.path)
+
+    def update_symbol(self, symbol: str, csv_file_path: str) -> List[Dict[str, any]]:
+        # Feed the bars of a CSV that are newer than the symbol's last processed date and return their updates
+        stream = self.streams.get(symbol)
+        if stream is None:
+            stream = self.streams[symbol] = StreamingMACD(*self.params)
+        df = get_ohlcv(csv_file_path)
+        start = 0
+        if stream.last_date is not None:
+            start = int(np.searchsorted(df.index.values, np.datetime64(stream.last_date), side='right'))
+        new_rows = df.iloc[start:]
+        return stream.update_many(new_rows['close'].to_numpy(), new_rows.index)
+
+    def update_universe(self, universe: List[Tuple[str, str]]) -> Dict[str, Dict[str, any]]:
+        # Nightly update over (symbol, csv path) pairs: the latest bar of every symbol that received new rows.
+        # Symbols that fail to load are skipped so one bad file does not stop the update.
+        latest = {}
+        for symbol, csv_file_path in universe:
+            try:
+                updates = self.update_symbol(symbol, csv_file_path)
+            except (OSError, ValueError, KeyError, pd.errors.ParserError):
+                continue
+            if updates:
+                latest[symbol] = updates[-1]
+        return latest
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for the nightly update
+    from data_store import CACHE_DIR, DATA_DIR, list_universe
+
+    parser = argparse.ArgumentParser(description="Incrementally update MACD state for the symbols in data/DailyData.")
+    parser.add_argument("--state", default=os.path.join(CACHE_DIR, 'macd_state.json'))
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--symbols", default=None, help="Comma separated symbols (default: every CSV in --data-dir)")
+    args = parser.parse_args()
+
+    store = MACDStateStore(args.state)
+    latest = store.update_universe(list_universe(args.data_dir, args.symbols.split(",") if args.symbols else None))
+    store.save()
+    for symbol, update in sorted(latest.items()):
+        if update["crossover"]:
+            print(f"{symbol}: {update['crossover']} crossover on {update['date']:%Y-%m-%d} (histogram {update['histogram']:.4f})")
+    print(f"Updated {len(latest)} symbols; state saved to {args.state}")
@@ -0,0 +1,302 @@
+# telemetry.py
+
+# This file defines `Tracer`, a lightweight timing layer for the agent loop. Tools and their internal phases (data
+# loading, MACD computation, Cerebro or vectorized runs, chart rendering) are recorded as nested spans with counters
+# such as bytes loaded, cache hits and LLM tokens, which roll up into every enclosing span. Spans can be exported as
+# JSON lines or as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev). Tracing is off unless
+# enabled in code or with MACD_TELEMETRY=<output path> (.json for a Chrome trace, anything else for JSON lines), and a
+# disabled tracer costs one attribute check per span. `profile_call` runs a single tool call under cProfile, or
+# pyinstrument when it is installed; MACD_PROFILE_TOOL=<tool name> applies it to the first call of a registered tool.
+# Tools run in a process pool use `run_in_worker`, which records their spans (or profile) in the worker and hands the
+# spans back to be merged here, so pooled calls show the same phases and counters as direct ones.
+
+import atexit  # For writing the trace when the process exits
+import functools  # For wrapping tools without changing their signatures
+import inspect  # For naming the arguments recorded on tool spans
+import json  # For the exports
+import os  # For settings and the process id
+import threading  # For per-thread span stacks
+import time  # For span timestamps
+from contextlib import contextmanager  # For the span context manager
+from typing import Callable, Dict, List, Optional  # For type annotations
+
+# Set MACD_TELEMETRY to a file path to record spans for the whole process and write them there on exit
+TRACE_PATH = os.environ.get("MACD_TELEMETRY")
+
+# Set MACD_PROFILE_TOOL to a tool name to profile its first call, printing the report or writing it to MACD_PROFILE_OUTPUT
+PROFILE_TOOL = os.environ.get("MACD_PROFILE_TOOL")
+PROFILE_OUTPUT = os.environ.get("MACD_PROFILE_OUTPUT")
+
+class Tracer:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.events: List[Dict[str, any]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    def _stack(self) -> List[Dict[str, any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, category: str = "phase", **attributes):
+        # Time the enclosed block as a span nested in the current one; yields the span's attribute dict (or None
+        # when tracing is off) so callers can attach results
+        if not self.enabled:
+            yield None
+            return
+        stack = self._stack()
+        record = {
+            "name": name,
+            "category": category,
+            "parent": stack[-1]["name"] if stack else None,
+            "thread": threading.get_ident(),
+            "start": time.perf_counter() - self._origin,
+            "attributes": dict(attributes),
+            "counters": {},
+        }
+        stack.append(record)
+        try:
+            yield record["attributes"]
+        except BaseException as e:
+            record["attributes"]["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            stack.pop()
+            record["duration"] = time.perf_counter() - self._origin - record["start"]
+            with self._lock:
+                self.events.append(record)
+
+    def record(self, name: str, category: str, started: float, duration: float, counters: Optional[Dict[str, float]] = None, **attributes):
+        # Add a finished span measured elsewhere (`started` is a time.perf_counter() value), outside the span stack.
+        # Used for work awaited concurrently on one thread, where nested spans would interleave.
+        if not self.enabled:
+            return
+        record = {
+            "name": name,
+            "category": category,
+            "parent": None,
+            "thread": threading.get_ident(),
+            "start": started - self._origin,
+            "attributes": dict(attributes),
+            "counters": dict(counters or {}),
+            "duration": duration,
+        }
+        with self._lock:
+            self.events.append(record)
+
+    def merge(self, events: List[Dict[str, any]], origin: float, parent: Optional[str] = None):
+        # Add spans recorded by another process of this machine, whose tracer started at `origin` (its
+        # time.perf_counter() value, comparable across processes here). Its top-level spans become children of
+        # `parent`, and each span keeps the "pid" it was recorded in.
+        if not self.enabled:
+            return
+        shift = origin - self._origin
+        with self._lock:
+            for event in events:
+                self.events.append(dict(event, start=event["start"] + shift, parent=event["parent"] or parent))
+
+    def add(self, **counters: float):
+        # Add to counters of the current span and every span enclosing it, e.g. add(bytes_loaded=n, loader_misses=1)
+        if not self.enabled:
+            return
+        for record in self._stack():
+            for key, value in counters.items():
+                record["counters"][key] = record["counters"].get(key, 0) + value
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        # Count, total and mean seconds and summed counters per span name
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            entry = totals.setdefault(event["name"], {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += event["duration"]
+            for key, value in event["counters"].items():
+                entry[key] = entry.get(key, 0) + value
+        for entry in totals.values():
+            entry["mean_seconds"] = entry["seconds"] / entry["count"]
+        return totals
+
+    def export_jsonl(self, path: str):
+        # One JSON object per finished span, in completion order
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w") as trace_file:
+            for event in events:
+                trace_file.write(json.dumps(event, default=str) + "\n")
+
+    def export_chrome_trace(self, path: str):
+        # Chrome trace event format: complete ("X") events with microsecond timestamps
+        with self._lock:
+            events = list(self.events)
+        trace = {
+            "traceEvents": [
+                {
+                    "name": event["name"],
+                    "cat": event["category"],
+                    "ph": "X",
+                    "ts": event["start"] * 1e6,
+                    "dur": event["duration"] * 1e6,
+                    "pid": event.get("pid", os.getpid()),
+                    "tid": event["thread"],
+                    "args": {**event["attributes"], **event["counters"]},
+                }
+                for event in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+        with open(path, "w") as trace_file:
+            json.dump(trace, trace_file, default=str)
+
+    def export(self, path: str):
+        # Chrome trace for .json paths, JSON lines otherwise
+        if path.endswith(".json"):
+            self.export_chrome_trace(path)
+        else:
+            self.export_jsonl(path)
+
+# Tracer shared by the tools, agents and data modules
+tracer = Tracer(enabled=bool(TRACE_PATH))
+span = tracer.span
+add_counters = tracer.add
+
+if TRACE_PATH:
+    atexit.register(tracer.export, TRACE_PATH)
+
+def detach_worker():
+    # Pool worker initializer: workers record spans only for the calls they are handed (see run_in_worker) and
+    # never write the trace file of the process that started them
+    tracer.disable()
+    tracer.clear()
+    if TRACE_PATH:
+        atexit.unregister(tracer.export)
+
+def run_in_worker(function: Callable, args: tuple, kwargs: dict, trace: bool = False, profile: bool = False, profile_output: Optional[str] = None):
+    # Pool worker side of a pooled tool call: run it (under profile_call when profile is set) and return
+    # (result, spans, tracer origin, counters). With trace set, the call is recorded as a "worker" span whose
+    # nested phases and counters come back to the caller for Tracer.merge; the worker's tracer is reset afterwards.
+    if profile:
+        return profile_call(function, *args, output=profile_output, **kwargs), [], tracer._origin, {}
+    if not trace:
+        return function(*args, **kwargs), [], tracer._origin, {}
+    tracer.clear()
+    tracer.enable()
+    try:
+        with span("tool.worker", category="worker", pid=os.getpid()):
+            result = function(*args, **kwargs)
+        with tracer._lock:
+            events = [dict(event, pid=os.getpid()) for event in tracer.events]
+        counters = next((event["counters"] for event in events if event["name"] == "tool.worker"), {})
+        return result, events, tracer._origin, counters
+    finally:
+        tracer.disable()
+        tracer.clear()
+
+def _summarize_argument(value) -> any:
+    # Keep span attributes small: long strings (e.g. JSON parameters) are truncated
+    if isinstance(value, str) and len(value) > 200:
+        return value[:200] + "..."
+    return value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)[:200]
+
+def tool_arguments(signature: inspect.Signature, args: tuple, kwargs: dict) -> Dict[str, any]:
+    # Span attributes for a tool call: its arguments by parameter name, summarized
+    try:
+        bound = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        bound = {f"arg{i}": value for i, value in enumerate(args)} | kwargs  # Let the call itself report the mistake
+    return {key: _summarize_argument(value) for key, value in bound.items()}
+
+def traced_tool(function: Callable, name: Optional[str] = None) -> Callable:
+    # Wrap an agent tool so each call is a "tool" span carrying its arguments and result size. The wrapper keeps the
+    # tool's signature and annotations, so it can be registered with the agents in place of the tool.
+    tool_name = name or function.__name__
+    signature = inspect.signature(function)
+    profile_pending = [PROFILE_TOOL == tool_name]
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if profile_pending[0]:
+            profile_pending[0] = False
+            return profile_call(function, *args, output=PROFILE_OUTPUT, **kwargs)
+        if not tracer.enabled:
+            return function(*args, **kwargs)
+        with span(tool_name, category="tool", **tool_arguments(signature, args, kwargs)) as attributes:
+            result = function(*args, **kwargs)
+            attributes["result_chars"] = len(result) if isinstance(result, str) else len(json.dumps(result, default=str))
+            return result
+
+    return wrapper
+
+def instrument_agent(agent) -> None:
+    # Record every LLM completion requested by an autogen agent as an "llm" span with its latency, model and token
+    # counts. Agents without an LLM client are left unchanged.
+    client = getattr(agent, "client", None)
+    if client is None or getattr(client, "_telemetry_wrapped", False):
+        return
+    create = client.create
+
+    @functools.wraps(create)
+    def traced_create(**config):
+        if not tracer.enabled:
+            return create(**config)
+        with span("llm.create", category="llm", agent=agent.name) as attributes:
+            response = create(**config)
+            usage = getattr(response, "usage", None)
+            attributes["model"] = getattr(response, "model", None)
+            if usage is not None:
+                tracer.add(
+                    llm_calls=1,
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                    completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                )
+            return response
+
+    client.create = traced_create
+    client._telemetry_wrapped = True
+
+def profile_call(function: Callable, *args, output: Optional[str] = None, **kwargs):
+    # Run one call under pyinstrument (if installed) or cProfile and return its result. The report is written to
+    # `output` (.html for pyinstrument, a .prof file for cProfile that snakeviz or pstats can read) or printed.
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.stop()
+            if output:
+                with open(output, "w") as report:
+                    report.write(profiler.output_html())
+            else:
+                print(profiler.output_text(unicode=True, color=False))
+
+    import cProfile  # Standard library fallback
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        if output:
+            profiler.dump_stats(output)
+        else:
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
@@ -0,0 +1,19 @@
+# conftest.py
+
+# Shared setup of the test suite: the notebook modules are imported by their flat names, as the notebooks and
+# command-line tools do, and every on-disk cache is redirected to a temporary directory so tests never read or
+# write data/cache. The environment is set before any module is imported, since the cache locations are read then.
+
+import os  # For the cache environment variables
+import sys  # For importing the notebook modules
+import tempfile  # For the per-session cache directory
+
+NOTEBOOKS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, NOTEBOOKS_DIR)
+
+_cache_dir = tempfile.mkdtemp(prefix="macd-tests-")
+os.environ["MACD_CACHE_DIR"] = _cache_dir
+os.environ["MACD_INDICATOR_DIR"] = os.path.join(_cache_dir, "indicators")
+os.environ["MACD_MARKET_DATA_DIR"] = os.path.join(_cache_dir, "universe")
+os.environ["MACD_RESULT_CACHE"] = "0"
+os.environ.pop("MACD_TELEMETRY", None)
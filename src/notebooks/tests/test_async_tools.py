@@ -0,0 +1,40 @@
+# test_async_tools.py
+
+# Tests of the pooled tool executor: calls on the same file prefer one worker but still run concurrently.
+
+import asyncio  # For gathering the pooled calls
+import time  # For the call intervals
+import pytest  # For fixtures
+import async_tools  # The module under test
+
+def slow_tool(csv_file_path: str, seconds: float = 0.5):
+    # Module-level stand-in for a CPU-bound tool: its wall-clock interval in the worker
+    started = time.time()
+    time.sleep(seconds)
+    return started, time.time()
+
+@pytest.fixture
+def pools(monkeypatch):
+    # Four fresh workers, shut down after the test
+    monkeypatch.setattr(async_tools, "TOOL_WORKERS", 4)
+    monkeypatch.setattr(async_tools, "_pools", [])
+    monkeypatch.setattr(async_tools, "_in_flight", [])
+    yield
+    for pool in async_tools._pools:
+        pool.shutdown()
+
+def test_same_file_calls_overlap(pools):
+    tool = async_tools.async_tool(slow_tool)
+
+    async def batch():
+        return await asyncio.gather(*(tool("../../data/DailyData/TCS.csv") for _ in range(4)))
+
+    intervals = asyncio.run(batch())
+    # Every call overlaps every other one: all started before the first one finished
+    assert max(start for start, _ in intervals) < min(end for _, end in intervals)
+
+def test_idle_preferred_worker_is_reused(pools):
+    first = async_tools._pick_worker("../../data/DailyData/TCS.csv")
+    async_tools._in_flight[first] -= 1
+    assert async_tools._pick_worker("../../data/DailyData/TCS.csv") == first
+    assert async_tools._pick_worker("../../data/DailyData/TCS.csv") != first
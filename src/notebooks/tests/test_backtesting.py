@@ -0,0 +1,46 @@
+# test_backtesting.py
+
+# Parity check of the two backtest engines: VectorizedMACDStrategy must reproduce the Backtrader (Cerebro) run on real
+# DailyData files. Both engines do the same arithmetic in a different order, so numbers are compared with a relative
+# tolerance of RTOL (the largest difference seen over 60 random files is about 1e-14 relative, a few units in the last
+# digits of figures such as the Sharpe ratio); report layout, counts and every non-numeric field must match exactly.
+
+import math  # For the tolerance check
+import pytest  # For parametrization
+from backtesting import BackTraderUtils  # Both engines
+from data_loader import get_ohlcv_range  # For the backtest windows
+from data_store import DATA_DIR, list_universe  # For the real files
+
+# Relative tolerance on every numeric field of the report
+RTOL = 1e-9
+
+# Real files, including an index with missing closes
+SYMBOLS = ["AAKASH", "TCS", "INFY", "ACC", "YESBANK", "RELIANCE", "NIFTY AUTO"]
+PARAMETER_SETS = [{}, {"short_ema": 8, "long_ema": 21, "signal_ema": 5}]
+WINDOWS = [("2022-01-01", "2024-01-01"), ("2015-01-01", "2024-01-01")]
+
+def assert_reports_match(expected, actual, path="report"):
+    # Same nested layout and values, numbers within RTOL
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and set(expected) == set(actual), path
+        for key in expected:
+            assert_reports_match(expected[key], actual[key], f"{path}.{key}")
+    elif isinstance(expected, (int, float)) and not isinstance(expected, bool) and isinstance(actual, (int, float)):
+        if math.isnan(expected) or math.isnan(actual):
+            assert math.isnan(expected) and math.isnan(actual), path
+        else:
+            assert math.isclose(expected, actual, rel_tol=RTOL, abs_tol=1e-9), f"{path}: {expected} != {actual}"
+    else:
+        assert expected == actual, path
+
+@pytest.mark.parametrize("start_date, end_date", WINDOWS)
+@pytest.mark.parametrize("params", PARAMETER_SETS, ids=["default", "8-21-5"])
+@pytest.mark.parametrize("symbol, csv_file_path", list_universe(DATA_DIR, SYMBOLS))
+def test_vectorized_engine_matches_backtrader(symbol, csv_file_path, params, start_date, end_date):
+    utils = BackTraderUtils()
+    df = get_ohlcv_range(csv_file_path, start_date, end_date)
+    if len(df) < 60:
+        pytest.skip("Not enough bars in the window")
+    expected = utils._run_cerebro(df.copy(), params, 10000.0, None)
+    actual = utils._run_vectorized(df.copy(), params, 10000.0, None, csv_file_path)
+    assert_reports_match(expected, actual)
@@ -0,0 +1,24 @@
+# test_bench_suite.py
+
+# Tests of the benchmark suite's regression verdicts: short cases and changes within the noise floor are not flagged,
+# and baselines are the median of several runs.
+
+import platform  # For the machine recorded in the history
+import bench_suite  # The module under test
+
+def history(*seconds):
+    return [{"machine": platform.node(), "results": {"case": {"seconds": value}}} for value in seconds]
+
+def test_short_cases_get_no_verdict():
+    assert bench_suite.compare(0.015, 0.005) == (None, False)
+
+def test_noise_floor():
+    delta, regressed = bench_suite.compare(0.14, 0.1)
+    assert delta > bench_suite.REGRESSION_THRESHOLD and not regressed
+    assert bench_suite.compare(2.0, 1.0)[1]
+    assert not bench_suite.compare(1.1, 1.0)[1]
+
+def test_baseline_is_the_median_of_recent_runs():
+    baseline = bench_suite.baseline_for(history(9.0, 1.0, 1.2, 5.0, 0.9, 1.1), "case")
+    assert baseline == {"seconds": 1.1, "runs": 5}
+    assert bench_suite.baseline_for(history(1.0), "other") is None
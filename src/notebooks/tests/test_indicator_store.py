@@ -0,0 +1,52 @@
+# test_indicator_store.py
+
+# Tests of IndicatorStore: stored EMAs are served for arbitrary date windows, including the default settings window,
+# and match EMAs recomputed on the window up to float rounding.
+
+import numpy as np  # For comparing EMA arrays
+import pandas as pd  # For the reference ewm computation
+import pytest  # For parametrization
+import settings  # For the default analysis window
+from backtesting import seeded_ema  # Reference seeded EMA
+from data_processing import MACDDataProcessor  # Reader of the ewm kind
+from data_store import DATA_DIR, default_store, list_universe  # For the source files
+from indicator_store import default_indicators  # The store under test (redirected to a temporary directory)
+
+SYMBOLS = ["AAKASH", "TCS", "INFY", "ACC", "YESBANK"]
+WINDOWS = [(settings.start_date, settings.end_date), ("2019-03-05", None), (None, None), ("2023-06-01", "2023-09-01")]
+SPANS = (5, 9, 12, 26, 50)
+
+@pytest.fixture(scope="module", autouse=True)
+def refreshed():
+    actions = default_indicators.refresh_universe(DATA_DIR, SYMBOLS)
+    assert all(action in ("built", "fresh") for action in actions.values())
+
+def test_default_settings_window_is_served():
+    processor = MACDDataProcessor(settings.file_path)
+    processor.filter_data(settings.start_date, settings.end_date)
+    assert processor.filtered_data.index[0] > processor.data.index[0]  # The window does not start at the first bar
+    assert processor.stored_emas is not None
+    assert all(processor.stored_emas(span) is not None for span in (12, 26))
+
+@pytest.mark.parametrize("kind", ["ewm", "seeded"])
+@pytest.mark.parametrize("symbol, csv_file_path", list_universe(DATA_DIR, SYMBOLS))
+def test_windows_match_recomputation(kind, symbol, csv_file_path):
+    source = default_store.load(csv_file_path)
+    for start_date, end_date in WINDOWS:
+        window = source.loc[start_date:end_date]
+        if not len(window):
+            continue
+        stored = default_indicators.lookup(csv_file_path, kind, window.index)
+        assert stored is not None, (start_date, end_date)
+        close = window['close'].to_numpy(np.float64)
+        for span in SPANS:
+            expected = pd.Series(close).ewm(span=span, adjust=False).mean().to_numpy() if kind == "ewm" else seeded_ema(close, span)
+            np.testing.assert_allclose(stored(span), expected, rtol=1e-12, atol=0)
+
+def test_rows_other_than_the_stored_ones_are_not_served():
+    csv_file_path = list_universe(DATA_DIR, ["TCS"])[0][1]
+    dates = default_store.load(csv_file_path).index
+    assert default_indicators.lookup(csv_file_path, "ewm", dates[-5:]) is not None
+    assert default_indicators.lookup(csv_file_path, "ewm", dates[-5:].append(dates[-1:] + pd.Timedelta(days=1))) is None
+    assert default_indicators.lookup(csv_file_path, "ewm", dates[:10].delete(4)) is None
+    assert default_indicators.lookup(csv_file_path, "ewm", dates[:10] - pd.Timedelta(days=1)) is None
@@ -0,0 +1,52 @@
+# test_market_data.py
+
+# Tests that a CSV with unsorted, duplicated and unparseable-date rows is served as the same validated rows by the
+# market dataset, the per-file store and the loader, and that stored EMAs stay aligned with those rows.
+
+import numpy as np  # For comparing arrays
+import pandas as pd  # For building the dirty CSV and the reference EMAs
+import pytest  # For fixtures
+from data_loader import OHLCVLoader  # Loader serving frames from either source
+from data_store import DATA_DIR, OHLCVStore  # Per-file store
+from indicator_store import IndicatorStore  # Stored EMAs
+from market_data import MarketDataset  # Consolidated dataset
+
+@pytest.fixture
+def dirty_csv(tmp_path):
+    # TCS with two rows swapped, a repeated date (whose last row must win) and a row with an unparseable date
+    rows = pd.read_csv(f"{DATA_DIR}/TCS.csv")
+    rows.iloc[[100, 101]] = rows.iloc[[101, 100]].to_numpy()
+    repeated = rows.iloc[[200]].copy()
+    repeated["close"] = repeated["close"] + 1.0
+    bad_date = rows.iloc[[300]].copy()
+    bad_date["date"] = "not a date"
+    rows = pd.concat([rows.iloc[:250], repeated, bad_date, rows.iloc[250:]], ignore_index=True)
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    rows.to_csv(data_dir / "TCS.csv", index=False)
+    return str(data_dir), str(data_dir / "TCS.csv")
+
+def test_sources_serve_the_same_validated_rows(tmp_path, dirty_csv):
+    data_dir, csv_file_path = dirty_csv
+    store = OHLCVStore(str(tmp_path / "store"))
+    dataset = MarketDataset(str(tmp_path / "universe"))
+    assert dataset.ingest(data_dir, max_workers=1) == {"TCS": "added"}
+    from_dataset = OHLCVLoader(store, dataset=dataset).load(csv_file_path)
+    from_store = OHLCVLoader(store, dataset=None).load(csv_file_path)
+    pd.testing.assert_frame_equal(from_dataset, from_store, check_freq=False)
+    assert from_store.index.is_monotonic_increasing and from_store.index.is_unique
+
+def test_stored_emas_align_with_the_served_rows(tmp_path, dirty_csv):
+    data_dir, csv_file_path = dirty_csv
+    store = OHLCVStore(str(tmp_path / "store"))
+    indicators = IndicatorStore(str(tmp_path / "indicators"), spans=(12, 26), source=store)
+    assert indicators.refresh(csv_file_path) == "built"
+    dataset = MarketDataset(str(tmp_path / "universe"))
+    dataset.ingest(data_dir, max_workers=1)
+    frame = OHLCVLoader(store, dataset=dataset).load(csv_file_path).loc["2020-01-01":]
+    stored = indicators.lookup(csv_file_path, "ewm", frame.index)
+    assert stored is not None
+    expected = frame["close"].ewm(span=12, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(stored(12), expected, rtol=1e-12, atol=0)
+    # Rows the entry does not hold exactly are not served
+    assert indicators.lookup(csv_file_path, "ewm", frame.index.delete(10)) is None
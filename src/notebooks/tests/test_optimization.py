@@ -0,0 +1,16 @@
+# test_optimization.py
+
+# Tests of MACDOptimizerUtils.sweep_macd argument checks.
+
+import pytest  # For parametrization
+import settings  # For the default analysis file and window
+from optimization import MACDOptimizerUtils  # The class under test
+
+@pytest.mark.parametrize("n_samples", [0, -3])
+def test_random_search_rejects_non_positive_samples(n_samples):
+    result = MACDOptimizerUtils().sweep_macd(settings.file_path, settings.start_date, settings.end_date, search="random", n_samples=n_samples)
+    assert result == f"Error: n_samples must be at least 1, got {n_samples}."
+
+def test_random_search_evaluates_n_samples():
+    result = MACDOptimizerUtils().sweep_macd(settings.file_path, settings.start_date, settings.end_date, search="random", n_samples=5)
+    assert result.startswith("Sweep Finished. Evaluated 5 parameter combinations")
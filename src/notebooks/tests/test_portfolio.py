@@ -0,0 +1,77 @@
+# test_portfolio.py
+
+# Tests of PortfolioBacktester's allocation pass on small hand-built panels with fixed signals: the max_positions cap,
+# cash that never goes negative, exits funding entries on the same date, and commission on both legs. Also checks
+# that the agent utility requires an explicit basket.
+
+import numpy as np  # For the panel arrays
+import pandas as pd  # For the dates
+import pytest  # For approximate comparisons
+from portfolio import PortfolioBacktester, PortfolioUtils  # The classes under test
+from scanner import PricePanel  # For building panels by hand
+
+def make_panel(opens, closes=None):
+    # PricePanel of dates x symbols open (and close, default: the opens) prices
+    panel = PricePanel.__new__(PricePanel)
+    panel.open = np.asarray(opens, dtype=np.float64)
+    panel.close = panel.open.copy() if closes is None else np.asarray(closes, dtype=np.float64)
+    panel.symbols = [f"S{j}" for j in range(panel.open.shape[1])]
+    panel.dates = pd.date_range("2024-01-01", periods=panel.open.shape[0]).to_numpy()
+    panel.present = np.ones(panel.open.shape, dtype=bool)
+    panel.errors = {}
+    return panel
+
+def with_signals(backtester, entries, exits, scores=None):
+    # Replace the MACD signals with fixed dates x symbols orders
+    entries = np.asarray(entries, dtype=bool)
+    scores = np.zeros(entries.shape) if scores is None else np.asarray(scores, dtype=np.float64)
+    backtester.signals = lambda panel: (entries, np.asarray(exits, dtype=bool), scores)
+    return backtester
+
+def test_max_positions_cap_keeps_the_strongest_entries():
+    panel = make_panel(np.full((3, 4), 10.0))
+    backtester = with_signals(PortfolioBacktester(max_positions=2, cash=1000.0),
+                              [[1, 1, 1, 1], [0, 0, 0, 0], [0, 0, 0, 0]], np.zeros((3, 4)),
+                              [[0.1, 0.4, 0.3, 0.2], [0] * 4, [0] * 4])
+    backtester.run(panel)
+    assert backtester.equity["positions"].max() == 2
+    assert sorted(backtester.trades["symbol"]) == ["S1", "S2"]
+
+def test_cash_never_goes_negative():
+    rng = np.random.default_rng(0)
+    opens = 10.0 + rng.random((60, 5)) * 5.0
+    entries = rng.random((60, 5)) < 0.3
+    exits = rng.random((60, 5)) < 0.2
+    backtester = with_signals(PortfolioBacktester(max_positions=3, position_size=0.9, cash=1000.0, commission=0.01), entries, exits, rng.random((60, 5)))
+    backtester.run(make_panel(opens))
+    assert (backtester.equity["cash"] >= 0.0).all()
+    assert backtester.equity["positions"].max() <= 3
+
+def test_exit_proceeds_fund_same_day_entry():
+    # All cash goes into S0 on day 0; on day 1 S0 is sold at 20 and the proceeds buy S1 at 10
+    panel = make_panel([[10.0, 10.0], [20.0, 10.0], [20.0, 10.0]])
+    backtester = with_signals(PortfolioBacktester(max_positions=1, position_size=1.0, cash=100.0),
+                              [[1, 0], [0, 1], [0, 0]], [[0, 0], [1, 0], [0, 0]])
+    backtester.run(panel)
+    trades = backtester.trades.set_index("symbol")
+    assert trades.loc["S0", "shares"] == 10 and trades.loc["S0", "exit_price"] == 20.0
+    assert trades.loc["S1", "shares"] == 10  # Sized from the equity at the previous close (100), within the 200 of cash
+    assert backtester.equity["positions"].tolist() == [1, 1, 1]
+
+def test_commission_on_both_legs():
+    commission = 0.01
+    panel = make_panel([[10.0], [12.0], [12.0]])
+    backtester = with_signals(PortfolioBacktester(max_positions=1, position_size=1.0, cash=1000.0, commission=commission),
+                              [[1], [0], [0]], [[0], [1], [0]])
+    backtester.run(panel)
+    shares = 1000 // (10.0 * (1.0 + commission))
+    trade = backtester.trades.iloc[0]
+    assert trade["shares"] == shares
+    assert trade["pnl"] == pytest.approx(shares * 2.0 - commission * shares * (10.0 + 12.0))
+    expected_cash = 1000.0 - shares * 10.0 * (1.0 + commission) + shares * 12.0 * (1.0 - commission)
+    assert backtester.equity["cash"].iloc[-1] == pytest.approx(expected_cash)
+    assert backtester.equity["value"].iloc[-1] == pytest.approx(1000.0 + trade["pnl"])
+
+def test_basket_is_required():
+    assert PortfolioUtils().backtest_portfolio("2022-01-01", "2024-01-01").startswith("Error: Give the basket")
+    assert PortfolioUtils().backtest_portfolio("2022-01-01", "2024-01-01", " , ").startswith("Error: Give the basket")
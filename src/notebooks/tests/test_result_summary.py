@@ -0,0 +1,42 @@
+# test_result_summary.py
+
+# Tests of DetailStore retention: stored reports expire after the TTL, the least recently used ones are deleted past
+# the size budget, and a report saved again is kept as long as the newest result pointing at it.
+
+import os  # For file times and sizes
+import time  # For back-dating reports
+from result_summary import DetailStore  # The class under test
+
+def stats(n):
+    return {"Returns": {"rtot": n}}
+
+def age(store, result_id, seconds):
+    past = time.time() - seconds
+    os.utime(store.path(result_id), (past, past))
+
+def test_expired_reports_are_removed(tmp_path):
+    store = DetailStore(str(tmp_path), ttl_seconds=60, max_bytes=1 << 20)
+    old = store.save(stats(1))
+    age(store, old, 120)
+    new = store.save(stats(2))
+    assert not os.path.exists(store.path(old))
+    assert store.load(new)["stats"] == stats(2)
+
+def test_size_budget_evicts_least_recently_used(tmp_path):
+    store = DetailStore(str(tmp_path), ttl_seconds=3600, max_bytes=1 << 20)
+    ids = [store.save(stats(n)) for n in range(3)]
+    for seconds, result_id in zip((30, 20, 10), ids):
+        age(store, result_id, seconds)
+    store.load(ids[0])  # Reading a report makes it the most recently used
+    store.max_bytes = 2 * os.path.getsize(store.path(ids[0]))
+    newest = store.save(stats(3))
+    assert [os.path.exists(store.path(result_id)) for result_id in ids] == [True, False, False]
+    assert os.path.exists(store.path(newest))
+
+def test_saving_again_refreshes_a_report(tmp_path):
+    store = DetailStore(str(tmp_path), ttl_seconds=60, max_bytes=1 << 20)
+    result_id = store.save(stats(1))
+    age(store, result_id, 120)
+    assert store.save(stats(1)) == result_id
+    store.save(stats(2))
+    assert store.load(result_id)["stats"] == stats(1)
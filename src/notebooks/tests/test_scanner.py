@@ -0,0 +1,52 @@
+# test_scanner.py
+
+# Tests of PricePanel: panels built partly from the consolidated dataset and partly from the columnar cache must
+# match panels built from the cache alone.
+
+import numpy as np  # For comparing the panel arrays
+import pytest  # For fixtures
+import scanner  # The module under test
+from data_store import DATA_DIR, list_universe  # For the universe files
+from market_data import MarketDataset  # For a dataset covering part of the universe
+
+@pytest.fixture
+def partial_dataset(tmp_path, monkeypatch):
+    # A dataset holding only TCS and INFY, used by the scanner in place of the default one
+    dataset = MarketDataset(str(tmp_path / "universe"))
+    dataset.ingest(DATA_DIR, ["TCS", "INFY"], max_workers=1)
+    monkeypatch.setattr(scanner, "default_dataset", dataset)
+    return dataset
+
+def panel_without_dataset(monkeypatch, tmp_path, universe, start_date, end_date, columns):
+    with monkeypatch.context() as patch:
+        patch.setattr(scanner, "default_dataset", MarketDataset(str(tmp_path / "empty")))
+        return scanner.PricePanel(universe, start_date, end_date, columns)
+
+@pytest.mark.parametrize("symbols", [["ACC", "TCS", "INFY"], ["TCS", "ACC", "INFY", "WIPRO"]])
+def test_mixed_panel_matches_cache_panel(partial_dataset, monkeypatch, tmp_path, symbols):
+    universe = list_universe(DATA_DIR, symbols)
+    columns = ('close', 'volume')
+    assert [partial_dataset.covers(path) for _, path in universe].count(True) == 2
+    mixed = scanner.PricePanel(universe, "2023-01-01", "2023-03-01", columns)
+    expected = panel_without_dataset(monkeypatch, tmp_path, universe, "2023-01-01", "2023-03-01", columns)
+    assert mixed.symbols == expected.symbols == symbols
+    np.testing.assert_array_equal(mixed.dates, expected.dates)
+    np.testing.assert_array_equal(mixed.present, expected.present)
+    for name in columns:
+        np.testing.assert_array_equal(getattr(mixed, name), getattr(expected, name))
+
+def test_window_longer_than_panel():
+    universe = list_universe(DATA_DIR, ["ACC", "TCS", "INFY", "WIPRO", "HDFCBANK"])
+    scanner_ = scanner.MACDCrossoverScanner(universe, "2024-01-01", "2024-03-01")
+    assert len(scanner_.dates) < 60
+    full = scanner_.scan(window=len(scanner_.dates))
+    longer = scanner_.scan(window=60)
+    assert len(longer) > 0
+    assert longer.equals(full)
+    # Each reported date is the symbol's last crossover in the panel
+    macd, signal, _ = scanner_.macd()
+    events = scanner_.crossovers(macd, signal, scanner_.present)
+    for row in longer.itertuples():
+        j = scanner_.symbols.index(row.symbol)
+        last = np.flatnonzero(events[:, j])[-1]
+        assert row.crossover_date == str(scanner_.dates[last])[:10]
@@ -3,10 +3,16 @@
 # This file provides utility functions that wrap around the core functionalities for plotting MACD charts,
 # displaying images, running backtests on historical stock data, and retrieving backtesting results.
 
-from typing import Annotated  # For adding descriptive type annotations to function parameters
-from plotting import MACDPlotter  # Importing the MACDPlotter class for creating MACD plots
-from IPython.display import Image, display  # For displaying images in IPython environments 
+import json  # For serializing stored report sections
+from typing import Annotated, Optional  # For adding descriptive type annotations to function parameters
 from backtesting import BackTraderUtils  # Importing utility class for running backtests
+from optimization import MACDOptimizerUtils  # Importing utility class for parameter sweeps
+from walk_forward import WalkForwardUtils  # Importing utility class for walk-forward optimization
+from local_search import LocalSearchUtils  # Importing utility class for the successive-halving parameter search
+from scanner import MACDScannerUtils  # Importing utility class for universe-wide crossover scans
+from portfolio import PortfolioUtils  # Importing utility class for basket backtests with shared cash
+from result_cache import default_cache  # Importing the persistent cache for tool results
+from result_summary import default_details, payload_size  # Importing the store of full backtest reports
 
 def plot_macd_tool(
     csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
@@ -15,14 +21,26 @@ def plot_macd_tool(
     save_path: Annotated[str, "File path where the plot should be saved"],
     plot_type: Annotated[str, "Type of the plot (e.g., 'candle', 'line')"] = "candle",
     plot_style: Annotated[str, "Style of the plot (e.g., 'default', 'yahoo')"] = "default",
-    show_nontrading: Annotated[bool, "Whether to show non-trading days on the chart"] = False
+    show_nontrading: Annotated[bool, "Whether to show non-trading days on the chart"] = False,
+    short_ema: Annotated[int, "Period of the short EMA"] = 12,
+    long_ema: Annotated[int, "Period of the long EMA"] = 26,
+    signal_ema: Annotated[int, "Period of the signal line EMA"] = 9,
+    use_cache: Annotated[bool, "Reuse the stored chart for identical inputs; False forces a fresh render"] = True,
 ) -> str:
-    # Function to generate and save an MACD plot using the MACDPlotter class
-    plotter = MACDPlotter(csv_file_path)
-    return plotter.plot_macd(start_date, end_date, save_path, plot_type, plot_style, show_nontrading)
+    # Function to generate and save an MACD plot using the MACDPlotter class, memoized in the result cache
+    def render():
+        from plotting import MACDPlotter  # Deferred: mplfinance and matplotlib are only loaded to draw a chart
+        plotter = MACDPlotter(csv_file_path)
+        return plotter.plot_macd(start_date, end_date, save_path, plot_type, plot_style, show_nontrading, short_ema, long_ema, signal_ema)
+
+    arguments = {"start_date": start_date, "end_date": end_date, "save_path": save_path, "plot_type": plot_type,
+                 "plot_style": plot_style, "show_nontrading": show_nontrading, "short_ema": short_ema, "long_ema": long_ema,
+                 "signal_ema": signal_ema}
+    return default_cache.cached_call("plot_macd", csv_file_path, arguments, render, artifact_path=save_path, use_cache=use_cache)
 
 def display_image_tool(file_path: Annotated[str, "Path to the image file to be displayed"]):
     # Function to display an image from a specified file path
+    from IPython.display import Image, display  # Deferred: only needed when an image is displayed
     try:
         display(Image(filename=file_path))
         return f"Displayed image from {file_path}"
@@ -37,10 +55,123 @@ def backtest_macd_tool(
     strategy_params: Annotated[str, "JSON string of strategy parameters, e.g., '{\"short_ema\": 12, \"long_ema\": 26, \"signal_ema\": 9}'"] = "",
     cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
     save_fig: Optional[Annotated[str, "File path to save the backtest result plot"]] = None,
+    engine: Annotated[str, "Backtest engine: 'backtrader' (bar-by-bar Cerebro run) or 'vectorized' (NumPy fast path, same results up to float rounding)"] = "backtrader",
+    use_cache: Annotated[bool, "Reuse the stored result for identical inputs; False forces a fresh backtest"] = True,
+    output: Annotated[str, "'compact' (key metrics plus a result_id for the full report) or 'full' (every analyzer)"] = "compact",
+) -> str:
+    # Function to run a backtest on historical stock data using the MACD strategy, memoized in the result cache
+    def run():
+        utils = BackTraderUtils()
+        return utils.back_test_macd(csv_file_path, start_date, end_date, strategy_params, cash, save_fig, engine, output)
+
+    arguments = {"start_date": start_date, "end_date": end_date, "strategy_params": strategy_params, "cash": cash,
+                 "save_fig": save_fig, "engine": engine, "output": output}
+    return default_cache.cached_call("backtest_macd", csv_file_path, arguments, run, artifact_path=save_fig, use_cache=use_cache)
+
+def sweep_macd_tool(
+    csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
+    start_date: Annotated[str, "Start date of the sweep in 'YYYY-MM-DD' format"],
+    end_date: Annotated[str, "End date of the sweep in 'YYYY-MM-DD' format"],
+    short_ema_range: Annotated[str, "short_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '5:20:1'"] = "5:20:1",
+    long_ema_range: Annotated[str, "long_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '20:60:2'"] = "20:60:2",
+    signal_ema_range: Annotated[str, "signal_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '5:15:2'"] = "5:15:2",
+    metric: Annotated[str, "Ranking metric: sharpe_ratio, total_return, final_value, max_drawdown, profit_factor, win_rate or trades"] = "sharpe_ratio",
+    top_n: Annotated[int, "Number of best parameter sets to return"] = 10,
+    search: Annotated[str, "'grid' evaluates every combination, 'random' evaluates n_samples of them"] = "grid",
+    n_samples: Annotated[int, "Number of combinations to evaluate when search is 'random'"] = 500,
+    cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
 ) -> str:
-    # Function to run a backtest on historical stock data using the MACD strategy
-    utils = BackTraderUtils()
-    return utils.back_test_macd(csv_file_path, start_date, end_date, strategy_params, cash, save_fig)
+    # Function to backtest a whole grid of MACD parameters at once and rank the results
+    utils = MACDOptimizerUtils()
+    return utils.sweep_macd(csv_file_path, start_date, end_date, short_ema_range, long_ema_range, signal_ema_range, metric, top_n, search, n_samples, cash)
+
+def optimize_macd_tool(
+    csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
+    start_date: Annotated[str, "Start date of the full range in 'YYYY-MM-DD' format"],
+    end_date: Annotated[str, "End date of the full range in 'YYYY-MM-DD' format"],
+    objective: Annotated[str, "Metric to optimize: sharpe_ratio, total_return, final_value, max_drawdown, profit_factor, win_rate or trades"] = "sharpe_ratio",
+    max_drawdown: Annotated[Optional[float], "Constraint: maximum drawdown in percent"] = None,
+    min_profit_factor: Annotated[Optional[float], "Constraint: minimum profit factor"] = None,
+    min_trades: Annotated[Optional[int], "Constraint: minimum number of closed trades over the full range"] = None,
+    target: Annotated[Optional[float], "Stop as soon as a set meeting the constraints reaches this objective value"] = None,
+    time_budget: Annotated[float, "Maximum search time in seconds"] = 30.0,
+    short_ema_range: Annotated[str, "short_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '3:30:1'"] = "3:30:1",
+    long_ema_range: Annotated[str, "long_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '10:80:2'"] = "10:80:2",
+    signal_ema_range: Annotated[str, "signal_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '3:20:1'"] = "3:20:1",
+    cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
+    save_trace: Annotated[Optional[str], "CSV file path to save every evaluation of the search"] = None,
+) -> str:
+    # Function to search the MACD parameters locally under constraints and a time budget, in one call
+    utils = LocalSearchUtils()
+    return utils.optimize_macd(csv_file_path, start_date, end_date, objective, max_drawdown, min_profit_factor, min_trades, target, time_budget,
+                               short_ema_range, long_ema_range, signal_ema_range, cash=cash, save_trace=save_trace)
+
+def walk_forward_macd_tool(
+    csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
+    start_date: Annotated[str, "Start date of the whole walk-forward period in 'YYYY-MM-DD' format"],
+    end_date: Annotated[str, "End date of the whole walk-forward period in 'YYYY-MM-DD' format"],
+    train_bars: Annotated[int, "Bars in each in-sample (train) window"] = 252,
+    test_bars: Annotated[int, "Bars in each out-of-sample (test) window that follows a train window"] = 63,
+    anchored: Annotated[bool, "Keep every train window starting at start_date instead of rolling it"] = False,
+    short_ema_range: Annotated[str, "short_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '5:20:1'"] = "5:20:1",
+    long_ema_range: Annotated[str, "long_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '20:60:2'"] = "20:60:2",
+    signal_ema_range: Annotated[str, "signal_ema values as 'start:stop:step' (stop inclusive) or a comma list, e.g. '5:15:2'"] = "5:15:2",
+    metric: Annotated[str, "Metric optimized on each train window: sharpe_ratio, total_return, final_value, max_drawdown, profit_factor, win_rate or trades"] = "sharpe_ratio",
+    cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
+    save_equity: Annotated[Optional[str], "CSV file path to save the stitched out-of-sample equity curve"] = None,
+) -> str:
+    # Function to optimize MACD parameters on rolling train windows and report their out-of-sample performance
+    utils = WalkForwardUtils()
+    return utils.walk_forward_macd(csv_file_path, start_date, end_date, train_bars, test_bars, None, anchored, short_ema_range, long_ema_range, signal_ema_range, metric, cash, save_equity)
+
+def scan_macd_crossovers_tool(
+    start_date: Annotated[str, "Start of the price history used for the EMAs in 'YYYY-MM-DD' format"],
+    end_date: Annotated[str, "Last date of the scan in 'YYYY-MM-DD' format"],
+    window: Annotated[int, "Number of most recent trading sessions in which to look for crossovers"] = 1,
+    short_ema: Annotated[int, "Short EMA period"] = 12,
+    long_ema: Annotated[int, "Long EMA period"] = 26,
+    signal_ema: Annotated[int, "Signal EMA period"] = 9,
+    direction: Annotated[str, "'bullish', 'bearish' or 'both'"] = "both",
+    top_n: Annotated[int, "Number of symbols to return"] = 20,
+    symbols: Annotated[Optional[str], "Comma separated symbols to scan (default: the whole universe in data/DailyData)"] = None,
+) -> str:
+    # Function to find the symbols whose MACD crossed its signal line recently, across the whole universe in one call
+    utils = MACDScannerUtils()
+    return utils.scan_crossovers(start_date, end_date, window, short_ema, long_ema, signal_ema, direction, top_n, symbols)
+
+def backtest_portfolio_tool(
+    start_date: Annotated[str, "Start date of the backtest in 'YYYY-MM-DD' format"],
+    end_date: Annotated[str, "End date of the backtest in 'YYYY-MM-DD' format"],
+    symbols: Annotated[str, "Comma separated stock symbols of the basket (required; data/DailyData also holds index and ETF series, which are not tradable here)"],
+    short_ema: Annotated[int, "Short EMA period"] = 12,
+    long_ema: Annotated[int, "Long EMA period"] = 26,
+    signal_ema: Annotated[int, "Signal EMA period"] = 9,
+    max_positions: Annotated[int, "Maximum number of positions held at once"] = 10,
+    position_size: Annotated[Optional[float], "Fraction of equity per new position (default: 1 / max_positions)"] = None,
+    cash: Annotated[float, "Initial cash shared by the whole basket"] = 100000.0,
+    commission: Annotated[float, "Commission as a fraction of traded value"] = 0.0,
+    save_fig: Optional[Annotated[str, "File path to save the portfolio equity plot"]] = None,
+) -> str:
+    # Function to backtest the long-only MACD strategy on a basket of symbols sharing one cash account
+    utils = PortfolioUtils()
+    return utils.backtest_portfolio(start_date, end_date, symbols, short_ema, long_ema, signal_ema, max_positions, position_size, cash, commission, save_fig)
+
+def get_backtest_details_tool(
+    result_id: Annotated[str, "result_id reported by backtest_macd_tool, e.g. 'bt-1a2b3c4d5e6f'"],
+    section: Annotated[str, "Part of the report: 'Trade Analysis', 'Drawdown', 'Returns', 'Sharpe Ratio', or '' for everything"] = "",
+) -> str:
+    # Function to fetch the full analyzer report behind a compact backtest result
+    try:
+        report = default_details.load(result_id)
+    except (FileNotFoundError, ValueError):
+        return f"Error: No stored report with id '{result_id}'. Run backtest_macd_tool again with use_cache=False."
+    stats = report["stats"]
+    if section:
+        if section not in stats:
+            return f"Error: Unknown section '{section}'. Use one of: {', '.join(stats)}."
+        stats = {section: stats[section]}
+    text = json.dumps(stats, indent=1)
+    return f"Report {result_id} ({payload_size(text)['tokens']} tokens): \n" + text
 
 def get_backtesting_result():
     # Function to retrieve the most recent backtesting results
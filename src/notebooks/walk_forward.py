@@ -0,0 +1,251 @@
+# walk_forward.py
+
+# This file defines `WalkForwardOptimizer`, which checks the MACD parameters chosen by a sweep on data they were not
+# fitted to. The series is split into rolling (or anchored) train/test folds; on each train fold every parameter
+# combination is backtested with the vectorized engine and the best one by the chosen metric is then evaluated on
+# the test fold that follows it. Indicators are computed once over the whole series and every fold reads its window
+# of them, so each window starts from the EMA state reached at its first bar instead of re-seeding its EMAs there.
+# Folds are evaluated in parallel on bars published once as shared frames, and the out-of-sample test results are
+# stitched into a single equity curve.
+
+import os  # For the CPU count
+import numpy as np  # For the equity curves
+import pandas as pd  # For the fold table and the stitched curve
+from concurrent.futures import ProcessPoolExecutor  # For evaluating folds on several cores
+from typing import Annotated, Dict, List, Optional, Tuple  # For type annotations
+from backtesting import BackTraderUtils, VectorizedMACDStrategy, macd_crossover  # Vectorized engine pieces
+from indicator_store import StoredEMAs, default_indicators  # For precomputed EMAs
+from optimization import MACDParameterSweep, SWEEP_METRICS, ASCENDING_METRICS, MAX_COMBINATIONS, parse_range  # Sweep pieces
+from shared_data import SharedFrames, SharedFramesHandle  # For the bars shared with the pool workers
+
+# Columns of the per-fold table: the fold windows, the chosen parameters, and their train and test metrics
+FOLD_COLUMNS = [
+    "fold", "train_start", "train_end", "test_start", "test_end", "short_ema", "long_ema", "signal_ema",
+    *[f"train_{metric}" for metric in SWEEP_METRICS], *[f"test_{metric}" for metric in SWEEP_METRICS],
+]
+
+def walk_forward_folds(bars: int, train_bars: int, test_bars: int, step: Optional[int] = None, anchored: bool = False) -> List[Tuple[int, int, int, int]]:
+    # (train_start, train_stop, test_start, test_stop) bar ranges, stops exclusive. Each test window directly follows
+    # its train window; windows advance by `step` bars (default: test_bars, so test windows tile the series), and
+    # anchored folds keep the train window starting at the first bar
+    if train_bars < 2 or test_bars < 2:
+        raise ValueError("train_bars and test_bars must be at least 2.")
+    step = step or test_bars
+    if step < 1:
+        raise ValueError("step must be positive.")
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= bars:
+        train_start = 0 if anchored else start
+        folds.append((train_start, start + train_bars, start + train_bars, start + train_bars + test_bars))
+        start += step
+    return folds
+
+def window_crossover(macd: np.ndarray, signal: np.ndarray, start: int, stop: int) -> np.ndarray:
+    # Crossover signals for bars [start, stop) of series computed over the whole history. The lookback reaches the
+    # last bar before `start` with a non-zero MACD/signal difference, which is all CrossOver remembers of the past.
+    lead = start - 1
+    while lead > 0 and macd[lead] - signal[lead] == 0.0:
+        lead -= 1
+    lead = max(lead, 0)
+    return macd_crossover(macd[lead:stop], signal[lead:stop])[start - lead:]
+
+class WalkForwardSweep(MACDParameterSweep):
+    # Parameter sweep over bar windows of one series, reading every window from indicators computed over the full
+    # history. Each window is traded from flat with the sweep's starting cash.
+    def evaluate_window(self, crossover: np.ndarray, start: int, stop: int) -> Tuple[Dict[str, float], np.ndarray]:
+        # Simulate window signals over bars [start, stop) and return their metrics and equity curve
+        value, fills = VectorizedMACDStrategy.simulate(crossover, self.open_prices[start:stop], self.close_prices[start:stop], self.cash)
+        return self.metrics(value, fills, self.years[start:stop]), value
+
+    def optimize_folds(self, folds: List[Tuple[int, int, int, int]], combinations: List[Tuple[int, int, int]], metric: str) -> List[Dict[str, any]]:
+        # Pick the best combination on each train window and evaluate it on the matching test window. The loop runs
+        # combination by combination so each signal line is computed once for all the folds handled here.
+        stop = max(fold[3] for fold in folds)
+        descending = metric not in ASCENDING_METRICS
+        best: List[Optional[Tuple[float, Tuple[int, int, int], Dict[str, float]]]] = [None] * len(folds)
+        for combination in sorted(combinations):
+            macd = self.macd_line(*combination[:2])[:stop]
+            signal = self.signal_line(*combination, stop=stop)
+            for i, (train_start, train_stop, _, _) in enumerate(folds):
+                train_metrics, _ = self.evaluate_window(window_crossover(macd, signal, train_start, train_stop), train_start, train_stop)
+                score = train_metrics[metric]
+                if np.isnan(score):
+                    score = float('-inf') if descending else float('inf')
+                # Strict comparison keeps the first combination in sorted order on ties, like the sweep ranking
+                if best[i] is None or (score > best[i][0] if descending else score < best[i][0]):
+                    best[i] = (score, combination, train_metrics)
+
+        results = []
+        for (_, _, test_start, test_stop), (_, combination, train_metrics) in zip(folds, best):
+            macd = self.macd_line(*combination[:2])[:test_stop]
+            signal = self.signal_line(*combination, stop=test_stop)
+            test_metrics, value = self.evaluate_window(window_crossover(macd, signal, test_start, test_stop), test_start, test_stop)
+            results.append({"combination": combination, "train": train_metrics, "test": test_metrics, "value": value})
+        return results
+
+# Sweep held by each worker process, built once over the shared bars named by the pool initializer
+_worker_sweep: Optional[WalkForwardSweep] = None
+
+def _init_worker(shared_frames: SharedFramesHandle, cash: float, stored_ema: Optional[StoredEMAs]):
+    global _worker_sweep
+    _worker_sweep = WalkForwardSweep(shared_frames.frame("bars"), cash, stored_ema)
+
+def _optimize_chunk(folds: List[Tuple[int, int, int, int]], combinations: List[Tuple[int, int, int]], metric: str) -> List[Dict[str, any]]:
+    # Worker entry point: EMA spans cached by the worker's sweep are shared by every chunk it receives
+    return _worker_sweep.optimize_folds(folds, combinations, metric)
+
+class WalkForwardOptimizer:
+    def __init__(self, train_bars: int = 252, test_bars: int = 63, step: Optional[int] = None, anchored: bool = False,
+                 metric: str = "sharpe_ratio", max_workers: Optional[int] = None):
+        # max_workers defaults to the CPU count, capped at the number of folds; 1 runs in-process
+        if metric not in SWEEP_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(SWEEP_METRICS)}.")
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.step = step
+        self.anchored = anchored
+        self.metric = metric
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def run(self, df: pd.DataFrame, combinations: List[Tuple[int, int, int]], cash: float = 10000.0, stored_ema: Optional[StoredEMAs] = None) -> Tuple[pd.DataFrame, pd.Series]:
+        # Optimize on every train fold and evaluate on its test fold. Returns the per-fold table and the stitched
+        # out-of-sample equity curve: each test fold starts flat, and its profit and loss is added to the value
+        # carried over from the previous folds (the strategy trades a fixed size, so PnL adds up rather than compounds).
+        folds = walk_forward_folds(len(df), self.train_bars, self.test_bars, self.step, self.anchored)
+        if not folds:
+            raise ValueError(f"{len(df)} bars are too few for a {self.train_bars}-bar train and {self.test_bars}-bar test window.")
+        workers = min(self.max_workers, len(folds))
+        if workers == 1:
+            results = WalkForwardSweep(df, cash, stored_ema).optimize_folds(folds, combinations, self.metric)
+        else:
+            # Contiguous chunks of folds, so each worker's signal lines cover overlapping windows
+            size = -(-len(folds) // workers)
+            chunks = [folds[i:i + size] for i in range(0, len(folds), size)]
+            with SharedFrames.from_frames({"bars": df}) as shared, \
+                    ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker, initargs=(shared.handle, cash, stored_ema)) as executor:
+                results = [result for chunk_results in executor.map(_optimize_chunk, chunks, [combinations] * len(chunks), [self.metric] * len(chunks))
+                           for result in chunk_results]
+
+        rows, curves = [], []
+        carried = cash
+        for number, ((train_start, train_stop, test_start, test_stop), result) in enumerate(zip(folds, results), start=1):
+            if self.step and self.step < self.test_bars and curves:
+                # Overlapping test windows: only the bars after the previous test window extend the curve
+                previous_stop = folds[number - 2][3]
+                value = result["value"][previous_stop - test_start:]
+                base = result["value"][previous_stop - test_start - 1]
+                index = df.index[previous_stop:test_stop]
+            else:
+                value, base, index = result["value"], cash, df.index[test_start:test_stop]
+            curves.append(pd.Series(carried + value - base, index=index))
+            carried += value[-1] - base
+            short_ema, long_ema, signal_ema = result["combination"]
+            rows.append({
+                "fold": number,
+                "train_start": df.index[train_start].date(), "train_end": df.index[train_stop - 1].date(),
+                "test_start": df.index[test_start].date(), "test_end": df.index[test_stop - 1].date(),
+                "short_ema": short_ema, "long_ema": long_ema, "signal_ema": signal_ema,
+                **{f"train_{key}": value for key, value in result["train"].items()},
+                **{f"test_{key}": value for key, value in result["test"].items()},
+            })
+        equity = pd.concat(curves).rename("value")
+        return pd.DataFrame(rows, columns=FOLD_COLUMNS), equity
+
+    @staticmethod
+    def summary(equity: pd.Series, cash: float) -> Dict[str, float]:
+        # Out-of-sample figures of the stitched equity curve
+        value = equity.to_numpy()
+        sharpe = VectorizedMACDStrategy.sharpe_ratio(equity.index, value, cash)["sharperatio"]
+        return {
+            "final_value": float(value[-1]),
+            "total_return": (float(value[-1]) / cash - 1.0) * 100.0,
+            "sharpe_ratio": float('nan') if sharpe is None else sharpe,
+            "max_drawdown": VectorizedMACDStrategy.drawdown_stats(value)["max"]["drawdown"],
+        }
+
+class WalkForwardUtils:
+    # Utility class exposing walk-forward optimization to the agents
+    def walk_forward_macd(
+        self,
+        csv_file_path: Annotated[str, "Path to CSV file containing historical stock data"],
+        start_date: Annotated[str, "Start date of the whole walk-forward period in 'YYYY-MM-DD' format"],
+        end_date: Annotated[str, "End date of the whole walk-forward period in 'YYYY-MM-DD' format"],
+        train_bars: Annotated[int, "Bars in each in-sample (train) window"] = 252,
+        test_bars: Annotated[int, "Bars in each out-of-sample (test) window that follows a train window"] = 63,
+        step: Annotated[Optional[int], "Bars between consecutive folds (default: test_bars)"] = None,
+        anchored: Annotated[bool, "Keep every train window starting at start_date instead of rolling it"] = False,
+        short_ema_range: Annotated[str, "short_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "5:20:1",
+        long_ema_range: Annotated[str, "long_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "20:60:2",
+        signal_ema_range: Annotated[str, "signal_ema values as 'start:stop:step' (stop inclusive) or a comma list"] = "5:15:2",
+        metric: Annotated[str, "Metric optimized on each train window: sharpe_ratio, total_return, final_value, max_drawdown, profit_factor, win_rate or trades"] = "sharpe_ratio",
+        cash: Annotated[float, "Initial cash for backtesting"] = 10000.0,
+        save_equity: Annotated[Optional[str], "CSV file path to save the stitched out-of-sample equity curve"] = None,
+        max_workers: Annotated[Optional[int], "Worker processes for the folds (default: CPU count)"] = None,
+    ) -> str:
+        """
+        Walk-forward optimize the MACD parameters: sweep each train window, evaluate the winner on the next test window.
+        """
+
+        try:
+            optimizer = WalkForwardOptimizer(train_bars, test_bars, step, anchored, metric, max_workers)
+            combinations = MACDParameterSweep.grid(parse_range(short_ema_range), parse_range(long_ema_range), parse_range(signal_ema_range))
+        except ValueError as e:
+            return f"Error: {e}"
+        if not combinations:
+            return "Error: The parameter ranges contain no combination with short_ema < long_ema."
+        if len(combinations) > MAX_COMBINATIONS:
+            return f"Error: {len(combinations)} combinations requested, the limit is {MAX_COMBINATIONS}. Narrow the ranges."
+
+        # Load historical stock data from CSV file, filtered to the specified date range
+        try:
+            df = BackTraderUtils().load_data(csv_file_path, start_date, end_date)
+        except FileNotFoundError:
+            return f"Error: File not found at {csv_file_path}."
+        except pd.errors.ParserError:
+            return "Error: Failed to parse CSV file."
+
+        try:
+            folds, equity = optimizer.run(df, combinations, cash, default_indicators.lookup(csv_file_path, "seeded", df.index))
+        except ValueError as e:
+            return f"Error: {e}"
+        if save_equity:
+            equity.to_csv(save_equity, index_label="date")
+
+        summary = WalkForwardOptimizer.summary(equity, cash)
+        columns = ["fold", "test_start", "test_end", "short_ema", "long_ema", "signal_ema", f"train_{metric}",
+                   "test_total_return", "test_sharpe_ratio", "test_max_drawdown", "test_trades"]
+        columns = list(dict.fromkeys(columns))
+        return (
+            f"Walk-Forward Finished. {len(folds)} folds of {train_bars} train / {test_bars} test bars, "
+            f"{len(combinations)} combinations per train window, optimized for {metric}. \n"
+            + "Out-of-sample: " + ", ".join(f"{key}={value:.4f}" for key, value in summary.items()) + "\n"
+            + folds[columns].to_string(index=False, float_format=lambda x: f"{x:.4f}")
+            + (f"\nEquity curve saved to {save_equity}" if save_equity else "")
+        )
+
+if __name__ == "__main__":
+    import argparse  # Command-line interface for walk-forward runs
+    from settings import file_path, start_date, end_date
+
+    parser = argparse.ArgumentParser(description="Walk-forward optimize the MACD strategy parameters on one symbol.")
+    parser.add_argument("--csv", default=file_path)
+    parser.add_argument("--start-date", default=start_date)
+    parser.add_argument("--end-date", default=end_date)
+    parser.add_argument("--train-bars", type=int, default=252)
+    parser.add_argument("--test-bars", type=int, default=63)
+    parser.add_argument("--step", type=int, default=None)
+    parser.add_argument("--anchored", action="store_true")
+    parser.add_argument("--short-ema", default="5:20:1")
+    parser.add_argument("--long-ema", default="20:60:2")
+    parser.add_argument("--signal-ema", default="5:15:2")
+    parser.add_argument("--metric", default="sharpe_ratio", choices=SWEEP_METRICS)
+    parser.add_argument("--cash", type=float, default=10000.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--save-equity", default=None)
+    args = parser.parse_args()
+
+    print(WalkForwardUtils().walk_forward_macd(
+        args.csv, args.start_date, args.end_date, args.train_bars, args.test_bars, args.step, args.anchored,
+        args.short_ema, args.long_ema, args.signal_ema, args.metric, args.cash, args.save_equity, args.workers,
+    ))